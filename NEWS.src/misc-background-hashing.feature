@@ -0,0 +1 @@
+Packaged files are hashed by background threads while PackageSpec assigns them to components, instead of one at a time as each file is added.
@@ -0,0 +1 @@
+Repositories with the new changesetStreaming option create changesets while clients download them, instead of writing each one out in full first (protocol version 72).
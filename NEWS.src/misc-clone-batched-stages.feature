@@ -0,0 +1 @@
+Promotes and clones fetch troves in parallel batches, look up existing target troves in bulk, and log the time each stage takes.
@@ -0,0 +1 @@
+Repository cooks can reuse the changeset of an earlier cook with identical inputs, saved in the new cookCacheDir, instead of building the package again.
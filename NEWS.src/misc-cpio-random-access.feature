@@ -0,0 +1 @@
+cpio archives can be indexed and read in any order, and the proxy keeps a checkpointed copy of cached capsule payloads so single files are read without decompressing the payload up to them.
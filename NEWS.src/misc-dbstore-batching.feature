@@ -0,0 +1 @@
+The bundled sqlite bindings reuse prepared statements, and dbstore gathers rows for repository and local database commits and loads them in batches through bulkload().
@@ -0,0 +1 @@
+Flavor scores are now computed from a compiled, bitmask based form of the flavors and cached process-wide. Added deps.scoreFlavorList and deps.scoreStrongFlavorList for scoring many flavors at once.
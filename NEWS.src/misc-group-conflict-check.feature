@@ -0,0 +1 @@
+Group cooks fetch file lists only for troves with colliding path hashes and share one dependency checker across all groups.
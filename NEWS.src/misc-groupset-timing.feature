@@ -0,0 +1 @@
+GroupSetRecipe cooks log the time taken by each trove set operation at debug level.
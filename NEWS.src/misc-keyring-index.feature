@@ -0,0 +1 @@
+Public keyrings are indexed by key ID, so keys are found without reading the keyring up to them; addKeys saves the index next to the keyring
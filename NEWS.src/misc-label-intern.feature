@@ -0,0 +1 @@
+Versions parsed or thawed from strings now share their Label objects through a weak intern table, and copying a version no longer copies its labels.
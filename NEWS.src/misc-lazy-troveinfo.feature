@@ -0,0 +1 @@
+TroveInfo and file dependency streams are now thawed on first access, reducing the time and memory needed to load large numbers of troves.
@@ -0,0 +1 @@
+Network sources for a recipe are now downloaded into the lookaside cache concurrently before they are unpacked or committed.
@@ -0,0 +1 @@
+cvc cook can keep a persistent cache of ELF, jar and script analysis results in magicCacheDir (unset by default), indexed by file contents, and reports its hit rate after policy processing.
@@ -0,0 +1 @@
+Trove.diff and Trove.applyChangeSet now compare and update file lists in bulk through native code in the streams extension.
@@ -0,0 +1 @@
+cvc cook --jobs (and the cookJobs setting) cooks several recipes or flavors at the same time, in order of their build requirements, committing cooked items before the items which build with them start, even when other items fail to cook.
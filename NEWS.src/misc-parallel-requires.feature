@@ -0,0 +1 @@
+The Requires policy scans perl files in batches with long-lived perlreqs.pl processes, one per CPU, and runs them alongside the python module finder.
@@ -0,0 +1 @@
+Policies share a snapshot of the directory listings and file types of the destdir, so each file is listed and stat'd once per cook instead of once per policy; the time each policy takes is written to the build log.
@@ -0,0 +1 @@
+The warmproxycache script fills a proxy's changeset cache with the changesets clients need to install or update to a group
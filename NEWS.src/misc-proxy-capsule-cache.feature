@@ -0,0 +1 @@
+The proxy keeps the capsules it downloads for capsule content injection, with an index of the files in them, and reads capsule files from the cached capsule instead of requesting them from the capsule server one at a time.
@@ -0,0 +1 @@
+Concurrent proxy requests for the same file contents fetch them from the upstream repository only once
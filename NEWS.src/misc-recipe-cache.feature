@@ -0,0 +1 @@
+Recipe loading reuses compiled recipe code, recipe files and source troves already fetched in the same process; compiled recipes can also be kept on disk in the new recipeCacheDir.
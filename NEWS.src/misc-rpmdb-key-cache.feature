@@ -0,0 +1 @@
+Capsule database syncs reuse the list of installed RPMs from the previous sync when the RPM database has not changed, and RPM transactions no longer walk the whole RPM database to check their results.
@@ -0,0 +1 @@
+Trove signatures are verified in batches, in several processes, and remembered across runs when signatureCache is set.
@@ -0,0 +1 @@
+The proxy now converts cached changesets for older clients as it writes them to the changeset cache, instead of through a temporary copy.
@@ -21,11 +21,14 @@ into BuildComponents.  These BuildComponents are used to create Packages
 and create changesets from the files created during the build process
 """
 
+import collections
 import os
+import stat
+import threading
 import time
 
 from conary import files
-from conary.lib import sha1helper
+from conary.lib import digestlib, log, sha1helper, util
 from conary.build import use
 from conary.deps import deps
 
@@ -47,6 +50,119 @@ def BuildDeviceFile(devtype, major, minor, owner, group, perms):
 
     return f
 
+# number of threads computing file digests ahead of BuildComponent.addFile
+HASH_THREADS = 4
+
+def _statKey(st):
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime, st.st_ctime)
+
+class ContentsHasher(object):
+    """
+    Computes the sha1 digests of regular files in background threads,
+    in the order the files are expected to be added to components.  A
+    file which no thread has started on when it is asked for is left to
+    the caller, so callers never wait for more than the file they need.
+    """
+    _QUEUED = 0
+    _TAKEN = 1
+    _WORKING = 2
+
+    def __init__(self, paths, threads=HASH_THREADS):
+        paths = [ util.normpath(x) for x in paths ]
+        self._cond = threading.Condition()
+        self._state = dict.fromkeys(paths, self._QUEUED)
+        self._queue = collections.deque(paths)
+        self._stopped = False
+        self.hits = 0
+        self._threads = []
+        for i in range(min(threads, len(paths))):
+            t = threading.Thread(target = self._work)
+            t.setDaemon(True)
+            t.start()
+            self._threads.append(t)
+
+    def _next(self):
+        self._cond.acquire()
+        try:
+            while self._queue and not self._stopped:
+                path = self._queue.popleft()
+                if self._state.get(path) == self._QUEUED:
+                    self._state[path] = self._WORKING
+                    return path
+            return None
+        finally:
+            self._cond.release()
+
+    def _work(self):
+        path = self._next()
+        while path is not None:
+            result = self._hash(path)
+            self._cond.acquire()
+            try:
+                self._state[path] = result
+                self._cond.notifyAll()
+            finally:
+                self._cond.release()
+            path = self._next()
+
+    @staticmethod
+    def _hash(path):
+        try:
+            st = os.lstat(path)
+            # unreadable files are left to the caller, which changes
+            # their permissions to read them
+            if not stat.S_ISREG(st.st_mode) or not st.st_mode & 0400:
+                return None
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                m = digestlib.sha1()
+                buf = os.read(fd, 256 * 1024)
+                while buf:
+                    m.update(buf)
+                    buf = os.read(fd, 256 * 1024)
+            finally:
+                os.close(fd)
+        except (IOError, OSError):
+            return None
+        return (_statKey(st), m.digest())
+
+    def get(self, path, statBuf):
+        """
+        Returns the sha1 of the contents of path if it has been computed
+        for the file described by statBuf, or None.
+        """
+        path = util.normpath(path)
+        self._cond.acquire()
+        try:
+            state = self._state.get(path)
+            if state == self._QUEUED:
+                self._state[path] = self._TAKEN
+                return None
+            while state == self._WORKING:
+                self._cond.wait()
+                state = self._state.get(path)
+        finally:
+            self._cond.release()
+
+        if not isinstance(state, tuple) or state[0] != _statKey(statBuf):
+            return None
+        self.hits += 1
+        return state[1]
+
+    def stop(self):
+        """
+        Stops hashing files and waits for the threads to finish the files
+        they are working on.
+        """
+        self._cond.acquire()
+        try:
+            self._stopped = True
+        finally:
+            self._cond.release()
+        for t in self._threads:
+            t.join()
+
+
 def _getUseFlavor(recipe):
     """
     Returns a deps.Flavor instance that represents the Use flags
@@ -69,7 +185,7 @@ def _getUseFlavor(recipe):
 
 class BuildComponent(dict):
 
-    def addFile(self, path, realPath):
+    def addFile(self, path, realPath, hasher=None):
         """
         Add a file to the build component
 
@@ -77,11 +193,18 @@ class BuildComponent(dict):
         @param realPath: the location of the actual file on the filesystem,
         used to obtain the contents of the file when creating a changeset
         to commit to the repository
+        @param hasher: optional L{ContentsHasher} which may already have
+        computed the sha1 of realPath
         """
+        s = os.lstat(realPath)
+        sha1 = None
+        if hasher is not None and stat.S_ISREG(s.st_mode):
+            sha1 = hasher.get(realPath, s)
         # skip uid/gid lookups because packagepolicy will change the
         # ownerships according to Ownership settings anyway
         (f, linkCount, inode) = files.FileFromFilesystem(realPath, None,
-                                        inodeInfo = True, assumeRoot = True)
+                                        inodeInfo = True, assumeRoot = True,
+                                        statBuf = s, sha1 = sha1)
         f.inode.perms.set(f.inode.perms() & 01777)
         self[path] = (realPath, f)
         if (f.inode.perms() & 0400) != 0400:
@@ -206,6 +329,7 @@ class AutoBuildPackage:
         self.componentMap = {}
         # dictionary from pathnames to lists of packages (capsules)
         self.pathComponentMap = {}
+        self.hasher = None
 
     def _getname(self, pkgname, compname):
         return ':'.join((pkgname, compname))
@@ -266,9 +390,25 @@ class AutoBuildPackage:
             self.componentMap[path] = pkg
         else:
             pkg = self.findComponent(path)
-        fileObj = pkg.addFile(path, realPath)
+        fileObj = pkg.addFile(path, realPath, hasher=self.hasher)
         self._addPackageMaps(path, fileObj, pkg)
 
+    def startHashing(self, realPaths):
+        """
+        Starts computing the sha1 digests of the regular files in
+        realPaths in the background, for the files about to be added.
+        """
+        self.stopHashing()
+        self.hasher = ContentsHasher(realPaths)
+
+    def stopHashing(self):
+        if self.hasher is None:
+            return
+        self.hasher.stop()
+        log.debug('%d of %d file digests computed in the background',
+                  self.hasher.hits, len(self.pathMap))
+        self.hasher = None
+
     def _addPackageMaps(self, path, fileObj, pkg):
         self.pathMap[path] = fileObj
         l = self.pathComponentMap.setdefault(path, [])
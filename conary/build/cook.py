@@ -20,10 +20,13 @@ Contains the functions which builds a recipe and commits the
 resulting packages to the repository.
 """
 
+import cPickle
+import errno
 import fcntl
 import itertools
 import os
 import resource
+import select
 import shutil
 import signal
 import sys
@@ -34,7 +37,7 @@ import traceback
 
 from conary import callbacks, conaryclient, constants, files, trove, versions
 from conary.cmds import updatecmd
-from conary.build import buildinfo, buildpackage, lookaside, use
+from conary.build import buildinfo, buildpackage, cookcache, lookaside, use
 from conary.build import recipe, grouprecipe, loadrecipe, factory
 from conary.build import errors as builderrors
 from conary.build.nextversion import nextVersion
@@ -1060,6 +1063,12 @@ def cookPackageObject(repos, db, cfg, loader, sourceVersion, prep=True,
                             and targetLabel != versions.CookLabel()
                             and not prep and not downloadOnly)
 
+    # only repository cooks are fully described by their source trove
+    cookCache = None
+    if (cfg.cookCacheDir and not prep and not downloadOnly and not resume
+            and loader.cookType == recipe.Recipe.COOK_TYPE_REPOSITORY):
+        cookCache = cookcache.CookCache(cfg.cookCacheDir)
+
     result  = _cookPackageObjWrap(repos, cfg, loader,
                                  sourceVersion, prep=prep,
                                  macros=macros, resume=resume,
@@ -1069,19 +1078,30 @@ def cookPackageObject(repos, db, cfg, loader, sourceVersion, prep=True,
                                  enforceManagedPolicy=enforceManagedPolicy,
                                  requireCleanSources = requireCleanSources,
                                  downloadOnly = downloadOnly,
-                                 targetLabel = targetLabel)
+                                 targetLabel = targetLabel,
+                                 cookCache = cookCache)
+    if isinstance(result, cookcache.CachedCook):
+        changeSet, built = _reuseCachedCook(repos, db, result, sourceVersion,
+                                            targetLabel=targetLabel,
+                                            alwaysBumpCount=alwaysBumpCount,
+                                            signatureKey=signatureKey)
+        return (changeSet, built, None)
     if type(result) is not tuple:
         return
 
     (bldList, recipeObj, builddir, destdir, policyTroves) = result
 
     # 2. convert the package into a changeset ready for committal
+    # (an absolute one if it is going to be cached)
     changeSet, built = _createPackageChangeSet(repos, db, cfg, bldList,
                            loader, recipeObj, sourceVersion,
                            targetLabel=targetLabel,
                            alwaysBumpCount=alwaysBumpCount,
                            policyTroves=policyTroves,
-                           signatureKey = signatureKey)
+                           signatureKey = signatureKey,
+                           relative = cookCache is None)
+    if cookCache is not None:
+        cookCache.store(recipeObj._cookCacheKey, changeSet)
 
     return (changeSet, built, (recipeObj.cleanup, (builddir, destdir)))
 
@@ -1118,7 +1138,8 @@ def _cookPackageObject(repos, cfg, loader, sourceVersion, prep=True,
                        macros={}, resume = None, ignoreDeps=False,
                        logBuild=False, crossCompile=None,
                        enforceManagedPolicy=False,  requireCleanSources = False,
-                       downloadOnly = False, redirectStdin = False):
+                       downloadOnly = False, redirectStdin = False,
+                       cookCache = None):
     """Builds the package for cookPackageObject.  Parameter meanings are
        described there.
     """
@@ -1159,6 +1180,22 @@ def _cookPackageObject(repos, cfg, loader, sourceVersion, prep=True,
         recipeObj.checkBuildRequirements(cfg, sourceVersion,
                                          raiseError=not (ignoreDeps or prep))
 
+    if cookCache is not None:
+        db = database.Database(cfg.root, cfg.dbPath)
+        cacheKey = cookCache.getKey(recipeObj, sourceVersion,
+                            use.allFlagsToFlavor(recipeObj.name),
+                            loader.getLoadedTroves(),
+                            recipeObj.getRecursiveBuildRequirements(db, cfg),
+                            policyTroves, recipeObj.macros, crossCompile,
+                            logBuild)
+        del db
+        cached = cookCache.lookup(cacheKey)
+        if cached is not None:
+            log.info('Reusing the result of an identical cook from %s',
+                     cached.path)
+            return cached
+        recipeObj._cookCacheKey = cacheKey
+
     bldInfo = buildinfo.BuildInfo(builddir)
     recipeObj.buildinfo = bldInfo
 
@@ -1293,6 +1330,11 @@ def _cookPackageObject(repos, cfg, loader, sourceVersion, prep=True,
             recipeObj.doProcess('ENFORCEMENT', logFile = output)
 
             recipeObj.doProcess('ERROR_REPORTING', logFile = output)
+            diskCache = getattr(recipeObj, 'magic', None)
+            diskCache = getattr(diskCache, 'diskCache', None)
+            if diskCache is not None:
+                diskCache.prune()
+                log.info(diskCache.report())
             logBuild and logFile.popDescriptor('policy')
         finally:
             os.chdir(cwd)
@@ -1422,12 +1464,14 @@ def _copyScripts(trv, scriptsMap):
 def _createPackageChangeSet(repos, db, cfg, bldList, loader, recipeObj,
                             sourceVersion,
                             targetLabel=None, alwaysBumpCount=False,
-                            policyTroves=None, signatureKey = None):
+                            policyTroves=None, signatureKey = None,
+                            relative = True):
     """ Helper function for cookPackage object.  See there for most
         parameter definitions. BldList is the list of
         components created by cooking a package recipe.  RecipeObj is
         the instantiation of the package recipe, and loader is the
-        loader which loaded the class for that recipe.
+        loader which loaded the class for that recipe.  If relative is
+        False, the changeset is always absolute.
     """
     # determine final version and flavor  - flavor is shared among
     # all components, so just grab the first one.
@@ -1539,7 +1583,7 @@ def _createPackageChangeSet(repos, db, cfg, bldList, loader, recipeObj,
         relativePackageList = []
         needTroves = {}
         for empty, p, fileMap in packageList:
-            if cfg.commitRelativeChangeset:
+            if relative and cfg.commitRelativeChangeset:
                 oldTrove = previousTroveDict.get(p.getName(), None)
             else:
                 oldTrove = None
@@ -1562,6 +1606,55 @@ def _createPackageChangeSet(repos, db, cfg, bldList, loader, recipeObj,
 
     return changeSet, built
 
+def _reuseCachedCook(repos, db, cached, sourceVersion, targetLabel=None,
+                     alwaysBumpCount=False, signatureKey=None):
+    """ Loads the changeset saved for an earlier, identical cook and moves
+        its troves to the version this cook would have created.  Returns
+        the changeset and the list of components built, like
+        _createPackageChangeSet.
+    """
+    changeSet = changeset.ChangeSetFromFile(cached.path)
+    troves = [ trove.Trove(x) for x in changeSet.iterNewTroveList() ]
+    components = sorted(x.getName() for x in troves
+                        if not trove.troveIsCollection(x.getName()))
+    flavor = troves[0].getFlavor()
+    targetVersion = nextVersion(repos, db, components, sourceVersion,
+                                flavor, targetLabel,
+                                alwaysBumpCount=alwaysBumpCount)
+    _changeTroveVersions(changeSet, targetVersion, signatureKey)
+
+    built = [ (x, targetVersion.asString(), flavor) for x in components ]
+    return changeSet, built
+
+def _changeTroveVersions(changeSet, targetVersion, signatureKey=None):
+    """ Moves all of the new troves in an absolute changeset built by a
+        single cook to targetVersion.
+    """
+    troves = [ trove.Trove(x) for x in changeSet.iterNewTroveList() ]
+    primaries = set((x[0], x[2]) for x in changeSet.getPrimaryTroveList())
+
+    for trv in troves:
+        oldVersion = trv.getVersion()
+        changeSet.delNewTrove(trv.getName(), oldVersion, trv.getFlavor())
+        trv.changeVersion(targetVersion)
+        # files which were new in the cook move along with it; files
+        # shared with earlier builds keep their versions
+        for (pathId, path, fileId, fileVersion) in list(trv.iterFileList()):
+            if fileVersion == oldVersion:
+                trv.updateFile(pathId, path, targetVersion, fileId)
+        for (name, version, subFlavor), byDefault, isStrong in \
+                list(trv.iterTroveListInfo()):
+            if version == oldVersion:
+                trv.delTrove(name, version, subFlavor, missingOkay = False)
+                trv.addTrove(name, targetVersion, subFlavor,
+                             byDefault = byDefault, weakRef = not isStrong)
+        trv.invalidateDigests()
+        _signTrove(trv, signatureKey)
+        changeSet.newTrove(trv.diff(None, absolute = 1)[0])
+        if (trv.getName(), trv.getFlavor()) in primaries:
+            changeSet.addPrimaryTrove(trv.getName(), targetVersion,
+                                      trv.getFlavor())
+
 def _loadPolicy(recipeObj, cfg, enforceManagedPolicy):
     policyFiles = recipeObj.loadPolicy()
     db = database.Database(cfg.root, cfg.dbPath)
@@ -2178,7 +2271,7 @@ def cookCommand(cfg, args, prep, macros, emerge = False,
                 profile = False, logBuild = True,
                 crossCompile = None, cookIds=None, downloadOnly=False,
                 groupOptions=None,
-                changeSetFile=None,
+                changeSetFile=None, jobs=None,
                 ):
     # this ensures the repository exists
     client = conaryclient.ConaryClient(cfg)
@@ -2224,6 +2317,17 @@ def cookCommand(cfg, args, prep, macros, emerge = False,
     if changeSetFile and len(finalItems) > 1:
         raise CookError("Cannot cook multiple troves to change set")
 
+    if jobs is None:
+        jobs = cfg.cookJobs
+    if (jobs > 1 and len(finalItems) > 1 and not
+            (emerge or prep or resume or showBuildReqs or profile)):
+        _cookParallel(repos, cfg, finalItems, jobs, cookUid, cookGid,
+                      macros=macros, allowUnknownFlags=allowUnknownFlags,
+                      ignoreDeps=ignoreDeps, logBuild=logBuild,
+                      crossCompile=crossCompile, downloadOnly=downloadOnly,
+                      groupOptions=groupOptions)
+        return
+
     for item in finalItems:
         # we want to fork here to isolate changes the recipe might make
         # in the environment (such as environment variables)
@@ -2290,15 +2394,8 @@ def cookCommand(cfg, args, prep, macros, emerge = False,
                     # Leave a sys.exit here, we may need it for debugging
                     sys.exit(1)
                 os._exit(0)
-            for component, version, flavor in sorted(components):
-                print "Created component:", component, version,
-                if flavor is not None:
-                    print str(flavor).replace("\n", " "),
-                print
-            if csFile is None:
-                print 'Changeset committed to the repository.'
-            else:
-                print 'Changeset written to:', csFile
+            _printCookResult(components, csFile)
+            if csFile is not None:
                 # send the changeset file over the pipe
                 os.write(outpipe, csFile)
             if profile == 'lsprof':
@@ -2384,6 +2481,399 @@ def cookCommand(cfg, args, prep, macros, emerge = False,
             # stdin might not even have an isatty method
             pass
 
+def _printCookResult(components, csFile):
+    for component, version, flavor in sorted(components):
+        print "Created component:", component, version,
+        if flavor is not None:
+            print str(flavor).replace("\n", " "),
+        print
+    if csFile is None:
+        print 'Changeset committed to the repository.'
+    else:
+        print 'Changeset written to:', csFile
+
+def _isLocalCookItem(item):
+    if isinstance(item, ConaryState):
+        return True
+    name = item[0]
+    return name.endswith('.recipe') and os.path.isfile(name)
+
+def _getCookItemTag(item):
+    if isinstance(item, ConaryState):
+        return item.getSourceState().getName()
+    name, versionStr, flavorList = item
+    tag = name
+    if versionStr:
+        tag += '=' + versionStr
+    for flavor in flavorList:
+        if flavor is not None:
+            tag += '[%s]' % str(flavor).replace('\n', ' ')
+    return tag
+
+def _getCookItemRecipeInfo(repos, cfg, item):
+    """ Returns the name and the build requirements of the recipe for a
+        cook item.
+    """
+    if isinstance(item, ConaryState):
+        loader = loadrecipe.RecipeLoaderFromSourceDirectory(
+                                item.getSourceState(), repos = repos,
+                                cfg = cfg, buildFlavor = cfg.buildFlavor)
+    else:
+        name, versionStr, flavorList = item
+        buildFlavor = cfg.buildFlavor
+        if flavorList[0] is not None:
+            buildFlavor = deps.overrideFlavor(cfg.buildFlavor, flavorList[0])
+        if _isLocalCookItem(item):
+            loader = getRecipeInfoFromPath(repos, cfg, name,
+                                           buildFlavor=buildFlavor)[0]
+        else:
+            use.setBuildFlagsFromFlavor(name, buildFlavor, error=False)
+            loader = loadrecipe.recipeLoaderFromSourceComponent(
+                                    name, cfg, repos, versionStr=versionStr,
+                                    buildFlavor=buildFlavor)[0]
+    recipeClass = loader.getRecipe()
+    return recipeClass.name, list(getattr(recipeClass, 'buildRequires', []))
+
+def _getCookItemsRecipeInfo(repos, cfg, items):
+    """ Loads the recipes for a list of cook items in a child process, so
+        that loading them leaves the use flags and loaded modules of this
+        process alone.  Returns (name, buildRequires) for each item, or
+        None for items whose recipe could not be loaded; the error is
+        reported when the item itself is cooked.
+    """
+    inpipe, outpipe = os.pipe()
+    pid = os.fork()
+    if not pid:
+        os.close(inpipe)
+        try:
+            devnull = os.open(os.devnull, os.O_RDWR)
+            os.dup2(devnull, 1)
+            os.dup2(devnull, 2)
+            use.allowUnknownFlags(True)
+            result = []
+            for item in items:
+                use.clearLocalFlags()
+                try:
+                    result.append(_getCookItemRecipeInfo(repos, cfg, item))
+                except Exception:
+                    result.append(None)
+            f = os.fdopen(outpipe, 'w')
+            cPickle.dump(result, f, cPickle.HIGHEST_PROTOCOL)
+            f.close()
+        finally:
+            os._exit(0)
+    os.close(outpipe)
+    f = os.fdopen(inpipe, 'r')
+    data = f.read()
+    f.close()
+    os.waitpid(pid, 0)
+    try:
+        return cPickle.loads(data)
+    except Exception:
+        return [ None ] * len(items)
+
+def _getCookJobDependencies(recipeInfo):
+    """ Given (name, buildRequires) for each item to cook, or None where it
+        is unknown, returns for each item the set of indexes of the items
+        it has to be cooked after: those which build one of its build
+        requirements.
+    """
+    byName = {}
+    for idx, info in enumerate(recipeInfo):
+        if info:
+            byName.setdefault(info[0], []).append(idx)
+
+    result = []
+    for idx, info in enumerate(recipeInfo):
+        after = set()
+        if info:
+            name, buildRequires = info
+            for req in buildRequires:
+                pkgName = parseTroveSpec(req)[0].split(':')[0]
+                if pkgName != name:
+                    after.update(byName.get(pkgName, []))
+        result.append(after)
+    return result
+
+class _CookJob(object):
+
+    def __init__(self, idx, item, tag):
+        self.idx = idx
+        self.item = item
+        self.tag = tag
+        self.pid = None
+        self.fd = None
+        self.buf = ''
+        self.buildPath = None
+        self.changeSetFile = None
+
+    def output(self, data):
+        self.buf += data
+        lines = self.buf.split('\n')
+        self.buf = lines.pop()
+        for line in lines:
+            self.writeLine(line)
+
+    def flush(self):
+        if self.buf:
+            self.writeLine(self.buf)
+            self.buf = ''
+
+    def writeLine(self, line):
+        sys.stdout.write('[%s] %s\n' % (self.tag, line))
+        sys.stdout.flush()
+
+def _runCookJob(repos, cfg, job, cookUid, cookGid, outFd, cookArgs):
+    """ Body of the child process cooking one item of a parallel cook.
+        Never returns.
+    """
+    status = 1
+    try:
+        try:
+            os.setpgrp()
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(outFd, 1)
+            os.dup2(outFd, 2)
+            os.close(devnull)
+            os.close(outFd)
+
+            if cookGid:
+                os.setgid(cookGid)
+            if cookUid:
+                os.setuid(cookUid)
+            os.umask(0022)
+            resource.setrlimit(resource.RLIMIT_CORE, (0,0))
+
+            # every job gets its own build root, so that flavors of the
+            # same recipe do not share a build directory
+            cfg.buildPath = job.buildPath
+            # the parent may move the troves to another version before
+            # committing them, which needs absolute changesets
+            cfg.commitRelativeChangeset = False
+            components, csFile = cookItem(repos, cfg, job.item,
+                                          changeSetFile=job.changeSetFile,
+                                          callback=CookCallback(),
+                                          **cookArgs)
+            if not components:
+                status = int(log.errorOccurred())
+            else:
+                if job.changeSetFile is None:
+                    _printCookResult(components, csFile)
+                status = 0
+        except SystemExit, e:
+            status = e.code and 1 or 0
+        except errors.ConaryError, e:
+            log.error(str(e))
+        except:
+            traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+def _cookParallel(repos, cfg, items, jobs, cookUid, cookGid, **cookArgs):
+    """ Cooks items in up to jobs child processes at a time.  An item is
+        not started until the items building its build requirements have
+        been cooked and committed.  Output from each child is prefixed
+        with its item.  The results of repository cooks are committed
+        together, either before an item which needs them starts or once
+        every item has been cooked; items which cooked are committed even
+        when others failed.
+    """
+    cookJobs = [ _CookJob(idx, item, _getCookItemTag(item))
+                 for idx, item in enumerate(items) ]
+    after = _getCookJobDependencies(_getCookItemsRecipeInfo(repos, cfg, items))
+    # every flavor of a recipe file is written to the same changeset file,
+    # so they are cooked one after another, as they would be one at a time
+    lastFlavor = {}
+    for job in cookJobs:
+        if _isLocalCookItem(job.item) and not isinstance(job.item,
+                                                         ConaryState):
+            key = tuple(job.item[:2])
+            if key in lastFlavor:
+                after[job.idx].add(lastFlavor[key])
+            lastFlavor[key] = job.idx
+    util.mkdirChain(cfg.buildPath)
+    jobRoot = tempfile.mkdtemp(prefix='cook-', dir=cfg.buildPath)
+    if cookUid or cookGid:
+        os.chown(jobRoot, cookUid or -1, cookGid or -1)
+    signal.signal(signal.SIGTTOU, signal.SIG_IGN)
+
+    pending = list(cookJobs)
+    running = {}
+    done = set()
+    failed = set()
+    # cooked items whose changesets have not been committed yet
+    uncommitted = set()
+
+    def commitFinished():
+        toCommit = [ x for x in cookJobs if x.idx in uncommitted ]
+        uncommitted.clear()
+        try:
+            _commitParallelCooks(repos, cfg, toCommit)
+        except errors.ConaryError, e:
+            log.error('could not commit %s: %s',
+                      ', '.join(x.tag for x in toCommit), e)
+            for job in toCommit:
+                done.discard(job.idx)
+                failed.add(job.idx)
+
+    try:
+        while pending or running:
+            for job in list(pending):
+                if len(running) >= jobs:
+                    break
+                if after[job.idx] & uncommitted:
+                    # the item builds with the results of these cooks
+                    commitFinished()
+                if after[job.idx] & failed:
+                    pending.remove(job)
+                    failed.add(job.idx)
+                    log.error('not cooking %s: one of its build '
+                              'requirements failed to cook', job.tag)
+                    continue
+                if after[job.idx] - done:
+                    continue
+                pending.remove(job)
+
+                if not _isLocalCookItem(job.item):
+                    fd, job.changeSetFile = tempfile.mkstemp('.ccs',
+                                                  'cook-', dir=cfg.tmpDir)
+                    os.close(fd)
+                    if cookUid or cookGid:
+                        os.chown(job.changeSetFile, cookUid or -1,
+                                 cookGid or -1)
+                job.buildPath = os.path.join(jobRoot, str(job.idx))
+                inpipe, outpipe = os.pipe()
+                job.pid = os.fork()
+                if not job.pid:
+                    os.close(inpipe)
+                    _runCookJob(repos, cfg, job, cookUid, cookGid, outpipe,
+                                cookArgs)
+                os.close(outpipe)
+                job.fd = inpipe
+                running[inpipe] = job
+                log.info('cooking %s', job.tag)
+
+            if not running:
+                if pending:
+                    # the remaining items require each other
+                    job = pending[0]
+                    log.warning('build requirements of %s form a loop; '
+                                'cooking it first', job.tag)
+                    after[job.idx] = set()
+                continue
+
+            try:
+                ready = select.select(running.keys(), [], [])[0]
+            except select.error, e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+            for fd in ready:
+                job = running[fd]
+                data = os.read(fd, 4096)
+                if data:
+                    job.output(data)
+                    continue
+                job.flush()
+                os.close(fd)
+                del running[fd]
+                status = os.waitpid(job.pid, 0)[1]
+                if os.WIFEXITED(status) and not os.WEXITSTATUS(status):
+                    done.add(job.idx)
+                    if (job.changeSetFile and
+                            os.path.getsize(job.changeSetFile)):
+                        uncommitted.add(job.idx)
+                    if cfg.cleanAfterCook:
+                        util.rmtree(job.buildPath, ignore_errors=True)
+                else:
+                    failed.add(job.idx)
+                    log.error('cook of %s failed', job.tag)
+    except KeyboardInterrupt:
+        for job in running.itervalues():
+            try:
+                os.kill(-job.pid, signal.SIGINT)
+                os.waitpid(job.pid, 0)
+            except OSError:
+                pass
+        _removeJobChangeSets(cookJobs)
+        raise
+
+    try:
+        # left behind if any build directory was kept
+        os.rmdir(jobRoot)
+    except OSError:
+        pass
+    try:
+        if uncommitted:
+            commitFinished()
+    finally:
+        _removeJobChangeSets(cookJobs)
+    if failed:
+        log.error('%d of %d items failed to cook', len(failed),
+                  len(cookJobs))
+        sys.exit(1)
+
+def _removeJobChangeSets(cookJobs):
+    for job in cookJobs:
+        if job.changeSetFile and os.path.exists(job.changeSetFile):
+            os.unlink(job.changeSetFile)
+
+def _commitParallelCooks(repos, cfg, cookJobs):
+    """ Merges the changesets written by finished jobs of a parallel cook
+        and commits them together.
+    """
+    changeSets = []
+    bySource = {}
+    for job in cookJobs:
+        cs = changeset.ChangeSetFromFile(job.changeSetFile)
+        changeSets.append(cs)
+        # the flavors of an item are split into separate jobs
+        bySource.setdefault(tuple(job.item[:2]), []).append((job, cs))
+
+    # the jobs chose their versions without seeing each other's results,
+    # nor what was committed since; move the flavors of each source to
+    # the version they would get if they were cooked now, one after
+    # another
+    db = database.Database(cfg.root, cfg.dbPath)
+    for jobList in bySource.itervalues():
+        names = set()
+        flavors = set()
+        versionList = []
+        for job, cs in jobList:
+            for trvCs in cs.iterNewTroveList():
+                names.add(trvCs.getName())
+                flavors.add(trvCs.getNewFlavor())
+            versionList.append(trvCs.getNewVersion())
+        if [ x for x in names if trove.troveIsGroup(x) ]:
+            # group cooks choose their own versions for all flavors
+            continue
+        sourceVersion = versionList[0].getSourceVersion()
+        targetVersion = nextVersion(repos, db, names, sourceVersion, flavors)
+        signatureKey = selectSignatureKey(cfg, sourceVersion.trailingLabel())
+        for (job, cs), version in itertools.izip(jobList, versionList):
+            if version != targetVersion:
+                _changeTroveVersions(cs, targetVersion, signatureKey)
+
+    combined = changeset.ReadOnlyChangeSet()
+    for cs in changeSets:
+        combined.merge(cs)
+
+    for trvCs in sorted(combined.iterNewTroveList(),
+                        key=lambda x: (x.getName(), x.getNewVersion(),
+                                       str(x.getNewFlavor()))):
+        if trove.troveIsPackage(trvCs.getName()):
+            continue
+        print "Created component:", trvCs.getName(), \
+                trvCs.getNewVersion().asString(),
+        if trvCs.getNewFlavor() is not None:
+            print str(trvCs.getNewFlavor()).replace("\n", " "),
+        print
+    repos.commitChangeSet(combined, callback = CookCallback())
+    print 'Changeset committed to the repository.'
+
 def _callSetup(cfg, recipeObj, recordCalls=True):
     if recipeObj._trove:
         macros = recipeObj.macros
@@ -0,0 +1,128 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+"""
+Provides a cache of package cook results, indexed by a hash of everything
+which goes into the cook, so that a cook whose inputs have not changed can
+reuse the changeset built last time instead of building again.
+"""
+import os
+import tempfile
+
+from conary import constants
+from conary.lib import digestlib, log, sha1helper, util
+
+# Bump whenever the set of inputs hashed by getKey changes
+COOK_CACHE_VERSION = 1
+
+
+class CachedCook(object):
+    """
+    Returned instead of a build result when the cook cache holds the
+    changeset for a cook.
+    """
+    __slots__ = [ 'key', 'path' ]
+
+    def __init__(self, key, path):
+        self.key = key
+        self.path = path
+
+
+class CookCache(object):
+    """
+    Directory of absolute changesets, one per cook, named after the hash
+    of the cook inputs.  The directory may be shared between build hosts.
+    """
+
+    def __init__(self, top):
+        self.top = top
+
+    @staticmethod
+    def _troveList(troveTups):
+        l = []
+        for name, version, flavor in troveTups:
+            if version.onLocalLabel() and name.startswith('/'):
+                # unmanaged policy files are recorded by path; use their
+                # contents instead of the fake version
+                try:
+                    version = sha1helper.sha1ToString(
+                                            sha1helper.sha1FileBin(name))
+                except (IOError, OSError):
+                    version = version.asString()
+            else:
+                version = version.asString()
+            l.append((name, version, str(flavor)))
+        return sorted(l)
+
+    def getKey(self, recipeObj, sourceVersion, buildFlavor, loadedTroves,
+               buildReqs, policyTroves, macros, crossCompile, logBuild):
+        """
+        Returns the hash of the inputs to a package cook: the conary
+        version, the source trove, the troves loaded by the recipe, the
+        resolved build requirements, the policy, the build flavor, the
+        macros and the options which change the result.
+        """
+        digest = digestlib.sha1()
+        def add(*items):
+            for item in items:
+                digest.update(str(item))
+                digest.update('\0')
+
+        add(COOK_CACHE_VERSION, constants.version, recipeObj.name,
+            sourceVersion.asString(), buildFlavor, crossCompile,
+            bool(logBuild))
+        for troveTups in (loadedTroves, buildReqs, policyTroves or []):
+            add(len(troveTups))
+            for tup in self._troveList(troveTups):
+                add(*tup)
+        # unexpanded, so that nothing depends on the build directory
+        for key, value in sorted(macros.itermacros()):
+            add(key, value)
+        return digest.hexdigest()
+
+    def _getPath(self, key):
+        return os.path.join(self.top, key + '.ccs')
+
+    def lookup(self, key):
+        """
+        Returns a L{CachedCook} for C{key}, or None if the cache holds no
+        changeset for it.
+        """
+        path = self._getPath(key)
+        if os.path.exists(path):
+            return CachedCook(key, path)
+        return None
+
+    def store(self, key, cs):
+        """
+        Saves the absolute changeset C{cs} as the result of the cook
+        identified by C{key}.  Failing to write the cache does not fail
+        the cook.
+        """
+        path = self._getPath(key)
+        try:
+            util.mkdirChain(self.top)
+            # write under a temporary name so that concurrent cooks never
+            # see partial changesets
+            fd, tmpPath = tempfile.mkstemp(dir=self.top, suffix='.tmp')
+            os.close(fd)
+            cs.writeToFile(tmpPath)
+            os.rename(tmpPath, path)
+        except (IOError, OSError), e:
+            log.warning('could not save cook result in %s: %s', self.top, e)
+            return
+        log.info('saved cook result as %s', path)
@@ -75,6 +75,9 @@ class Filter:
             self.rootdir = rootdir
         self.setmode = setmode
         self.unsetmode = unsetmode
+        # masks which only test the file type can be checked against the
+        # file types cached in a policy.TreeSnapshot
+        self.typeOnly = not ((setmode or 0) | (unsetmode or 0)) & 07777
         tmplist = []
         if callable(regex):
             regex = regex()
@@ -112,12 +115,15 @@ class Filter:
             regex = regex + '$'
         return regex
 
-    def match(self, path, mode=None):
+    def match(self, path, mode=None, snapshot=None):
         """
         Compare a path to the constraints
         @param path: The string that should match the regex
         @param mode: optional parameter used when the path is not on
         disk (e.g., if a device node is being created virtually)
+        @param snapshot: optional C{policy.TreeSnapshot} providing the
+        file type of path, used instead of calling lstat() when the
+        mode masks test nothing but the file type
         """
         # search instead of match in order to not automatically
         # front-anchor searches
@@ -126,9 +132,13 @@ class Filter:
             if self.setmode or self.unsetmode:
                 if not mode:
                     if path[0] == '/':
-                        mode = os.lstat(self.rootdir + path)[stat.ST_MODE]
+                        fullPath = self.rootdir + path
                     else:
-                        mode = os.lstat(os.path.join(self.rootdir,path))[stat.ST_MODE]
+                        fullPath = os.path.join(self.rootdir, path)
+                    if snapshot is not None and self.typeOnly:
+                        mode = snapshot.fileType(fullPath)
+                    if not mode:
+                        mode = os.lstat(fullPath)[stat.ST_MODE]
                 if self.setmode is not None:
                     # if some bit in setmode is not set in mode, no match
                     if (self.setmode & mode) != self.setmode:
@@ -160,7 +170,7 @@ class PathSet(object):
         name = kwargs.pop('name', None)
         self.name = name
         self._set = set(*args)
-    def match(self, string, mode=None):
+    def match(self, string, mode=None, snapshot=None):
         return string in self._set
     search = match
     def __call__(self):
@@ -34,7 +34,7 @@ from conary import conaryclient
 from conary import callbacks
 from conary.deps import deps
 from conary import errors
-from conary.lib import graph, log, util
+from conary.lib import graph, log, sha1helper, util
 from conary.repository import changeset, trovesource, searchsource
 from conary import trove
 from conary import versions
@@ -2088,60 +2088,66 @@ def buildGroups(recipeObj, cfg, repos, callback, troveCache=None):
                               *troveSpec)
             unmatchedGlobalReplaceSpecs.add(troveSpec)
 
-    for groupIdx, group in enumerate(groupList):
-        log.info('Building %s (%s of %s)...' % (group.name, groupIdx + 1,
-                                                len(groupList)))
-        callback.buildingGroup(group.name, groupIdx + 1, len(groupList))
-
-        childGroups = recipeObj.getChildGroups(group.name)
-        groupMap = recipeObj.getGroupMap()
-
-        # add troves to this group.
-        if isinstance(group, SingleGroup):
-            unmatchedGlobalReplaceSpecs &= addTrovesToGroup(group, troveMap,
-                                                        cache, childGroups,
-                                                        repos, groupMap,
-                                                        recipeObj)
-
-        log.debug('Troves in %s:' % group.name)
-        for troveTup, isStrong, byDefault, _, _ in \
-                sorted(group.iterTroveListInfo()):
-            extra = ''
-            if not byDefault:
-                extra += '[NotByDefault]'
-            if not isStrong:
-                extra += '[Weak]'
-            log.debug(' %s=%s[%s] %s' % (troveTup + (extra,)))
-
-        if group.isEmpty():
-            raise CookError('%s has no troves in it' % group.name)
+    depState = GroupDependencyState(cfg, cache, labelPath, flavor)
+    try:
+        for groupIdx, group in enumerate(groupList):
+            log.info('Building %s (%s of %s)...' % (group.name, groupIdx + 1,
+                                                    len(groupList)))
+            callback.buildingGroup(group.name, groupIdx + 1, len(groupList))
+
+            childGroups = recipeObj.getChildGroups(group.name)
+            groupMap = recipeObj.getGroupMap()
+
+            # add troves to this group.
+            if isinstance(group, SingleGroup):
+                unmatchedGlobalReplaceSpecs &= addTrovesToGroup(group, troveMap,
+                                                            cache, childGroups,
+                                                            repos, groupMap,
+                                                            recipeObj)
+
+            log.debug('Troves in %s:' % group.name)
+            for troveTup, isStrong, byDefault, _, _ in \
+                    sorted(group.iterTroveListInfo()):
+                extra = ''
+                if not byDefault:
+                    extra += '[NotByDefault]'
+                if not isStrong:
+                    extra += '[Weak]'
+                log.debug(' %s=%s[%s] %s' % (troveTup + (extra,)))
+
+            if group.isEmpty():
+                raise CookError('%s has no troves in it' % group.name)
+
+            if group.autoResolve:
+                callback.done()
+                log.info('Resolving dependencies...')
+                resolveGroupDependencies(group, cache, cfg,
+                                         repos, labelPath, flavor, callback,
+                                         resolveSource, depState = depState)
+            elif group.depCheck:
+                callback.done()
+                log.info('Checking for dependency closure...')
+                failedDeps = checkGroupDependencies(group, cfg, cache,
+                                                    callback,
+                                                    depState = depState)
+                if failedDeps:
+                    raise GroupDependencyFailure(group.name, failedDeps)
+
+            addPackagesForComponents(group, repos, cache)
+            if isinstance(group, SingleGroup):
+                checkForRedirects(group, repos, cache, cfg.buildFlavor)
 
-        if group.autoResolve:
             callback.done()
-            log.info('Resolving dependencies...')
-            resolveGroupDependencies(group, cache, cfg,
-                                     repos, labelPath, flavor, callback,
-                                     resolveSource)
-        elif group.depCheck:
-            callback.done()
-            log.info('Checking for dependency closure...')
-            failedDeps = checkGroupDependencies(group, cfg, cache, callback)
-            if failedDeps:
-                raise GroupDependencyFailure(group.name, failedDeps)
-
-        addPackagesForComponents(group, repos, cache)
-        if isinstance(group, SingleGroup):
-            checkForRedirects(group, repos, cache, cfg.buildFlavor)
+            log.info('Calculating size and checking hashes...')
+            conflicts = calcSizeAndCheckHashes(group, cache, callback)
 
-        callback.done()
-        log.info('Calculating size and checking hashes...')
-        conflicts = calcSizeAndCheckHashes(group, cache, callback)
+            if conflicts:
+                groupsWithConflicts[group.name] = conflicts
 
-        if conflicts:
-            groupsWithConflicts[group.name] = conflicts
-
-        callback.groupBuilt()
-        log.info('%s built.\n' % group.name)
+            callback.groupBuilt()
+            log.info('%s built.\n' % group.name)
+    finally:
+        depState.done()
 
     if unmatchedGlobalReplaceSpecs:
         log.warning(GroupUnmatchedGlobalReplaces(unmatchedGlobalReplaceSpecs))
@@ -2841,23 +2847,62 @@ def getResolveSource(searchSource, troveSpecList, troveMap, cache, flavor):
     return searchsource.createSearchSourceStack(searchSource, [resolveTroves],
                                                 flavor)
 
+class GroupDependencyState(object):
+    """
+    The client and dependency checker shared by the dependency resolution
+    and closure checks of all of the groups built by one cook.  Groups are
+    built children first, so the troves of the group checked last are
+    usually a subset of those of the next one; the checker then only has
+    to add the new troves instead of starting over.
+    """
+    def __init__(self, cfg, cache, labelPath = None, flavor = None):
+        cfg = copy.deepcopy(cfg)
+        cfg.dbPath  = ':memory:'
+        cfg.root = ':memory:'
+        if labelPath is not None:
+            cfg.installLabelPath = labelPath
+        cfg.autoResolve = True
+        if flavor is not None:
+            cfg.flavor = [ flavor ]
+        self.cfg = cfg
+        self.cache = cache
+        self.client = None
+        self.checker = None
+
+    def getClient(self):
+        if self.client is None:
+            self.client = conaryclient.ConaryClient(self.cfg)
+        return self.client
+
+    def getChecker(self):
+        if self.checker is None:
+            self.checker = self.getClient().db.getDepStateClass(self.cache,
+                    findOrdering = False,
+                    ignoreDepClasses = [ deps.AbiDependency,
+                                         deps.RpmLibDependencies ])
+        return self.checker
+
+    def done(self):
+        if self.checker is not None:
+            self.checker.done()
+            self.checker = None
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
 def resolveGroupDependencies(group, cache, cfg, repos, labelPath, flavor,
-                             callback, resolveSource):
+                             callback, resolveSource, depState = None):
     """
         Add in any missing dependencies to group
     """
     callback.groupResolvingDependencies()
 
-    # set up configuration
-    cfg = copy.deepcopy(cfg)
-    cfg.dbPath  = ':memory:'
-    cfg.root = ':memory:'
-    cfg.installLabelPath = labelPath
-    cfg.autoResolve = True
-    cfg.flavor = [ flavor ]
+    if depState is None:
+        depState = GroupDependencyState(cfg, cache, labelPath, flavor)
+    cfg = depState.cfg
 
-    # set up a conaryclient to do the dep solving
-    client = conaryclient.ConaryClient(cfg)
+    # the conaryclient to do the dep solving
+    client = depState.getClient()
 
     def findDeps(troveList, byDefault=True, resolved=None):
         # Handle no byDefault=True troves
@@ -2955,7 +3000,7 @@ def resolveGroupDependencies(group, cache, cfg, repos, labelPath, flavor,
 
     callback.done()
 
-def checkGroupDependencies(group, cfg, cache, callback):
+def checkGroupDependencies(group, cfg, cache, callback, depState = None):
     callback.groupCheckingDependencies()
     if group.checkOnlyByDefaultDeps:
         troveList = list(group.iterDefaultTroveList())
@@ -2967,16 +3012,9 @@ def checkGroupDependencies(group, cfg, cache, callback):
                 if not (cache.troveIsCached((n,v,f))
                    and cache.isRedirect((n,v,f))) ]
 
-    cfg = copy.deepcopy(cfg)
-    cfg.dbPath = ':memory:'
-    cfg.root   = ':memory:'
-
-    client = conaryclient.ConaryClient(cfg)
-
-    checker = client.db.getDepStateClass(cache,
-                    findOrdering = False,
-                    ignoreDepClasses = [ deps.AbiDependency,
-                                         deps.RpmLibDependencies ])
+    if depState is None:
+        depState = GroupDependencyState(cfg, cache)
+    checker = depState.getChecker()
     depResult = checker.depCheck(jobSet)
     failedDeps = depResult.unsatisfiedList
     callback.done()
@@ -3003,48 +3041,60 @@ def _getHashConflicts(group, troveCache, callback):
 
     # Find all troves that have conflicting pathHashes
     conflictLists = {}
+    troveHashes = {}
     for troveTup, pathHashes in neededInfo:
         if pathHashes is None:
             continue
         for pathHash in conflictPaths & pathHashes:
             conflictLists.setdefault(pathHash, set()).add(troveTup)
+            troveHashes.setdefault(troveTup, set()).add(pathHash)
 
     callback.groupDeterminingPathConflicts(len(conflictLists))
 
-    # get the troves into a simple dict; it's easier than calling
-    # troveCache.getTroves([something], withFiles=True)[0]
-    # over and over
-    allTrovesNeeded = list(set(chain(*conflictLists.values())))
+    conflictSets = set(frozenset(x) for x in conflictLists.itervalues())
+
+    # only the troves with colliding hashes need their file lists, and
+    # only their files at colliding paths are kept
+    allTrovesNeeded = list(troveHashes)
     trovesWithFiles = dict( (troveTup, trv) for troveTup, trv in
                         izip(allTrovesNeeded,
                              troveCache.getTroves(allTrovesNeeded,
                                                   withFiles = True) ) )
-
-    conflictSets = set(tuple(x) for x in conflictLists.itervalues())
-    fileMap = dict((x, [ y for y in trovesWithFiles[x].iterFileList() ])
-        for x in set(chain(*conflictSets)))
+    fileMap = {}
+    for troveTup, trv in trovesWithFiles.iteritems():
+        hashes = troveHashes[troveTup]
+        pathMap = fileMap[troveTup] = {}
+        for fileInfo in trv.iterFileList():
+            pathHash = sha1helper.md5String(fileInfo[1])[0:8]
+            if pathHash in hashes:
+                pathMap.setdefault(fileInfo[1], (pathHash, []))[1].append(
+                                                                fileInfo)
 
     # We've got the sets of conflicting troves, now
     # determine the set of conflicting files.
     conflictsWithFiles = []
     for conflictSet in conflictSets:
-        # Build set of paths which conflicts across these troves
+        conflictSet = tuple(conflictSet)
+        # Build set of paths which conflicts across these troves. Only
+        # paths whose hashes collide in all of them can qualify.
+        hashes = set.intersection(*[ troveHashes[x] for x in conflictSet ])
         conflictingPaths = None
         for tup in conflictSet:
-            newPaths = set(x[1] for x in fileMap[tup])
+            newPaths = set(path for path, (pathHash, fileInfo)
+                                in fileMap[tup].iteritems()
+                                if pathHash in hashes)
             if conflictingPaths is None:
                 conflictingPaths = newPaths
             else:
                 conflictingPaths &= newPaths
 
         # If all of the troves share the same fileId for a path,
-        # it's not actually conflicting. This is expensive because
-        # we can't look up a path in a trove, just pathIds.
+        # it's not actually conflicting.
         paths = []
         for path in conflictingPaths:
             fileInfo = set()
             for tup in conflictSet:
-                fileInfo |= set(x for x in fileMap[tup] if x[1] == path)
+                fileInfo.update(fileMap[tup][path][1])
 
             if len(set(x[2] for x in fileInfo)) > 1:
                 paths.append((path, fileInfo))
@@ -1828,7 +1828,12 @@ class _GroupSetRecipe(_BaseGroupRecipe):
     def _realizeGraph(self, cache, callback):
         data = GroupActionData(troveCache = GroupSetTroveCache(self, cache),
                                groupRecipe = self)
-        self.g.realize(data)
+
+        def timer(nodeList, elapsed):
+            log.debug("%.2fs for %s" % (elapsed, ", ".join(
+                        str(x).replace(r'\n', ' ') for x in nodeList)))
+
+        self.g.realize(data, timer = timer)
 
         ordering = self.g.getTotalOrdering()
 
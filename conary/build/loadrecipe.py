@@ -19,6 +19,7 @@ import copy
 import imp
 import inspect
 import itertools
+import marshal
 import new
 import os
 import string
@@ -26,6 +27,7 @@ import sys
 import types
 import tempfile
 import traceback
+from StringIO import StringIO
 
 from conary.repository import errors, trovesource
 from conary.build import defaultrecipes
@@ -35,11 +37,121 @@ from conary.build.errors import RecipeFileError
 from conary.build.factory import Factory as FactoryRecipe
 from conary.conaryclient import cmdline
 from conary.deps import deps
-from conary.lib import api, graph, log, util
+from conary.lib import api, digestlib, graph, log, util
 from conary.local import database
 from conary import trove
 from conary import versions
 
+def _setCodeFileName(code, fileName):
+    consts = tuple((isinstance(x, types.CodeType) and
+                        _setCodeFileName(x, fileName)) or x
+                   for x in code.co_consts)
+    return types.CodeType(code.co_argcount, code.co_nlocals,
+                          code.co_stacksize, code.co_flags, code.co_code,
+                          consts, code.co_names, code.co_varnames, fileName,
+                          code.co_name, code.co_firstlineno, code.co_lnotab,
+                          code.co_freevars, code.co_cellvars)
+
+class RecipeCache(object):
+    """
+    Process-wide cache of what loading a recipe fetches or computes that
+    depends only on its inputs: compiled recipe code, keyed by the text
+    of the recipe; recipe files from the repository, keyed by fileId; and
+    source troves, keyed by their exact version including timestamps.
+    Loading the same superclass for many recipes, or the same recipe for
+    many flavors, then costs one fetch and one compile.  Compiled code
+    is also kept in cfg.recipeCacheDir when that is set.
+    """
+    maxEntries = 2000
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.code = {}
+        self.files = {}
+        self.troves = {}
+
+    def _add(self, cache, key, value):
+        if len(cache) >= self.maxEntries:
+            cache.clear()
+        cache[key] = value
+
+    @staticmethod
+    def _getCodePath(cacheDir, key):
+        # marshalled code is only valid for the same bytecode version
+        return os.path.join(cacheDir, imp.get_magic().encode('hex'), key)
+
+    def _readCode(self, cacheDir, key):
+        try:
+            f = open(self._getCodePath(cacheDir, key))
+            try:
+                code = marshal.load(f)
+            finally:
+                f.close()
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(code, types.CodeType):
+            return None
+        return code
+
+    def _writeCode(self, cacheDir, key, code):
+        path = self._getCodePath(cacheDir, key)
+        try:
+            util.mkdirChain(os.path.dirname(path))
+            fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(path),
+                                           suffix='.tmp')
+            f = os.fdopen(fd, 'w')
+            try:
+                marshal.dump(code, f)
+            finally:
+                f.close()
+            os.rename(tmpPath, path)
+        except (IOError, OSError), e:
+            log.debug('could not save compiled recipe in %s: %s', cacheDir, e)
+
+    def compile(self, codeString, fileName, cacheDir=None):
+        """
+        Returns codeString compiled for exec, as if from fileName.
+        Raises SyntaxError like compile().
+        """
+        key = digestlib.sha1(codeString).hexdigest()
+        code = self.code.get(key)
+        if code is None and cacheDir:
+            code = self._readCode(cacheDir, key)
+        if code is None:
+            code = compile(codeString, fileName, 'exec')
+            if cacheDir:
+                self._writeCode(cacheDir, key, code)
+        self._add(self.code, key, code)
+        # recipes from the repository are loaded from temporary files,
+        # so the same text is seen under different names
+        if code.co_filename != fileName:
+            code = _setCodeFileName(code, fileName)
+        return code
+
+    def getFileContents(self, repos, fileId, fileVersion):
+        """
+        Returns a file object with the contents of a (small) file from
+        the repository.
+        """
+        contents = self.files.get(fileId)
+        if contents is None:
+            contents = repos.getFileContents(
+                                [ (fileId, fileVersion) ])[0].get().read()
+            self._add(self.files, fileId, contents)
+        return StringIO(contents)
+
+    def getTrove(self, repos, name, version, flavor):
+        key = (name, version.freeze(), flavor.freeze())
+        trv = self.troves.get(key)
+        if trv is None:
+            trv = repos.getTrove(name, version, flavor)
+            self._add(self.troves, key, trv)
+        return trv.copy()
+
+_recipeCache = RecipeCache()
+
 class SubloadData(object):
 
     # Collector for all of the data loadSuperClass and loadInstalled
@@ -307,8 +419,12 @@ class Importer(object):
         return self._loadRecipe(troveSpec, label, True)
 
     def execString(self, codeString):
+        cacheDir = None
+        if self.subloadData is not None:
+            cacheDir = getattr(self.subloadData.cfg, 'recipeCacheDir', None)
         try:
-            code = compile(codeString, self.fileName, 'exec')
+            code = _recipeCache.compile(codeString, self.fileName,
+                                        cacheDir = cacheDir)
         except SyntaxError, err:
             msg = ('Error in recipe file "%s": %s\n' %(self.baseName, err))
             if err.offset is not None:
@@ -756,8 +872,12 @@ class RecipeLoaderFromSourceTrove(RecipeLoader):
         self.recipes = {}
 
         if getFileFunction is None:
-            getFileFunction = lambda repos, fileId, fileVersion, path: \
-                    repos.getFileContents([ (fileId, fileVersion) ])[0].get()
+            def getFileFunction(repos, fileId, fileVersion, path):
+                if path.endswith('.recipe'):
+                    return _recipeCache.getFileContents(repos, fileId,
+                                                        fileVersion)
+                return repos.getFileContents(
+                                        [ (fileId, fileVersion) ])[0].get()
 
         name = sourceTrove.getName().split(':')[0]
 
@@ -928,7 +1048,7 @@ class RecipeLoaderFromRepository(RecipeLoaderFromSourceTrove):
                        ', '.join(x.asString() for x in labelPath),
                        ', '.join('%s=%s' % x[:2] for x in pkgs)))
 
-        sourceComponent = repos.getTrove(*pkgs[0])
+        sourceComponent = _recipeCache.getTrove(repos, *pkgs[0])
 
         RecipeLoaderFromSourceTrove.__init__(self, sourceComponent, repos, cfg,
                  versionStr=versionStr, labelPath=labelPath,
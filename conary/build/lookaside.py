@@ -22,7 +22,9 @@ downloads and unpacking layers of files.
 import cookielib
 import errno
 import os
+import Queue
 import socket
+import threading
 import time
 import urllib
 import urllib2
@@ -39,6 +41,8 @@ NETWORK_SCHEMES = ('http', 'https', 'ftp', 'mirror')
 
 NEGATIVE_CACHE_TTL = 60 * 60  # The TTL for negative cache entries (seconds)
 
+PREFETCH_THREADS = 4  # Maximum number of concurrent prefetch downloads
+
 
 class laUrl(object):
     '''This object splits a url string into its various components and stores
@@ -209,6 +213,10 @@ class FileFinder(object):
         self.multiurlMap = multiurlMap
         self.mirrorDirs = mirrorDirs
         self.noproxyFilter = util.noproxyFilter()
+        # urls downloaded, or that failed, during prefetch()
+        self.prefetchDownloaded = set()
+        self.prefetchFailed = set()
+        self._logBuffer = threading.local()
 
     def fetch(self, urlStr, suffixes=None, archivePath=None, headers=None,
               allowNone=False, searchMethod=0,  # SEARCH_ALL
@@ -230,12 +238,116 @@ class FileFinder(object):
                           urlStr)
         return None, None
 
+    def prefetch(self, requests, refreshFilter=None,
+                 maxThreads=PREFETCH_THREADS):
+        """
+        Download the network sources needed to satisfy later calls to
+        L{fetch} into the lookaside cache, using up to C{maxThreads}
+        concurrent downloads.  Each request is a tuple of
+        C{(urlStr, suffixes, headers, searchMethod)}.  Candidate urls
+        (mirrors, multiurl entries and suffixes) are tried in the same
+        order as L{fetch} tries them, and sources which will be found in
+        the repository, a local directory or the cache are not
+        downloaded.  Messages are logged in request order once all the
+        downloads finish; errors are left for L{fetch} to report.
+        """
+        queue = Queue.Queue()
+        seen = set()
+        messages = []
+        for request in requests:
+            urlStr, suffixes, headers, searchMethod = request
+            if searchMethod == self.SEARCH_LOCAL_ONLY:
+                continue
+            key = (urlStr, suffixes, searchMethod)
+            if key not in seen:
+                seen.add(key)
+                messages.append([])
+                queue.put((request, messages[-1]))
+        if not messages:
+            return
+
+        claimed = {}
+        lock = threading.Lock()
+        def worker():
+            while True:
+                try:
+                    request, self._logBuffer.messages = queue.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    self._prefetchOne(request, refreshFilter, claimed, lock)
+                except Exception, e:
+                    # fetch() will try this source again and report
+                    self._log('debug', 'error prefetching %s: %s',
+                              request[0], e)
+
+        threads = [ threading.Thread(target=worker)
+                    for x in range(min(maxThreads, len(messages))) ]
+        for thread in threads:
+            thread.setDaemon(True)
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for requestMessages in messages:
+            for level, msg, args in requestMessages:
+                getattr(log, level)(msg, *args)
+
+    def _log(self, level, msg, *args):
+        # messages from prefetch() worker threads are buffered
+        messages = getattr(self._logBuffer, 'messages', None)
+        if messages is not None:
+            messages.append((level, msg, args))
+        else:
+            getattr(log, level)(msg, *args)
+
+    def _prefetchOne(self, request, refreshFilter, claimed, lock):
+        urlStr, suffixes, headers, searchMethod = request
+        for url in self._getPathsToSearch(urlStr, suffixes):
+            cachePath = self.repCache.getCachePath(self.recipeName, url)
+            lock.acquire()
+            try:
+                # mirrors of one source share a cache path; only give up
+                # if another request is fetching the same file
+                if claimed.setdefault(cachePath, request) is not request:
+                    return
+            finally:
+                lock.release()
+
+            refresh = checkRefreshFilter(refreshFilter, url)
+            try:
+                # mirror the search order used by _fetch
+                if searchMethod == self.SEARCH_ALL:
+                    self.searchFilesystem(url)
+                if refresh:
+                    self._prefetchUrl(url, headers)
+                if self.repCache.hasFilePath(url):
+                    return
+                if searchMethod == self.SEARCH_ALL:
+                    self.searchLocalCache(url)
+                    if not refresh:
+                        self._prefetchUrl(url, headers)
+            except PathFound:
+                return
+
+    def _prefetchUrl(self, url, headers):
+        try:
+            self.searchNetworkSources(url, headers,
+                                      callback=callbacks.FetchCallback())
+        except PathFound:
+            self.prefetchDownloaded.add(str(url))
+            raise
+        self.prefetchFailed.add(str(url))
+
     def _fetch(self, url, archivePath, searchMethod, headers=None,
                refreshFilter=None):
         if isinstance(url, str):
             url = laUrl(url)
 
         refresh = checkRefreshFilter(refreshFilter, url)
+        if refresh and str(url) in self.prefetchDownloaded:
+            # already downloaded again by prefetch()
+            refresh = False
         if searchMethod == self.SEARCH_LOCAL_ONLY:
             self.searchFilesystem(url)
             return
@@ -280,18 +392,22 @@ class FileFinder(object):
         if path:
             raise PathFound(path, True)
 
-    def searchNetworkSources(self, url, headers):
+    def searchNetworkSources(self, url, headers, callback=None):
         if url.scheme not in NETWORK_SCHEMES:
             return
+        if str(url) in self.prefetchFailed:
+            # prefetch() already tried and created the negative cache entry
+            return
 
         # check for negative cache entries to avoid spamming servers
         negativePath = self.repCache.checkNegativeCache(self.recipeName, url)
         if negativePath:
-            log.warning('not fetching %s (negative cache entry %s exists)',
-                        url, negativePath)
+            self._log('warning',
+                      'not fetching %s (negative cache entry %s exists)',
+                      url, negativePath)
             return
 
-        log.info('Trying %s...', str(url))
+        self._log('info', 'Trying %s...', str(url))
         if headers is None:
             headers = {}
 
@@ -301,7 +417,8 @@ class FileFinder(object):
         else:
             contentLength = int(inFile.headers.get('Content-Length', 0))
             path = self.repCache.addFileToCache(self.recipeName, url,
-                                                inFile, contentLength)
+                                                inFile, contentLength,
+                                                callback=callback)
             if path:
                 raise PathFound(path, False)
         return
@@ -402,13 +519,13 @@ class FileFinder(object):
                     content_type = inFile.info()['content-type']
                     if not url.explicit() and 'text/html' in content_type:
                         raise urllib2.URLError('"%s" not found' % urlStr)
-                log.info('Downloading %s...', urlStr)
+                self._log('info', 'Downloading %s...', urlStr)
                 break
             except urllib2.HTTPError, msg:
                 if msg.code == 404:
                     return None
                 else:
-                    log.error('error downloading %s: %s',
+                    self._log('error', 'error downloading %s: %s',
                               urlStr, str(msg))
                     return None
             except urllib2.URLError:
@@ -416,9 +533,9 @@ class FileFinder(object):
             except socket.error, err:
                 num, msg = err
                 if num == errno.ECONNRESET:
-                    log.info('Connection Reset by server'
-                             'while retrieving %s.'
-                             '  Retrying in 10 seconds.', urlStr, msg)
+                    self._log('info', 'Connection Reset by server'
+                              'while retrieving %s.'
+                              '  Retrying in 10 seconds.', urlStr, msg)
                     time.sleep(10)
                     retries += 1
                 else:
@@ -431,8 +548,8 @@ class FileFinder(object):
                     return None
                 response = msg.args[1].args[0]
                 if isinstance(response, str) and response.startswith('421'):
-                    log.info('FTP server busy when retrieving %s.'
-                             '  Retrying in 10 seconds.', urlStr)
+                    self._log('info', 'FTP server busy when retrieving %s.'
+                              '  Retrying in 10 seconds.', urlStr)
                     time.sleep(10)
                     retries += 1
                 else:
@@ -515,7 +632,8 @@ class RepositoryCache(object):
         self.cacheMap[url.filePath()] = cachePath
         return cachePath
 
-    def addFileToCache(self, cachePrefix, url, infile, contentLength):
+    def addFileToCache(self, cachePrefix, url, infile, contentLength,
+                       callback=None):
         # cache needs to be hierarchical to avoid collisions, thus we
         # use cachePrefix so that files with the same name and different
         # contents in different packages do not collide
@@ -526,10 +644,11 @@ class RepositoryCache(object):
         try:
             BLOCKSIZE = 1024 * 4
 
-            if self.quiet:
-                callback = callbacks.FetchCallback()
-            else:
-                callback = FetchCallback()
+            if callback is None:
+                if self.quiet:
+                    callback = callbacks.FetchCallback()
+                else:
+                    callback = FetchCallback()
 
             wrapper = callbacks.CallbackRateWrapper(callback, callback.fetch,
                                                     contentLength)
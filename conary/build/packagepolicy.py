@@ -29,6 +29,7 @@ import sre_constants
 import stat
 import subprocess
 import sys
+import threading
 
 from conary import files, trove
 from conary.build import buildpackage, filter, policy, recipe, tags, use
@@ -48,6 +49,14 @@ except ImportError:
         ElementTree = None
 
 
+def _getWorkerCount():
+    # number of concurrent helper processes for dependency discovery
+    try:
+        return max(1, os.sysconf('SC_NPROCESSORS_ONLN'))
+    except (ValueError, OSError, AttributeError):
+        return 1
+
+
 # Helper class
 class _DatabaseDepCache(object):
     __slots__ = ['db', 'cache']
@@ -638,15 +647,41 @@ class PackageSpec(_filterSpec):
         self.autopkg = recipe.autopkg
 
     def do(self):
-        # Walk capsule contents ignored by doFile
-        for filePath, _, componentName in self.recipe._iterCapsulePaths():
-            realPath = self.destdir + filePath
-            if util.exists(realPath):
-                # Files that do not exist on the filesystem (devices)
-                # are handled separately
-                self.autopkg.addFile(filePath, realPath, componentName)
-        # Walk normal files
-        _filterSpec.do(self)
+        # hash file contents in the background while the files are
+        # assigned to components
+        self.autopkg.startHashing(self._getRegularFiles())
+        try:
+            # Walk capsule contents ignored by doFile
+            for filePath, _, componentName in \
+                    self.recipe._iterCapsulePaths():
+                realPath = self.destdir + filePath
+                if util.exists(realPath):
+                    # Files that do not exist on the filesystem (devices)
+                    # are handled separately
+                    self.autopkg.addFile(filePath, realPath, componentName)
+            # Walk normal files
+            _filterSpec.do(self)
+        finally:
+            self.autopkg.stopHashing()
+
+    def _getRegularFiles(self):
+        # in the order the policy walk will visit them
+        paths = []
+        snapshot = self.treeSnapshot
+        def collect(arg, dirName, names):
+            for name in names:
+                path = dirName + os.sep + name
+                if snapshot is not None:
+                    isReg = snapshot.fileType(path) == stat.S_IFREG
+                else:
+                    isReg = stat.S_ISREG(os.lstat(path).st_mode)
+                if isReg:
+                    paths.append(path)
+        if snapshot is not None:
+            snapshot.walk(self.destdir, collect, None)
+        else:
+            os.path.walk(self.destdir, collect, None)
+        return paths
 
     def doFile(self, path):
         # all policy classes after this require that the initial tree is built
@@ -3388,6 +3423,9 @@ class Requires(_addInfo, _dependency):
         self._CILPolicyProvides = {}
         self.pythonSysPathMap = {}
         self.pythonModuleFinderMap = {}
+        self.pythonPathCache = {}
+        self.pythonDepsCache = {}
+        self.perlReqsCache = {}
         self.troveDeps = {}
         policy.Policy.__init__(self, *args, **keywords)
         self.depCache = self.dbDepCacheClass(self._getDb())
@@ -3548,6 +3586,52 @@ class Requires(_addInfo, _dependency):
             for trove in troves:
                 components[trove].requires.addDep(depClass, dep)
 
+    def do(self):
+        if self.__class__.doFile.im_func is not Requires.doFile.im_func:
+            # subclasses with their own doFile() do not use the scanners
+            return policy.Policy.do(self)
+
+        # The perl and python scanners are run for all of the files up
+        # front, concurrently with each other; doFile() then uses their
+        # results for each file in the usual order, so the dependencies
+        # found do not change.
+        pathList = [ x for x in sorted(self.recipe.autopkg.pathMap)
+                     if self._pathAllowed(x) ]
+        perlPaths = []
+        pythonPaths = []
+        for path in pathList:
+            pkgs = self.recipe.autopkg.findComponents(path)
+            if not pkgs:
+                continue
+            f = pkgs[0].getFile(path)
+            m = self.recipe.magic[path]
+            if self._needsPythonRequirements(path, m, f):
+                pythonPaths.append(path)
+            if self._isPerl(path, m, f):
+                perlPaths.append(path)
+
+        try:
+            threads = self._scanPythonRequirements(pythonPaths)
+            for thread in threads:
+                thread.start()
+            try:
+                self._scanPerlReqs(perlPaths)
+            finally:
+                for thread in threads:
+                    thread.join()
+
+            for path in pathList:
+                self.doFile(path)
+        finally:
+            self.pythonDepsCache.clear()
+            self.perlReqsCache.clear()
+
+    def _needsPythonRequirements(self, path, m, f):
+        if (f.inode.perms() & 0111 and m and m.name == 'script' and
+            os.path.basename(m.contents['interpreter']).startswith('python')):
+            return True
+        return self._isPython(path)
+
     def doFile(self, path):
         pkgs = self.recipe.autopkg.findComponents(path)
         if not pkgs:
@@ -3592,10 +3676,7 @@ class Requires(_addInfo, _dependency):
                 self._addRequirement(path, interp, [], pkgFiles,
                                      deps.FileDependencies)
 
-        if (f.inode.perms() & 0111 and m and m.name == 'script' and
-            os.path.basename(m.contents['interpreter']).startswith('python')):
-            self._addPythonRequirements(path, fullpath, pkgFiles)
-        elif self._isPython(path):
+        if self._needsPythonRequirements(path, m, f):
             self._addPythonRequirements(path, fullpath, pkgFiles)
 
         if (f.inode.perms() & 0111 and m and m.name == 'script' and
@@ -3753,7 +3834,12 @@ class Requires(_addInfo, _dependency):
         # Returns tuple:
         #  (sysPath, pythonModuleFinder, pythonVersion)
 
-        pythonPath, bootstrapPython = self._getPython(self.macros, pathName)
+        # _getPython() warns about missing interpreters, and is called
+        # both when scanning and when adding the requirements
+        if pathName not in self.pythonPathCache:
+            self.pythonPathCache[pathName] = self._getPython(self.macros,
+                                                             pathName)
+        pythonPath, bootstrapPython = self.pythonPathCache[pathName]
         if not pythonPath:
             return (None, None, None)
         if pythonPath in self.pythonSysPathMap:
@@ -3812,6 +3898,42 @@ class Requires(_addInfo, _dependency):
             if finder is not None:
                 finder.close()
 
+    def _scanPythonRequirements(self, pathList):
+        """
+        Returns a list of threads which run the module finders over the
+        python files in pathList, filling in pythonDepsCache.  Each finder
+        gets its files in the order _addPythonRequirements() would give
+        them to it, because what a module finder reports for a file
+        depends on the files it has loaded before.
+        """
+        destdir = self.macros.destdir
+        finders = []
+        pathsByFinder = {}
+        for path in pathList:
+            sysPath, pythonModuleFinder, _ = \
+                self._getPythonRequiresSysPath(path)
+            if not sysPath or not pythonModuleFinder:
+                continue
+            if pythonModuleFinder not in pathsByFinder:
+                finders.append(pythonModuleFinder)
+            pathsByFinder.setdefault(pythonModuleFinder, []).append(
+                                                            destdir + path)
+
+        def scan(pythonModuleFinder, fullPaths):
+            try:
+                for fullpath in fullPaths:
+                    pythonModuleFinder.load_file(fullpath)
+                    self.pythonDepsCache[fullpath] = \
+                        pythonModuleFinder.getDepsForPath(fullpath)
+            except (pydeps.ModuleFinderProtocolError,
+                    pydeps.ModuleFinderProtocolErrorNoData, IOError):
+                # _addPythonRequirements() fails the same way for the
+                # rest of the files and reports it
+                pass
+
+        return [ threading.Thread(target=scan,
+                                  args=(x, pathsByFinder[x]))
+                 for x in finders ]
 
     def _addPythonRequirements(self, path, fullpath, pkgFiles):
         destdir = self.recipe.macros.destdir
@@ -3830,8 +3952,10 @@ class Requires(_addInfo, _dependency):
             # consistency).
             return
 
-        pythonModuleFinder.load_file(fullpath)
-        data = pythonModuleFinder.getDepsForPath(fullpath)
+        data = self.pythonDepsCache.pop(fullpath, None)
+        if data is None:
+            pythonModuleFinder.load_file(fullpath)
+            data = pythonModuleFinder.getDepsForPath(fullpath)
         if data['result'] != 'ok':
             self.info('File %s is not a valid python file', path)
             return
@@ -4032,7 +4156,11 @@ class Requires(_addInfo, _dependency):
         else:
             self.perlIncArgs = ' '.join('-I'+x for x in perlIncPath)
 
-    def _getPerlReqs(self, path, fullpath):
+    def _getPerlReqsCommand(self):
+        """
+        Returns the command which runs perlreqs.pl, or False if perl
+        requirements are disabled.
+        """
         if self.perlReqs is None:
             self._fetchPerl()
             if not self.perlPath:
@@ -4040,7 +4168,7 @@ class Requires(_addInfo, _dependency):
                 self.info('Unable to find perl interpreter,'
                            ' disabling perl: requirements')
                 self.perlReqs = False
-                return []
+                return False
             # get the base directory where conary lives.  In a checked
             # out version, this would be .../conary/conary/build/package.py
             # chop off the last 3 directories to find where
@@ -4071,7 +4199,76 @@ class Requires(_addInfo, _dependency):
                 perlreqs = '%s/libexec/conary/perlreqs.pl' %prefix
             self.perlReqs = '%s -I%s %s %s' %(
                 self.perlPath, scandeps, self.perlIncArgs, perlreqs)
-        if self.perlReqs is False:
+        return self.perlReqs
+
+    def _parsePerlReqs(self, lines):
+        reqlist = [x.strip().split('//') for x in lines]
+        # we care only about modules right now
+        # throwing away the filenames for now, but we might choose
+        # to change that later
+        reqlist = [x[2] for x in reqlist if x[0] == 'module']
+        # foo/bar/baz.pm -> foo::bar::baz
+        reqlist = ['::'.join(x.split('/')).rsplit('.', 1)[0] for x in reqlist]
+
+        return reqlist
+
+    def _scanPerlReqs(self, pathList):
+        """
+        Runs perlreqs.pl for the files in pathList, in as many long-lived
+        processes as there are CPUs, filling in perlReqsCache.  Files
+        which are not scanned here are scanned by _getPerlReqs().
+        """
+        pathList = [ x for x in pathList if '\n' not in x ]
+        if not pathList or not self._getPerlReqsCommand():
+            return
+
+        destdir = self.macros.destdir
+        workers = min(_getWorkerCount(), len(pathList))
+        batches = [ pathList[i::workers] for i in range(workers) ]
+        results = [ None ] * workers
+
+        def scan(i):
+            # perlreqs.pl reads the paths from stdin when it is not
+            # given one as an argument
+            proc = subprocess.Popen(self.perlReqs, shell=True,
+                                    stdin=subprocess.PIPE,
+                                    stdout=subprocess.PIPE, close_fds=True)
+            stdout, _ = proc.communicate(
+                ''.join('%s%s\n' % (destdir, x) for x in batches[i]))
+            if not proc.returncode:
+                results[i] = stdout
+
+        threads = [ threading.Thread(target=scan, args=(i,))
+                    for i in range(workers) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for batch, stdout in itertools.izip(batches, results):
+            if stdout is None:
+                continue
+            outputs = []
+            lines = []
+            for line in stdout.split('\n')[:-1]:
+                if line:
+                    lines.append(line)
+                else:
+                    outputs.append(lines)
+                    lines = []
+            if len(outputs) != len(batch):
+                continue
+            for path, lines in itertools.izip(batch, outputs):
+                if '//error' in lines:
+                    # Apparantly ScanDeps could not handle this input
+                    self.perlReqsCache[path] = []
+                else:
+                    self.perlReqsCache[path] = self._parsePerlReqs(lines)
+
+    def _getPerlReqs(self, path, fullpath):
+        if path in self.perlReqsCache:
+            return self.perlReqsCache.pop(path)
+        if not self._getPerlReqsCommand():
             return []
 
         cwd = os.getcwd()
@@ -4083,7 +4280,7 @@ class Requires(_addInfo, _dependency):
                 os.chdir(cwd)
             except:
                 pass
-        reqlist = [x.strip().split('//') for x in p.readlines()]
+        lines = p.readlines()
         # make sure that the command completed successfully
         rc = p.close()
         if rc:
@@ -4092,14 +4289,7 @@ class Requires(_addInfo, _dependency):
             # Apparantly ScanDeps could not handle this input
             return []
 
-        # we care only about modules right now
-        # throwing away the filenames for now, but we might choose
-        # to change that later
-        reqlist = [x[2] for x in reqlist if x[0] == 'module']
-        # foo/bar/baz.pm -> foo::bar::baz
-        reqlist = ['::'.join(x.split('/')).rsplit('.', 1)[0] for x in reqlist]
-
-        return reqlist
+        return self._parsePerlReqs(lines)
 
     def _markManualRequirement(self, info, path, pkgFiles, m):
         flags = []
@@ -207,7 +207,12 @@ class AbstractPackageRecipe(Recipe):
     def doBuild(self, buildPath, resume=None):
         builddir = os.sep.join((buildPath, self.mainDir()))
         self.macros.builddir = builddir
-        self.magic = magic.magicCache(self.macros.destdir)
+        diskCache = None
+        if self.cfg.magicCacheSize > 0 and self.cfg.magicCacheDir:
+            diskCache = magic.MagicDiskCache(self.cfg.magicCacheDir,
+                                             self.cfg.magicCacheSize)
+        self.magic = magic.magicCache(self.macros.destdir, diskCache)
+        self.treeSnapshot = policy.TreeSnapshot()
         if resume == 'policy':
             return
         if resume:
@@ -22,7 +22,9 @@ Base classes and data used for all policy
 import imp
 import itertools
 import os
+import stat
 import sys
+import time
 import types
 
 from conary.lib import util, log, graph, sha1helper
@@ -60,6 +62,109 @@ CAPSULESCRIPTDIR = 1 << 3
 DIR              = DESTDIR|BUILDDIR|CAPSULESCRIPTDIR
 
 
+class TreeSnapshot(object):
+    """
+    Directory listings and file types of the trees walked by policy,
+    shared by all of the policies run for a recipe so that each file is
+    listed and stat'd once instead of once per policy.
+
+    A cached directory is checked again (with a single stat of the
+    directory) the first time it is used after L{revalidate} has been
+    called, which happens before each policy runs, and is reread if it
+    has changed.  Adding, removing, renaming or replacing a file changes
+    its directory, so a policy sees the changes made by earlier ones.
+    File types are cached rather than complete modes because changing
+    permissions does not change the directory.
+    """
+    def __init__(self):
+        # path -> (generation, dirKey, names, { name : fileType })
+        self._dirs = {}
+        self._generation = 0
+
+    def revalidate(self):
+        self._generation += 1
+
+    def _listDir(self, path):
+        entry = self._dirs.get(path)
+        if entry is not None and entry[0] == self._generation:
+            return entry
+
+        try:
+            # follows symlinks, like os.listdir() does
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISDIR(st.st_mode):
+            self._dirs.pop(path, None)
+            return None
+
+        dirKey = (st.st_dev, st.st_ino, st.st_mtime, st.st_ctime, st.st_size)
+        if entry is not None and entry[1] == dirKey:
+            names, fileTypes = entry[2:]
+        else:
+            names = os.listdir(path)
+            fileTypes = {}
+            for name in names:
+                try:
+                    fileTypes[name] = stat.S_IFMT(
+                                    os.lstat(path + os.sep + name).st_mode)
+                except OSError:
+                    pass
+            if int(time.time()) <= max(st.st_mtime, st.st_ctime):
+                # the directory could change again without its timestamps
+                # changing on filesystems with coarse timestamps; read it
+                # again next time
+                dirKey = None
+
+        entry = (self._generation, dirKey, names, fileTypes)
+        self._dirs[path] = entry
+        return entry
+
+    def listDir(self, path):
+        """
+        Returns the names in the directory path, or None if path is not
+        a directory.
+        """
+        entry = self._listDir(path)
+        if entry is None:
+            return None
+        return list(entry[2])
+
+    def fileType(self, path):
+        """
+        Returns the file type (as from C{stat.S_IFMT()}) of path, or None
+        if it does not exist.
+        """
+        dirName, baseName = os.path.split(path)
+        entry = self._listDir(dirName)
+        if entry is None:
+            return None
+        return entry[3].get(baseName)
+
+    def walk(self, top, func, arg):
+        """
+        Like C{os.path.walk()}, but uses the cached directory listings.
+        """
+        top = util.normpath(top)
+        entry = self._listDir(top)
+        if entry is None:
+            return
+        self._walk(top, entry, func, arg)
+
+    def _walk(self, top, entry, func, arg):
+        # func may prune names, as with os.path.walk()
+        names = list(entry[2])
+        fileTypes = entry[3]
+        func(arg, top, names)
+        for name in names:
+            if fileTypes.get(name) != stat.S_IFDIR:
+                continue
+            path = top + os.sep + name
+            entry = self._listDir(path)
+            if entry is not None:
+                self._walk(path, entry, func, arg)
+
+
 class BasePolicy(action.RecipeAction):
     """
     Abstract Superclass for all policy actions. Common bits between Policy
@@ -250,6 +355,7 @@ class Policy(BasePolicy):
     filetree = DESTDIR
     rootdir = None
     processUnmodified = None
+    treeSnapshot = None
 
     keywords = {
         'use': None,
@@ -367,6 +473,7 @@ class Policy(BasePolicy):
         """
         self.recipe = recipe
         self.macros = recipe.macros
+        self.treeSnapshot = getattr(recipe, 'treeSnapshot', None)
 
         if not self._isSupportedTarget():
             return
@@ -441,12 +548,21 @@ class Policy(BasePolicy):
             self.invariantsubtrees.extend(self.subtrees)
         if not self.invariantsubtrees:
             self.invariantsubtrees.append('/')
+        snapshot = self.treeSnapshot
         for self.currentsubtree in self.invariantsubtrees:
             fullpath = (self.rootdir+self.currentsubtree) %self.macros
             dirs = util.braceGlob(fullpath)
             for d in dirs:
                 if self.recursive:
-                    os.path.walk(d, self.walkDir, None)
+                    if snapshot is not None:
+                        snapshot.walk(d, self.walkDir, None)
+                    else:
+                        os.path.walk(d, self.walkDir, None)
+                elif snapshot is not None:
+                    # only one level
+                    names = snapshot.listDir(util.normpath(d))
+                    if names is not None:
+                        self.walkDir(None, d, names)
                 else:
                     # only one level
                     if os.path.isdir(d):
@@ -548,7 +664,7 @@ class Policy(BasePolicy):
             # "filter was unused because no paths matched" and
             # "filter was unused because it's redundant", because erroring
             # on the second case is confusing rather than helpful.
-            if f.match(filespec):
+            if f.match(filespec, snapshot=self.treeSnapshot):
                 if hasattr(f, 'regexp'):
                     self.unusedFilters['inclusions'].discard(f.regexp)
                 res = True
@@ -558,7 +674,7 @@ class Policy(BasePolicy):
         res = False
         for f in self.exceptionFilters:
             # We can't short circuit. We must discard all valid exceptions.
-            if f.match(filespec):
+            if f.match(filespec, snapshot=self.treeSnapshot):
                 if hasattr(f, 'regexp'):
                     self.unusedFilters['exceptions'].discard(f.regexp)
                 res = True
@@ -33,6 +33,7 @@ import glob
 import imp
 import os
 import sys
+import time
 
 """
 Contains the base Recipe class
@@ -345,6 +346,13 @@ class Recipe(object):
                                   "(cvc does not currently support multiple"
                                   " files with the same name from different"
                                   " locations):\n   " + '\n   '.join(errlist))
+        sources = self.getSourcePathList()
+        if skipFilter:
+            sources = [ x for x in sources
+                        if not skipFilter(os.path.basename(x.getPath())) ]
+        # fetch() searches everywhere, regardless of the cook type
+        self.prefetchSources(sources, refreshFilter=refreshFilter,
+                             searchAll=True)
         self.prepSources()
         files = []
         for src in self.getSourcePathList():
@@ -384,6 +392,27 @@ class Recipe(object):
         for source in self._sources:
             source.doPrep()
 
+    def prefetchSources(self, sources, refreshFilter=None, searchAll=False):
+        """
+        Downloads the files for C{sources} into the lookaside cache in
+        parallel, so that the lookups which unpack or return them later
+        do not wait on each download in turn.
+        """
+        fileFinder = getattr(self, 'fileFinder', None)
+        if fileFinder is None:
+            return
+        requests = []
+        for src in sources:
+            if not hasattr(src, 'getPrefetchRequest'):
+                continue
+            request = src.getPrefetchRequest()
+            if request is None:
+                continue
+            if searchAll:
+                request = request[:3] + (fileFinder.SEARCH_ALL,)
+            requests.append(request)
+        fileFinder.prefetch(requests, refreshFilter=refreshFilter)
+
     def unpackSources(self, resume=None, downloadOnly=False):
         if resume == 'policy':
             return
@@ -395,10 +424,12 @@ class Recipe(object):
                 source.doPrep()
                 source.doAction()
         elif downloadOnly:
+            self.prefetchSources([ x for x in self._sources if x.use ])
             for source in self._sources:
                 source.doPrep()
                 source.doDownload()
         else:
+            self.prefetchSources([ x for x in self._sources if x.use ])
             for source in self._sources:
                 source.doPrep()
                 source.doAction()
@@ -620,19 +651,31 @@ class Recipe(object):
         if hasattr(logFile, 'pushDescriptor'):
             formattedLog = True
             logFile.pushDescriptor(bucketName)
+        treeSnapshot = getattr(self, 'treeSnapshot', None)
         try:
             for post in self._policies[policyBucket]:
+                policyName = post.__class__.__name__
                 if formattedLog:
-                    logFile.pushDescriptor(post.__class__.__name__)
+                    logFile.pushDescriptor(policyName)
                 try:
-                    logFile.write('Running policy: %s\r' % \
-                            post.__class__.__name__)
+                    logFile.write('Running policy: %s\r' % policyName)
                     logFile.flush()
+                    if treeSnapshot is not None:
+                        # the previous policy may have changed the tree
+                        treeSnapshot.revalidate()
+                    start = time.time()
                     post.doProcess(self)
                     post.postPolicy()
+                    elapsed = time.time() - start
+                    if formattedLog:
+                        logFile.write('Policy %s took %.3f seconds\n'
+                                      % (policyName, elapsed))
+                    else:
+                        log.debug('Policy %s took %.3f seconds',
+                                  policyName, elapsed)
                 finally:
                     if formattedLog:
-                        logFile.popDescriptor(post.__class__.__name__)
+                        logFile.popDescriptor(policyName)
         finally:
             if formattedLog:
                 logFile.popDescriptor(bucketName)
@@ -405,6 +405,29 @@ class _Source(_AnySource):
             self.guessname = "%(archive_name)s-%(archive_version)s" % self.recipe.macros
             self.suffixes = DEFAULT_SUFFIXES
 
+    def _getSearchMethod(self):
+        if (self.recipe.cookType == self.recipe.COOK_TYPE_REPOSITORY and not
+                self.ephemeral):
+            return self.recipe.fileFinder.SEARCH_REPOSITORY_ONLY
+        return self.recipe.fileFinder.SEARCH_ALL
+
+    def getPrefetchRequest(self):
+        """
+        Returns the request with which the file for this source can be
+        downloaded ahead of time by L{lookaside.FileFinder.prefetch},
+        or None.
+        """
+        if self.sourceDir is not None:
+            return None
+        if self.rpm:
+            # _extractFromRPM always searches everywhere for the rpm
+            return (self.rpm, None, {}, self.recipe.fileFinder.SEARCH_ALL)
+        sourcename = self.sourcename
+        if self.guessname:
+            sourcename += self.guessname
+        return (sourcename, self.suffixes, self.httpHeaders,
+                self._getSearchMethod())
+
     def _findSource(self, httpHeaders={}, braceGlob = False):
         if self.sourceDir is not None:
             defaultDir = os.sep.join((self.builddir, self.recipe.theMainDir))
@@ -416,11 +439,7 @@ class _Source(_AnySource):
         if self.guessname:
             sourcename += self.guessname
 
-        searchMethod = self.recipe.fileFinder.SEARCH_ALL
-        if (self.recipe.cookType == self.recipe.COOK_TYPE_REPOSITORY and not
-                self.ephemeral):
-            searchMethod = self.recipe.fileFinder.SEARCH_REPOSITORY_ONLY
-
+        searchMethod = self._getSearchMethod()
         inRepos, source = self.recipe.fileFinder.fetch(sourcename,
                                             headers=httpHeaders,
                                            suffixes=self.suffixes,
@@ -2030,6 +2049,10 @@ class _RevisionControl(addArchive):
         # To be implemented in sub-classes
         pass
 
+    def getPrefetchRequest(self):
+        # snapshots are created by fetch(), not downloaded
+        return None
+
     def doDownload(self):
         return self.fetch()
 
@@ -412,6 +412,7 @@ class CookCommand(CvcCommand):
                          '[(local|HOST)--]TARGET'),
             'debug-exceptions' : 'Enter debugger if a recipe fails in conary',
             'flavor'  : 'build the trove with flavor FLAVOR',
+            'jobs'    : ('cook up to NUM items at the same time', 'NUM'),
             'macro'   : ('set macro NAME to VALUE', "'NAME VALUE'"),
             'macros'  : optparse.SUPPRESS_HELP, # can we get rid of this?
             'no-clean': 'do not remove build directory even if build is'
@@ -434,6 +435,7 @@ class CookCommand(CvcCommand):
         argDef['debug-exceptions'] = NO_PARAM
         argDef['cross'] = ONE_PARAM
         argDef['flavor'] = ONE_PARAM
+        argDef['jobs'] = ONE_PARAM
         argDef['macro'] = MULT_PARAM
         argDef['macros'] = ONE_PARAM
         argDef['no-clean'] = NO_PARAM
@@ -538,6 +540,14 @@ class CookCommand(CvcCommand):
             crossCompile = (crossHost, crossTarget, isCrossTool)
 
         targetFile = argSet.pop("to-file", None)
+        jobs = argSet.pop('jobs', None)
+        if jobs is not None:
+            try:
+                jobs = int(jobs)
+            except ValueError:
+                jobs = 0
+            if jobs < 1:
+                raise errors.ParseError('--jobs must be a positive integer')
         if argSet: return self.usage()
 
         groupOptions = cook.GroupCookOptions(alwaysBumpCount=True,
@@ -565,7 +575,7 @@ class CookCommand(CvcCommand):
                          showBuildReqs=showBuildReqs, profile=profile,
                          crossCompile=crossCompile, downloadOnly=downloadOnly,
                          groupOptions=groupOptions,
-                         changeSetFile=targetFile,
+                         changeSetFile=targetFile, jobs=jobs,
                          )
         except builderrors.GroupFlavorChangedError, err:
             err.args = (err.args[0] +
@@ -1034,6 +1044,7 @@ class CvcMain(command.MainHandler):
 
         keyCache = openpgpkey.getKeyCache()
         keyCache.setPublicPath(cfg.pubRing)
+        keyCache.setSignatureCachePath(cfg.signatureCache)
         repos = conaryclient.ConaryClient(cfg).getRepos()
         keyCacheCallback = openpgpkey.KeyCacheCallback(repos,
                                                        cfg)
@@ -566,6 +566,12 @@ class ConaryContext(ConfigSection):
     configComponent       =  (CfgBool, True)
     contact               =  None
     context               =  None
+    cookCacheDir          =  (CfgPath, None, "Directory holding the results "
+                              "of repository cooks, which are reused when "
+                              "a cook has the same inputs")
+    cookJobs              =  (CfgInt, 1, "Number of items cvc cook builds "
+                              "at the same time when given several recipes "
+                              "or flavors")
     dbPath                =  '/var/lib/conarydb'
     debugExceptions       =  (CfgBool, False)
     debugRecipeExceptions =  (CfgBool, False)
@@ -592,6 +598,12 @@ class ConaryContext(ConfigSection):
                                             '~/.conary/log',))
     lookaside             =  (CfgPath, '~/conary/cache')
     macros                =  CfgDict(CfgString)
+    magicCacheDir         =  (CfgPath, None, "Directory for a persistent "
+                              "cache of file analysis results shared "
+                              "between cooks; unset disables the cache")
+    magicCacheSize        =  (CfgInt, 50000, "Maximum number of file "
+                              "analysis results kept in magicCacheDir; "
+                              "0 disables the cache")
     mirrorDirs            =  (CfgPathList, ('~/.conary/mirrors',
                                             '/etc/conary/distro/mirrors',
                                             '/etc/conary/mirrors',))
@@ -621,6 +633,9 @@ class ConaryContext(ConfigSection):
     downloadRateLimit     =  (CfgInt, 0,
             "Download rate limit, in bytes per second")
 
+    recipeCacheDir        =  (CfgPath, None, "Directory holding compiled "
+                              "recipes, shared by processes which load the "
+                              "same recipes")
     recipeTemplate        =  None
     repositoryMap         =  CfgRepoMap
     resolveLevel          =  (CfgInt, 2)
@@ -630,6 +645,8 @@ class ConaryContext(ConfigSection):
     showLabels            =  CfgBool
     showComponents        =  CfgBool
     searchPath            =  CfgSearchPath
+    signatureCache        =  (CfgPath, None, "File recording the trove "
+                              "signatures which have already been verified")
     signatureKey          =  CfgFingerPrint
     signatureKeyMap       =  CfgFingerPrintMap
     siteConfigPath        =  (CfgPathList, ('/etc/conary/site',
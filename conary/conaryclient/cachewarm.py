@@ -0,0 +1,260 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+"""
+Warms the changeset cache of a Conary proxy ahead of a rollout by
+requesting, through the proxy, the changesets clients will ask for when
+they install a group or update to it.
+"""
+
+import optparse
+import os
+import Queue
+import sys
+import tempfile
+import threading
+
+from conary import conarycfg, conaryclient, trove
+from conary.conaryclient import cmdline
+from conary.lib import log
+
+WARM_THREADS = 4        # Maximum number of concurrent changeset requests
+WARM_BATCH_SIZE = 20    # Number of jobs requested at a time
+
+
+class OptionError(Exception):
+    def __init__(self, errcode, errmsg, *args):
+        self.errcode = errcode
+        self.errmsg = errmsg
+        Exception.__init__(self, *args)
+
+
+class WarmReport(object):
+    """
+    Outcome of L{warmCache}: the jobs whose changesets went through the
+    proxy, and the ones which failed with the error for them.
+    """
+
+    def __init__(self, jobs):
+        self.jobs = list(jobs)
+        self.cached = []
+        self.failed = []
+        self.bytes = 0
+
+    def getCoverage(self):
+        """Fraction of the jobs whose changesets are now cached"""
+        if not self.jobs:
+            return 1.0
+        return float(len(self.cached)) / len(self.jobs)
+
+    def display(self, out = sys.stdout):
+        out.write('%d of %d changesets cached (%.1f%%), %d bytes\n'
+                  % (len(self.cached), len(self.jobs),
+                     self.getCoverage() * 100, self.bytes))
+        for job, error in self.failed:
+            out.write('failed: %s: %s\n' % (_jobString(job), error))
+
+
+def _jobString(job):
+    name, (oldVersion, oldFlavor), (newVersion, newFlavor) = job[:3]
+    if oldVersion is None:
+        return '%s=%s[%s]' % (name, newVersion.asString(), newFlavor)
+    return '%s=%s[%s]--%s[%s]' % (name, oldVersion.asString(), oldFlavor,
+                                   newVersion.asString(), newFlavor)
+
+
+def _flattenGroup(name, trv):
+    # diff() only matches strong references; make every trove in the group
+    # a strong reference so the whole group is matched
+    flat = trove.Trove(name, trv.getVersion(), trv.getFlavor())
+    for tup in trv.iterTroveList(strongRefs = True, weakRefs = True):
+        flat.addTrove(*tup)
+    return flat
+
+
+def getWarmJobs(repos, groupTup, fromTups = ()):
+    """
+    Returns the jobs clients request to install the group C{groupTup},
+    and to update to it from each of the groups in C{fromTups}: an
+    absolute job for the group and each trove in it, and a relative job
+    for each trove changed since a group in C{fromTups}.
+    """
+    fromTups = list(fromTups)
+    troves = repos.getTroves([ groupTup ] + fromTups, withFiles = False)
+    newGroup = _flattenGroup(groupTup[0], troves[0])
+
+    jobs = []
+    seen = set()
+    def addJob(job):
+        if job not in seen:
+            seen.add(job)
+            jobs.append(job)
+
+    addJob((groupTup[0], (None, None), groupTup[1:], True))
+    for name, version, flavor in newGroup.iterTroveList(strongRefs = True):
+        addJob((name, (None, None), (version, flavor), True))
+
+    for fromTup, oldTrove in zip(fromTups, troves[1:]):
+        if fromTup[0] == groupTup[0] and fromTup != groupTup:
+            addJob((groupTup[0], fromTup[1:], groupTup[1:], False))
+        oldGroup = _flattenGroup(groupTup[0], oldTrove)
+        for name, oldInfo, newInfo, _ in newGroup.diff(oldGroup)[2]:
+            # new troves are installed from the absolute jobs above, and
+            # erasures need no changeset
+            if oldInfo[0] is None or newInfo[0] is None:
+                continue
+            addJob((name, oldInfo, newInfo, False))
+    return jobs
+
+
+def warmCache(cfg, jobs, threads = WARM_THREADS,
+              batchSize = WARM_BATCH_SIZE):
+    """
+    Requests the changesets for C{jobs} the way clients configured with
+    C{cfg} would, C{batchSize} jobs per request and up to C{threads}
+    requests at a time, so the proxy configured in C{cfg} caches them.
+    The changesets are downloaded to C{cfg.tmpDir} and discarded.
+
+    @rtype: L{WarmReport}
+    """
+    report = WarmReport(jobs)
+    queue = Queue.Queue()
+    for i in range(0, len(report.jobs), batchSize):
+        queue.put(report.jobs[i:i + batchSize])
+    lock = threading.Lock()
+
+    def worker():
+        repos = conaryclient.ConaryClient(cfg).getRepos()
+        while True:
+            try:
+                batch = queue.get_nowait()
+            except Queue.Empty:
+                return
+            fd, path = tempfile.mkstemp(dir = cfg.tmpDir,
+                                        suffix = '.ccs-warm')
+            os.close(fd)
+            try:
+                try:
+                    repos.createChangeSetFile(batch, path, recurse = False)
+                    size = os.stat(path).st_size
+                except Exception, e:
+                    log.debug('error warming %d changesets: %s',
+                              len(batch), e)
+                    lock.acquire()
+                    report.failed.extend((job, e) for job in batch)
+                    lock.release()
+                else:
+                    lock.acquire()
+                    report.cached.extend(batch)
+                    report.bytes += size
+                    lock.release()
+            finally:
+                os.unlink(path)
+
+    workers = [ threading.Thread(target = worker)
+                for x in range(max(1, min(threads, queue.qsize()))) ]
+    for thread in workers:
+        thread.setDaemon(True)
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return report
+
+
+def parseArgs(argv):
+    parser = optparse.OptionParser(
+                usage = '%prog [options] GROUP [GROUP...]')
+    parser.add_option("--config-file", dest = "configFile",
+                      help = "conary configuration file", metavar = "FILE")
+    parser.add_option("--proxy", dest = "proxy", metavar = "URL",
+                      help = "proxy to warm (defaults to conaryProxy)")
+    parser.add_option("--from", dest = "fromSpecs", action = "append",
+                      default = [], metavar = "TROVESPEC",
+                      help = "group clients will update from; may be "
+                             "given more than once")
+    parser.add_option("--threads", dest = "threads", type = "int",
+                      default = WARM_THREADS,
+                      help = "maximum number of concurrent requests")
+    parser.add_option("--batch-size", dest = "batchSize", type = "int",
+                      default = WARM_BATCH_SIZE,
+                      help = "number of changesets per request")
+    parser.add_option("-v", "--verbose", dest = "verbose",
+                      action = "store_true", default = False,
+                      help = "display information on what is going on")
+
+    (options, args) = parser.parse_args(argv)
+
+    if not args:
+        raise OptionError(1, 'a group to warm the proxy for is required')
+    if options.threads < 1 or options.batchSize < 1:
+        raise OptionError(1, '--threads and --batch-size must be positive')
+
+    return options, args
+
+
+def _findTroves(repos, cfg, specList):
+    troveSpecs = [ cmdline.parseTroveSpec(x) for x in specList ]
+    results = repos.findTroves(cfg.installLabelPath, troveSpecs, cfg.flavor)
+    tups = []
+    for troveSpec in troveSpecs:
+        tups.extend(results[troveSpec])
+    return tups
+
+
+def Main(argv = None):
+    if argv is None:
+        argv = sys.argv[1:]
+    try:
+        options, args = parseArgs(argv)
+    except OptionError, e:
+        sys.stderr.write(e.errmsg)
+        sys.stderr.write("\n")
+        return e.errcode
+
+    if options.configFile:
+        cfg = conarycfg.ConaryConfiguration(readConfigFiles = False)
+        cfg.read(options.configFile, exception = True)
+    else:
+        cfg = conarycfg.ConaryConfiguration(readConfigFiles = True)
+    if options.proxy:
+        cfg.configLine('conaryProxy %s' % options.proxy)
+    cfg.initializeFlavors()
+    if options.verbose:
+        log.setVerbosity(log.DEBUG)
+
+    repos = conaryclient.ConaryClient(cfg).getRepos()
+    fromTups = _findTroves(repos, cfg, options.fromSpecs)
+    jobs = []
+    seen = set()
+    for groupTup in _findTroves(repos, cfg, args):
+        for job in getWarmJobs(repos, groupTup, fromTups):
+            if job not in seen:
+                seen.add(job)
+                jobs.append(job)
+    log.info('warming %d changesets', len(jobs))
+
+    try:
+        report = warmCache(cfg, jobs, threads = options.threads,
+                           batchSize = options.batchSize)
+    except KeyboardInterrupt:
+        print >> sys.stderr
+        print >> sys.stderr, 'Terminating due to user interrupt'
+        return 1
+    report.display()
+    if report.failed:
+        return 2
+    return 0
@@ -44,7 +44,10 @@ back to the original branch being through the "clonedFrom" link.
 
 import itertools
 import os
+import Queue
+import sys
 import tempfile
+import threading
 import time
 
 from conary import callbacks
@@ -97,6 +100,10 @@ class CloneJob(object):
 MAX_CLONE_FILES  = 5000
 # threshhold for using a changeset instead of getting individual files
 CHANGESET_MULTIPLE = 3
+# number of troves the trove cache fetches per repository request, and
+# the maximum number of those requests made at a time
+FETCH_BATCH_SIZE = 100
+FETCH_THREADS = 4
 
 class ClientClone(object):
     __developer_api__ = True
@@ -145,7 +152,10 @@ class ClientClone(object):
 
     def _createCloneChangeSet(self, chooser, cloneOptions):
         callback = cloneOptions.callback
-        troveCache = TroveCache(self.repos, callback)
+        # fetch threads get their own repository clients; clones only
+        # fetch troves from repositories, so they need no local database
+        troveCache = TroveCache(self.repos, callback,
+                        reposFactory = lambda: self.createRepos(None, self.cfg))
 
         cloneJob, cloneMap, leafMap = self._createCloneJob(cloneOptions,
                                                            chooser,
@@ -154,8 +164,10 @@ class ClientClone(object):
             log.warning('Nothing to clone!')
             return False, None
 
-        newTroveList = self._buildTroves(chooser, cloneMap, cloneJob,
-                                         leafMap, troveCache, callback)
+        newTroveList = self._timeStage(cloneOptions, 'rewrite troves',
+                                       self._buildTroves, chooser, cloneMap,
+                                       cloneJob, leafMap, troveCache,
+                                       callback)
         if newTroveList is None:
             return False, None
 
@@ -169,12 +181,25 @@ class ClientClone(object):
             callback.done()
             return True, cs
 
-        finalCs = self._buildChangeSet(troveCache, newTroveList, callback)
+        finalCs = self._timeStage(cloneOptions, 'build changeset',
+                                  self._buildChangeSet, troveCache,
+                                  newTroveList, callback)
 
         callback.prefix = ''
         callback.done()
         return True, finalCs
 
+    @staticmethod
+    def _timeStage(cloneOptions, stage, fn, *args):
+        # runs one stage of the clone, reporting how long it took
+        mark = time.time()
+        result = fn(*args)
+        elapsed = time.time() - mark
+        log.debug('%.2fs for clone stage %s', elapsed, stage)
+        if cloneOptions.timer is not None:
+            cloneOptions.timer(stage, elapsed)
+        return result
+
     def _buildChangeSet(self, troveCache, finalTroveList, callback):
         def _sameHost(v1, v2):
             return v1.trailingLabel().getHost() == v2.trailingLabel().getHost()
@@ -398,29 +423,36 @@ class ClientClone(object):
         if cloneOptions.cloneOnlyByDefaultTroves:
             self._setByDefaultMap(chooser, troveCache)
         _logMe('determining troves to clone')
-        self._determineTrovesToClone(chooser, cloneMap, cloneJob, troveCache,
-                                     cloneOptions.callback)
+        self._timeStage(cloneOptions, 'determine troves',
+                        self._determineTrovesToClone, chooser, cloneMap,
+                        cloneJob, troveCache, cloneOptions.callback)
         cloneOptions.callback.determiningTargets()
 
         _logMe('get existing leaves')
-        leafMap = self._getExistingLeaves(cloneMap, troveCache, cloneOptions)
+        leafMap = self._timeStage(cloneOptions, 'existing leaves',
+                                  self._getExistingLeaves, cloneMap,
+                                  troveCache, cloneOptions)
         _logMe('target sources')
-        self._targetSources(chooser, cloneMap, cloneJob, leafMap, troveCache,
-                            cloneOptions.callback)
+        self._timeStage(cloneOptions, 'target sources',
+                        self._targetSources, chooser, cloneMap, cloneJob,
+                        leafMap, troveCache, cloneOptions.callback)
         _logMe('target binaries')
-        self._targetBinaries(chooser, cloneMap, cloneJob, leafMap, troveCache,
-                             cloneOptions.callback)
+        self._timeStage(cloneOptions, 'target binaries',
+                        self._targetBinaries, chooser, cloneMap, cloneJob,
+                        leafMap, troveCache, cloneOptions.callback)
 
         # some clones may rewrite the child troves (if cloneOnlyByDefaultTroves
         # is True).  We need to make sure that any precloned aren't having
         # the list of child troves changed.
         _logMe('recheck preclones')
-        self._recheckPreClones(cloneJob, cloneMap, troveCache, chooser,
-                               leafMap)
+        self._timeStage(cloneOptions, 'recheck preclones',
+                        self._recheckPreClones, cloneJob, cloneMap,
+                        troveCache, chooser, leafMap)
         troveTups = cloneJob.getTrovesToClone()
-        unmetNeeds = self._checkNeedsFulfilled(troveTups, chooser, cloneMap,
-                                               leafMap, troveCache,
-                                               cloneOptions.callback)
+        unmetNeeds = self._timeStage(cloneOptions, 'check needs',
+                                     self._checkNeedsFulfilled, troveTups,
+                                     chooser, cloneMap, leafMap, troveCache,
+                                     cloneOptions.callback)
         if unmetNeeds:
             _logMe('could not clone')
             raise CloneIncomplete(unmetNeeds)
@@ -602,11 +634,13 @@ class ClientClone(object):
 
     def _targetSources(self, chooser, cloneMap, cloneJob, leafMap, troveCache,
                        callback):
-        hasTroves = self.repos.hasTroves(
+        hasTroves = troveCache.hasTroves(
                         [x[0] for x in cloneMap.iterSourceTargetBranches()])
         presentTroveTups = [x[0] for x in hasTroves.items() if x[1]]
         _logMe("Getting clonedFromInfo for sources")
         leafMap.addClonedFromInfo(troveCache, presentTroveTups)
+        leafMap.findAncestors(troveCache,
+                              cloneMap.iterSourceTargetBranches())
         _logMe("done")
 
         total = len(list(cloneMap.iterSourceTargetBranches()))
@@ -621,7 +655,7 @@ class ClientClone(object):
                     cloneJob.alreadyCloned(sourceTup)
                 else:
                     newVersion = leafMap.hasAncestor(sourceTup, targetBranch,
-                                                     self.repos)
+                                                     troveCache)
 
                     if chooser.shouldClone(sourceTup):
                         if newVersion:
@@ -646,7 +680,8 @@ class ClientClone(object):
                                      "Cannot find cloned source for %s=%s" \
                                           % (sourceTup[0], sourceTup[1]))
             else:
-                newVersion = leafMap.hasAncestor(sourceTup, targetBranch, self.repos)
+                newVersion = leafMap.hasAncestor(sourceTup, targetBranch,
+                                                 troveCache)
                 if newVersion:
                     cloneMap.target(sourceTup, newVersion)
                     cloneJob.alreadyCloned(sourceTup)
@@ -784,6 +819,8 @@ class ClientClone(object):
                     matches.append(troveTup)
         _logMe("Checking clonedFrom info for %s matching nodes" % (len(matches)))
         leafMap.addClonedFromInfo(troveCache, matches)
+        leafMap.findAncestors(troveCache,
+                    [ (x[1][0], x[0][1]) for x in query.iteritems() ])
         total = len(query)
         current = 0
         for queryItem, (sourceTup, markList) in query.items():
@@ -791,7 +828,8 @@ class ClientClone(object):
             callback.checkNeedsFulfilled(current, total)
             newVersion = leafMap.isAlreadyCloned(sourceTup, queryItem[1])
             if not newVersion:
-                newVersion = leafMap.hasAncestor(sourceTup, queryItem[1], self.repos)
+                newVersion = leafMap.hasAncestor(sourceTup, queryItem[1],
+                                                 troveCache)
             if newVersion:
                 cloneMap.target(sourceTup, newVersion)
                 del query[queryItem]
@@ -900,8 +938,7 @@ class ClientClone(object):
 
         # this getTroves populates troveCache.hasTroves simultaneously
         has = troveCache.hasTroves(allTroveList)
-        toFetch = [ x for x, y in itertools.izip(allTroveList, has)
-                            if y ]
+        toFetch = [ x for x in allTroveList if has[x] ]
         troveCache.getTroves(toFetch, withFiles=True)
         #del allTroveList, has
 
@@ -941,8 +978,8 @@ class ClientClone(object):
 
     def _rewriteTrove(self, trv, newVersion, chooser, cloneMap,
                       cloneJob, leafMap, troveCache):
-        # make a copy so we don't corrupt the copy in the trove cache
-        trv = trv.copy()
+        # trv is rewritten in place; the trove cache hands out a new trove
+        # object from each getTroves() call, so no copy is needed here
 
         troveName, troveVersion, troveFlavor = trv.getNameVersionFlavor()
         troveBranch = troveVersion.branch()
@@ -1155,7 +1192,8 @@ class CloneOptions(object):
                  trackClone=True, callback=None,
                  message=DEFAULT_MESSAGE, cloneOnlyByDefaultTroves=False,
                  updateBuildInfo=True, infoOnly=False, bumpGroupVersions=False,
-                 enforceFullBuildInfoCloning=False, excludeGroups=False):
+                 enforceFullBuildInfoCloning=False, excludeGroups=False,
+                 timer=None):
         self.fullRecurse = fullRecurse
         self.cloneSources = cloneSources
         self.trackClone = trackClone
@@ -1169,13 +1207,26 @@ class CloneOptions(object):
         self.bumpGroupVersions = bumpGroupVersions
         self.enforceFullBuildInfoCloning = enforceFullBuildInfoCloning
         self.excludeGroups = excludeGroups
+        # called with the name of each stage of the clone and the seconds
+        # it took
+        self.timer = timer
 
 class TroveCache(object):
-    def __init__(self, repos, callback):
+    # Troves are fetched batchSize at a time. A repository client is not
+    # safe to use from several threads (its transports keep per-request
+    # state), so batches are only fetched concurrently when reposFactory
+    # is given; each of up to threads workers then fetches through a
+    # client of its own made by calling it. Otherwise every batch is
+    # fetched through repos in turn.
+    def __init__(self, repos, callback, threads=FETCH_THREADS,
+                 batchSize=FETCH_BATCH_SIZE, reposFactory=None):
         self._hasTroves = {}
         self.troves = {True : {}, False : {}}
         self.repos = repos
         self.callback = callback
+        self.threads = threads
+        self.batchSize = batchSize
+        self.reposFactory = reposFactory
 
     def hasTrove(self, name, version, flavor):
         return self.hasTroves([(name, version, flavor)])[name, version, flavor]
@@ -1186,16 +1237,64 @@ class TroveCache(object):
             self._hasTroves.update(self.repos.hasTroves(needed))
         return dict((x, self._hasTroves[x]) for x in troveTups)
 
-    def _get(self, troveTups, withFiles):
-        cs = self.repos.createChangeSet(
+    @staticmethod
+    def _fetch(repos, troveTups, withFiles):
+        return repos.createChangeSet(
                 [ (x[0], (None, None), (x[1], x[2]), True) for x in troveTups],
                 withFiles = withFiles, withFileContents = False,
                 recurse = False)
 
-        for x in troveTups:
-            self.troves[withFiles][x] = cs.getNewTroveVersion(*x)
-            if trove.troveIsCollection(x[0]):
-                self.troves[not withFiles][x] = cs.getNewTroveVersion(*x)
+    def _fetchThreaded(self, batches, withFiles):
+        queue = Queue.Queue()
+        for item in enumerate(batches):
+            queue.put(item)
+        results = [ None ] * len(batches)
+        failed = []
+
+        def worker():
+            repos = None
+            while not failed:
+                try:
+                    idx, batch = queue.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    if repos is None:
+                        repos = self.reposFactory()
+                    results[idx] = self._fetch(repos, batch, withFiles)
+                except Exception:
+                    failed.append((idx, sys.exc_info()))
+
+        workers = [ threading.Thread(target = worker)
+                    for x in range(min(self.threads, len(batches))) ]
+        for thread in workers:
+            thread.setDaemon(True)
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        if failed:
+            # report the error for the earliest batch which failed
+            excInfo = sorted(failed)[0][1]
+            raise excInfo[0], excInfo[1], excInfo[2]
+
+        return results
+
+    def _get(self, troveTups, withFiles):
+        batches = [ troveTups[i:i + self.batchSize]
+                    for i in range(0, len(troveTups), self.batchSize) ]
+        if (self.reposFactory is not None and self.threads > 1
+                and len(batches) > 1):
+            csList = self._fetchThreaded(batches, withFiles)
+        else:
+            csList = [ self._fetch(self.repos, x, withFiles)
+                       for x in batches ]
+
+        for batch, cs in itertools.izip(batches, csList):
+            for x in batch:
+                self.troves[withFiles][x] = cs.getNewTroveVersion(*x)
+                if trove.troveIsCollection(x[0]):
+                    self.troves[not withFiles][x] = cs.getNewTroveVersion(*x)
 
     def getTroves(self, troveTups, withFiles=True):
         theDict = self.troves[withFiles]
@@ -1203,7 +1302,7 @@ class TroveCache(object):
         if needed:
             _logMe('getting %s troves from repos' % len(needed))
 
-            self._get(troveTups, withFiles)
+            self._get(needed, withFiles)
 
         # this prevents future hasTroves calls from calling the server
         self._hasTroves.update((x, True) for x in troveTups)
@@ -1534,22 +1633,45 @@ class LeafMap(object):
         return None
 
     @staticmethod
-    def hasAncestor(troveTup, targetBranch, repos):
+    def _getAncestorVersion(troveTup, targetBranch):
         newVersion = troveTup[1]
         if newVersion.branch() == targetBranch:
             # even if we're an unmodified shadow - if we're cloning to our
             # own branch we want to use other tests to determine if
             # the clone is necessary.
-            return False
+            return None
         while (newVersion.isShadow() and not newVersion.isModifiedShadow()
                and newVersion.branch() != targetBranch):
             newVersion = newVersion.parentVersion()
-        if (newVersion.branch() == targetBranch and
+        if newVersion.branch() == targetBranch:
+            return newVersion
+        return None
+
+    @staticmethod
+    def hasAncestor(troveTup, targetBranch, repos):
+        newVersion = LeafMap._getAncestorVersion(troveTup, targetBranch)
+        if (newVersion is not None and
             repos.hasTrove(troveTup[0], newVersion, troveTup[2])):
             return newVersion
 
         return False
 
+    @staticmethod
+    def findAncestors(troveCache, tupBranchList):
+        """
+            Looks up the ancestors on the target branches of all of the
+            (troveTup, targetBranch) pairs given with one hasTroves call,
+            so hasAncestor() calls passed troveCache need no more
+            repository calls.
+        """
+        ancestors = []
+        for troveTup, targetBranch in tupBranchList:
+            newVersion = LeafMap._getAncestorVersion(troveTup, targetBranch)
+            if newVersion is not None:
+                ancestors.append((troveTup[0], newVersion, troveTup[2]))
+        if ancestors:
+            troveCache.hasTroves(ancestors)
+
     def isAlreadyCloned(self, troveTupleList, targetBranch):
         if not isinstance(troveTupleList, list):
             troveTupleList = [troveTupleList]
@@ -16,6 +16,7 @@
 
 
 import itertools
+import time
 
 from conary import trove, versions
 from conary.conaryclient import cml
@@ -1171,7 +1172,12 @@ class OperationGraph(graph.DirectedGraph):
         graph.DirectedGraph.__init__(self, *args, **kwargs)
         self.included = set()
 
-    def realize(self, data):
+    def realize(self, data, timer = None):
+        """
+        Realizes every node of the graph. C{timer}, if given, is called
+        with the list of nodes realized together and the wall time taken
+        to realize them.
+        """
         # this is a hack
         self.actionData = data
 
@@ -1206,19 +1212,33 @@ class OperationGraph(graph.DirectedGraph):
                         byAction.setdefault(
                             node.action.__class__, []).append(node)
                     else:
-                        node.realize(data)
+                        self._realizeNode(node, data, timer)
 
             for action, nodeList in byAction.iteritems():
                 if issubclass(action, ParallelAction):
-                    nodeList[0].action([ node.action for node in nodeList ],
-                                       data)
+                    self._runBatch(nodeList, data, timer)
                     for node in nodeList:
                         node.beenRealized(data)
                 else:
                     for node in nodeList:
-                        if not node.realize(data):
+                        if not self._realizeNode(node, data, timer):
                             reset = True
 
+    @staticmethod
+    def _realizeNode(node, data, timer):
+        mark = time.time()
+        result = node.realize(data)
+        if timer is not None:
+            timer([ node ], time.time() - mark)
+        return result
+
+    @staticmethod
+    def _runBatch(nodeList, data, timer):
+        mark = time.time()
+        nodeList[0].action([ node.action for node in nodeList ], data)
+        if timer is not None:
+            timer(nodeList, time.time() - mark)
+
     def trace(self, troveSpecList):
         ordering = self.getTotalOrdering()
 
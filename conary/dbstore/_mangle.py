@@ -20,6 +20,11 @@ import re
 
 SUBST_IDENTIFIER = re.compile(r'([ (,]):([a-zA-Z_][a-zA-Z0-9_]*)')
 
+# converted queries are remembered; the hot paths issue the same handful of
+# statements over and over
+SWAP_CACHE_SIZE = 1000
+_swapCache = {}
+
 
 def quoteIdentifier(name):
     name = name.replace('"', '""')
@@ -43,9 +48,12 @@ def _min(*args):
 
 def swapPlaceholders(query):
     """Change ? to %s and :foo to %(foo)s while honoring quoting rules."""
-    # This is worth optimizing at some point, but it currently takes on the
-    # order of 0.1ms per conversion so it's not too significant next to the
-    # actual database call.
+    value = _swapCache.get(query)
+    if value is not None:
+        return value
+    if len(_swapCache) >= SWAP_CACHE_SIZE:
+        _swapCache.clear()
+    key = query
     out = []
     # Mangle positional markers, while careful to ignore quoted sections.
     while query:
@@ -76,4 +84,5 @@ def swapPlaceholders(query):
             out.append(query[start:end+1])
             query = query[end+1:]
     value = ''.join(out)
+    _swapCache[key] = value
     return value
@@ -614,6 +614,13 @@ class BaseDatabase:
             tableName, cols, values), rows,
                               start_transaction = start_transaction)
 
+    def bulkloader(self, tableName, columnNames, **kw):
+        """
+        Returns a L{sqllib.BulkLoader} which gathers rows for
+        C{tableName} and loads them a batch at a time through bulkload().
+        """
+        return sqllib.BulkLoader(self, tableName, columnNames, **kw)
+
     def truncate(self, *tables):
         cu = self.cursor()
         for table in tables:
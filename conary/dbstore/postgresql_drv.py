@@ -48,8 +48,23 @@ class Binary(BaseBinary):
     def __pg_repr__(self):
         return "decode('%s','hex')" % "".join("%02x" % ord(c) for c in self.s)
 
+_placeholderRE = re.compile("(?i)(?P<pre>[(,<>=]|(LIKE|AND|BETWEEN|LIMIT|OFFSET)\s)"
+                            "(?P<s>\s*)(?P<kw>:\w+|[?])")
+
+# rewritten queries are remembered, they are asked for again and again
+MUNGE_CACHE_SIZE = 1000
+_mungeCache = {}
+
 # edit the input query to make it postgres compatible
 def _mungeSQL(sql):
+    ret = _mungeCache.get(sql)
+    if ret is None:
+        if len(_mungeCache) >= MUNGE_CACHE_SIZE:
+            _mungeCache.clear()
+        ret = _mungeCache[sql] = _mungeSQLOnce(sql)
+    return (ret[0], list(ret[1]))
+
+def _mungeSQLOnce(sql):
     keys = [] # needs to be a list because we're dealing with positional args
     def __match(m):
         d = m.groupdict()
@@ -63,8 +78,7 @@ def _mungeSQL(sql):
             d["kwIdx"] = len(keys)
         return "%(pre)s%(s)s$%(kwIdx)d" % d
 
-    sql = re.sub("(?i)(?P<pre>[(,<>=]|(LIKE|AND|BETWEEN|LIMIT|OFFSET)\s)(?P<s>\s*)(?P<kw>:\w+|[?])",
-                 __match, sql)
+    sql = _placeholderRE.sub(__match, sql)
     # force dbi compliance here. args or kw or none, no mixes
     if len(keys) and keys[0] is not None:
         return (sql, keys)
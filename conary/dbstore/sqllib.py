@@ -51,6 +51,43 @@ class DBversion:
         else:
             return str(self.major)
 
+# number of rows a BulkLoader gathers before loading them
+BULKLOAD_BATCH_SIZE = 5000
+
+# gathers rows for a table and loads them in batches through bulkload()
+class BulkLoader(object):
+    def __init__(self, db, tableName, columnNames,
+                 batchSize = BULKLOAD_BATCH_SIZE, start_transaction = True):
+        self.db = db
+        self.tableName = tableName
+        self.columnNames = list(columnNames)
+        self.batchSize = batchSize
+        self.start_transaction = start_transaction
+        self.rows = []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, *row):
+        assert(len(row) == len(self.columnNames))
+        self.rows.append(row)
+        if len(self.rows) >= self.batchSize:
+            self.flush()
+
+    def extend(self, rows):
+        self.rows.extend(rows)
+        if len(self.rows) >= self.batchSize:
+            self.flush()
+
+    def flush(self):
+        """Loads the rows gathered so far into the table"""
+        if not self.rows:
+            return
+        rows = self.rows
+        self.rows = []
+        self.db.bulkload(self.tableName, rows, self.columnNames,
+                         start_transaction = self.start_transaction)
+
 # a case-insensitive key dict
 class CaselessDict(dict):
     def __init__(self, d=None):
@@ -18,7 +18,7 @@
 import itertools
 import re
 import weakref
-from conary.lib import api
+from conary.lib import api, util
 from conary.lib.ext import dep_freeze
 from conary.errors import ParseError
 
@@ -1161,10 +1161,29 @@ class Flavor(DependencySet):
             newDep.members[tag] = depClass.toStrongFlavor()
         return newDep
 
+    def score(self, other):
+        # use the compiled and cached scores (see scoreFlavorList)
+        assert(isinstance(other, DependencySet))
+        return _scoreFrozen(_frozenForScore(self), _frozenForScore(other))
+
     @api.developerApi
     def stronglySatisfies(self, other):
-        return self.toStrongFlavor().score(
-                    other.toStrongFlavor()) is not False
+        return _scoreFrozen(_frozenForScore(self), _frozenForScore(other),
+                            sysStrong = True, reqStrong = True) is not False
+
+def _frozenForScore(depSet):
+    # flavors tend to be scored over and over again, so keep the frozen
+    # form around instead of refreezing it for every score (just like
+    # DependencySet.__eq__ does); it is thawed again when needed
+    members = depSet._members
+    if type(members) == dict:
+        if not all(x.members for x in members.itervalues()):
+            # empty dependency classes don't survive freezing and don't
+            # matter for scoring
+            return dep_freeze.depSetFreeze(dict(
+                        x for x in members.iteritems() if x[1].members))
+        depSet._members = members = depSet.freeze()
+    return members
 
 def ThawDependencySet(frz):
     return DependencySet(frz)
@@ -1861,3 +1880,212 @@ flavorScores = {
       (FLAG_SENSE_PREFERNOT,   FLAG_SENSE_PREFERRED) :   -1,
       (FLAG_SENSE_PREFERNOT,   FLAG_SENSE_PREFERNOT) :    1
 }
+
+# Compiled flavor scoring
+#
+# Dependency.score() walks the flags of two dependencies through
+# dictionaries, which adds up when the same handful of flavors is scored
+# millions of times during a group cook or dependency resolution. The
+# compiled form of a frozen dependency set maps each dependency class tag
+# to a (depNameSignificant, { depName : masks }) tuple, where masks is a
+# tuple of bitmasks indexed by flag sense. Index FLAG_SENSE_UNSPECIFIED
+# holds the mask of every flag of the dependency. Bits are interned per
+# (tag, depName) so masks stay small. Compiled sets and scores are kept in
+# bounded, process-wide caches keyed by the frozen dependency sets.
+
+FLAVOR_COMPILE_CACHE_SIZE = 5000
+FLAVOR_SCORE_CACHE_SIZE = 50000
+
+_flagBits = {}
+_noFlags = (0, 0, 0, 0, 0)
+_emptyCompiledClass = (True, {})
+
+# (systemSense, requiredSense, score) for every combination which adds
+# something to the score or disqualifies the match (score is None)
+_scorePairs = tuple(sorted((sysSense, reqSense, score)
+                    for ((sysSense, reqSense), score) in flavorScores.items()
+                    if score != 0))
+
+def _popcount(bits):
+    count = 0
+    while bits:
+        bits &= bits - 1
+        count += 1
+    return count
+
+def _compileFlags(tag, name, flags, strong):
+    bits = _flagBits.setdefault((tag, name), {})
+    masks = [ 0, 0, 0, 0, 0 ]
+    for flag in flags:
+        kind = flag[0:2]
+        if kind == '~!':
+            flag, sense = flag[2:], FLAG_SENSE_PREFERNOT
+        elif kind[0:1] == '!':
+            flag, sense = flag[1:], FLAG_SENSE_DISALLOWED
+        elif kind[0:1] == '~':
+            flag, sense = flag[1:], FLAG_SENSE_PREFERRED
+        else:
+            sense = FLAG_SENSE_REQUIRED
+
+        if strong:
+            sense = toStrongMap[sense]
+
+        bit = bits.get(flag, None)
+        if bit is None:
+            bit = bits[flag] = 1 << len(bits)
+
+        masks[FLAG_SENSE_UNSPECIFIED] |= bit
+        masks[sense] |= bit
+
+    return tuple(masks)
+
+def _compileFrozen(frozen, strong = False):
+    key = (frozen, strong)
+    compiled = _compiledFlavorCache.get(key, None)
+    if compiled is not None:
+        return compiled
+
+    compiled = {}
+    i = 0
+    depSetSplit = dep_freeze.depSetSplit
+    depSplit = dep_freeze.depSplit
+    while i < len(frozen):
+        (i, tag, depStr) = depSetSplit(i, frozen)
+        depClass = compiled.get(tag, None)
+        if depClass is None:
+            depClass = compiled[tag] = (
+                            dependencyClasses[tag].depNameSignificant, {})
+        name, flags = depSplit(depStr)
+        depClass[1][name] = _compileFlags(tag, name, flags, strong)
+
+    _compiledFlavorCache[key] = compiled
+    return compiled
+
+def _scoreMasks(system, required):
+    score = 0
+    for sysSense, reqSense, thisScore in _scorePairs:
+        if sysSense == FLAG_SENSE_UNSPECIFIED:
+            bits = required[reqSense] & ~system[FLAG_SENSE_UNSPECIFIED]
+        else:
+            bits = required[reqSense] & system[sysSense]
+
+        if bits:
+            if thisScore is None:
+                return False
+            score += thisScore * _popcount(bits)
+
+    return score
+
+def _scoreCompiled(system, required):
+    """
+    Equivalent to DependencySet.score() for compiled dependency sets.
+    """
+    score = 0
+    for tag, (significant, reqDeps) in required.iteritems():
+        sysDeps = system.get(tag, _emptyCompiledClass)[1]
+        for name, reqMasks in reqDeps.iteritems():
+            sysMasks = sysDeps.get(name, None)
+            if sysMasks is None:
+                # see DependencyClass.score() and Dependency.emptyDepsScore()
+                if significant or not reqMasks[FLAG_SENSE_UNSPECIFIED]:
+                    return False
+                sysMasks = _noFlags
+
+            thisScore = _scoreMasks(sysMasks, reqMasks)
+            if thisScore is False:
+                return False
+
+            score += thisScore
+            if significant:
+                score += 1
+
+    return score
+
+def _scoreFrozen(sysFrozen, reqFrozen, sysStrong = False, reqStrong = False,
+                 sysCompiled = None):
+    key = (sysFrozen, reqFrozen, sysStrong, reqStrong)
+    score = _flavorScoreCache.get(key, None)
+    if score is not None:
+        return score
+
+    if sysCompiled is None:
+        sysCompiled = _compileFrozen(sysFrozen, sysStrong)
+    score = _scoreCompiled(sysCompiled, _compileFrozen(reqFrozen, reqStrong))
+
+    # hits are far more common than misses, so this is a plain dict which
+    # is emptied when it fills up rather than a (slower) LRU cache
+    global _flavorScoreMisses
+    _flavorScoreMisses += 1
+    if len(_flavorScoreCache) >= _flavorScoreLimit:
+        _flavorScoreCache.clear()
+    _flavorScoreCache[key] = score
+    return score
+
+@api.developerApi
+def scoreFlavorList(systemFlavor, flavorList):
+    """
+    Scores many flavors against a single system flavor at once.
+    Equivalent to C{[ systemFlavor.score(x) for x in flavorList ]}, but
+    the system flavor is compiled only once and the results are cached
+    process-wide.
+
+    @param systemFlavor: flavor the candidates are scored against
+    @type systemFlavor: L{deps.deps.Flavor}
+    @param flavorList: candidate flavors
+    @type flavorList: list of L{deps.deps.Flavor}
+    @return: list of scores, C{False} for flavors which do not match
+    @rtype: list
+    """
+    sysFrozen = _frozenForScore(systemFlavor)
+    sysCompiled = _compileFrozen(sysFrozen)
+    return [ _scoreFrozen(sysFrozen, _frozenForScore(x),
+                          sysCompiled = sysCompiled)
+             for x in flavorList ]
+
+@api.developerApi
+def scoreStrongFlavorList(flavorList, requiredFlavor):
+    """
+    Scores the strong form of each flavor in a list against a single
+    required flavor. Equivalent to
+    C{[ x.toStrongFlavor().score(requiredFlavor) for x in flavorList ]}
+    without creating the strong flavors.
+
+    @param flavorList: candidate flavors
+    @type flavorList: list of L{deps.deps.Flavor}
+    @param requiredFlavor: flavor the candidates need to satisfy
+    @type requiredFlavor: L{deps.deps.Flavor}
+    @return: list of scores, C{False} for flavors which do not match
+    @rtype: list
+    """
+    reqFrozen = _frozenForScore(requiredFlavor)
+    return [ _scoreFrozen(_frozenForScore(x), reqFrozen, sysStrong = True)
+             for x in flavorList ]
+
+def resetFlavorScoreCache(compileCacheSize = None, scoreCacheSize = None):
+    """
+    Empties the process-wide flavor score caches, optionally changing
+    their size limits.
+    """
+    global _compiledFlavorCache, _flavorScoreCache, _flavorScoreMisses
+    global _flavorScoreLimit
+    if compileCacheSize is None:
+        compileCacheSize = FLAVOR_COMPILE_CACHE_SIZE
+    if scoreCacheSize is None:
+        scoreCacheSize = FLAVOR_SCORE_CACHE_SIZE
+    _compiledFlavorCache = util.LRUCache(compileCacheSize)
+    _flavorScoreCache = {}
+    _flavorScoreLimit = scoreCacheSize
+    _flavorScoreMisses = 0
+
+def getFlavorScoreCacheStats():
+    """
+    Returns a dict describing the size and effectiveness of the flavor
+    score caches.
+    """
+    return dict(compiled = len(_compiledFlavorCache),
+                compiledHits = _compiledFlavorCache.hits,
+                compiledMisses = _compiledFlavorCache.misses,
+                scores = len(_flavorScoreCache),
+                scoreMisses = _flavorScoreMisses)
+
+resetFlavorScoreCache()
@@ -292,6 +292,7 @@ class File(streams.StreamSet):
         FILE_STREAM_FLAVOR   : (SMALL, streams.FlavorsStream, 'flavor'),
         FILE_STREAM_TAGS     : (SMALL, streams.StringsStream, "tags")
         }
+    lazyStreams = { 'provides' : True, 'requires' : True }
 
     __slots__ = [ "thePathId", "inode", "flags", "tags",
                   'provides', 'requires', 'flavor' ]
@@ -674,7 +675,9 @@ class RegularFile(File):
         File.__init__(self, *args, **kargs)
 
 def FileFromFilesystem(path, pathId, possibleMatch = None, inodeInfo = False,
-        assumeRoot=False, statBuf=None, sha1FailOk=False):
+        assumeRoot=False, statBuf=None, sha1FailOk=False, sha1=None):
+    # sha1, if given, is the digest of the contents of a regular file at
+    # path, computed by the caller from the same statBuf
     if statBuf:
         s = statBuf
     else:
@@ -780,6 +783,8 @@ def FileFromFilesystem(path, pathId, possibleMatch = None, inodeInfo = False,
             prelink.wait()
             f.contents.size.set(size)
             sha1 = d.digest()
+        elif sha1 is not None:
+            f.contents.size.set(s.st_size)
         else:
             try:
                 sha1 = sha1helper.sha1FileBin(path)
@@ -38,6 +38,12 @@ import StringIO
 import struct
 import sys
 import errno
+import zlib
+
+# Amount of data read at a time when skipping over entries
+SKIP_SIZE = 128 * 1024
+# Uncompressed bytes between restart points of a CheckpointedPayload
+CHECKPOINT_SIZE = 1024 * 1024
 
 class Error(Exception):
     "Base exception"
@@ -144,7 +150,7 @@ class CpioStream(object):
 
     def next(self):
         if self._nextEntry != self._currentPosition:
-            self._readExact(self._nextEntry - self._currentPosition)
+            self._skip(self._nextEntry - self._currentPosition)
         buf = self._readExact(CpioHeader.HeaderLength, eofOK = True)
         if not buf:
             return None
@@ -169,6 +175,21 @@ class CpioStream(object):
                 break
             yield entry
 
+    def index(self):
+        """
+        Reads the rest of the archive without reading the contents of the
+        entries, and returns a L{CpioMember} for each entry.
+        """
+        members = []
+        while True:
+            headerOffset = self._nextEntry
+            entry = self.next()
+            if entry is None or entry.filename == 'TRAILER!!!':
+                break
+            members.append(CpioMember(entry.filename, entry.header,
+                                      headerOffset, self._currentPosition))
+        return members
+
     def read(self, amt):
         return self._readExact(amt)
         out = StringIO.StringIO()
@@ -203,6 +224,10 @@ class CpioStream(object):
     def tell(self):
         return self._currentPosition
 
+    def _skip(self, amt):
+        while amt:
+            amt -= len(self._readExact(min(amt, SKIP_SIZE)))
+
     def _readExact(self, amt, eofOK = False):
         buf = self.stream.read(amt)
         if not buf and eofOK:
@@ -213,6 +238,202 @@ class CpioStream(object):
         self._currentPosition += amt
         return buf
 
+class CpioMember(object):
+    """
+    Entry of a cpio archive index: the header of the entry, and the
+    offsets of the header and of the contents in the archive.
+    """
+    __slots__ = [ 'filename', 'header', 'headerOffset', 'dataOffset' ]
+    def __init__(self, filename, header, headerOffset, dataOffset):
+        self.filename = filename
+        self.header = header
+        self.headerOffset = headerOffset
+        self.dataOffset = dataOffset
+
+class RangeStream(object):
+    """
+    Reads size bytes of stream, starting at offset. The position of the
+    parent stream is set before every read, so any number of range streams
+    can read from the same parent in any order.
+    """
+    __slots__ = [ '_stream', '_offset', '_size', '_position' ]
+
+    def __init__(self, stream, offset, size):
+        self._stream = stream
+        self._offset = offset
+        self._size = size
+        self._position = 0
+
+    def read(self, amt = None):
+        if amt is None or amt > self._size - self._position:
+            amt = self._size - self._position
+        if amt <= 0:
+            return ""
+        self._stream.seek(self._offset + self._position)
+        buf = self._stream.read(amt)
+        if len(buf) != amt:
+            raise ShortReadError("Expected %d bytes, got %d" % (
+                amt, len(buf)))
+        self._position += amt
+        return buf
+
+    def tell(self):
+        return self._position
+
+class RandomAccessCpio(object):
+    """
+    Reads the entries of a cpio archive in any order. The archive must be
+    seekable; L{CheckpointedPayload} makes compressed payloads seekable.
+    Reading an entry only reads that entry, once the archive is indexed.
+
+    @param stream: the archive
+    @param members: the index of the archive, as returned by
+    L{CpioStream.index}. The archive is read to build it if it is not given.
+    """
+
+    def __init__(self, stream, members = None):
+        self.stream = stream
+        if members is None:
+            stream.seek(0)
+            members = CpioStream(stream).index()
+        self.members = members
+        self._byName = dict((x.filename, x) for x in members)
+
+    def __iter__(self):
+        for member in self.members:
+            yield self._getEntry(member)
+
+    def getEntry(self, filename):
+        """
+        Returns the L{CpioEntry} for filename, or None if the archive has
+        no such entry.
+        """
+        member = self._byName.get(filename)
+        if member is None:
+            return None
+        return self._getEntry(member)
+
+    def _getEntry(self, member):
+        payload = RangeStream(self.stream, member.dataOffset,
+                              member.header.filesize)
+        return CpioEntry(member.header, member.filename, payload)
+
+class CheckpointWriter(object):
+    """
+    Copies a stream to dest in the L{CheckpointedPayload} format as the
+    stream is read. Reading can stop anywhere; close() copies the rest
+    of the stream and writes the checkpoint table.
+    """
+
+    def __init__(self, stream, dest, checkpointSize = CHECKPOINT_SIZE):
+        self.stream = stream
+        self.dest = dest
+        self.checkpointSize = checkpointSize
+        self.offsets = []
+        self.size = 0
+        self._pending = []
+        self._pendingSize = 0
+        dest.write(CheckpointedPayload.MAGIC +
+                   struct.pack("!I", CheckpointedPayload.VERSION))
+
+    def read(self, amt):
+        buf = self.stream.read(amt)
+        if buf:
+            self._pending.append(buf)
+            self._pendingSize += len(buf)
+            self.size += len(buf)
+            while self._pendingSize >= self.checkpointSize:
+                self._writeChunk()
+        return buf
+
+    def _writeChunk(self):
+        data = ''.join(self._pending)
+        self.offsets.append(self.dest.tell())
+        self.dest.write(zlib.compress(data[:self.checkpointSize]))
+        data = data[self.checkpointSize:]
+        self._pending = [ data ]
+        self._pendingSize = len(data)
+
+    def close(self):
+        while self.read(SKIP_SIZE):
+            pass
+        if self._pendingSize:
+            self._writeChunk()
+        tableOffset = self.dest.tell()
+        self.offsets.append(tableOffset)
+        self.dest.write(struct.pack("!%dQ" % len(self.offsets),
+                                    *self.offsets))
+        self.dest.write(struct.pack(CheckpointedPayload.FOOTER, self.size,
+                                    tableOffset, self.checkpointSize))
+
+class CheckpointedPayload(object):
+    """
+    Seekable, compressed copy of a stream, written by L{CheckpointWriter}.
+    Every checkpointSize bytes of the stream are compressed on their own,
+    so reading at any offset decompresses at most one checkpoint worth of
+    data before it. The layout is::
+
+        MAGIC VERSION chunk... offset... footer
+
+    where each chunk is compressed with zlib, the offsets (network order,
+    64 bit) give where each chunk starts followed by where the offsets
+    start, and the footer is the uncompressed size, the offset of the
+    offsets and the checkpoint size.
+    """
+
+    MAGIC = 'CPIOCKPT'
+    VERSION = 1
+    FOOTER = "!QQI"
+
+    def __init__(self, f):
+        self.f = f
+        f.seek(0)
+        if f.read(len(self.MAGIC)) != self.MAGIC:
+            raise InvalidMagicError(self.MAGIC)
+        footerSize = struct.calcsize(self.FOOTER)
+        f.seek(-footerSize, 2)
+        footerOffset = f.tell()
+        self.size, tableOffset, self.checkpointSize = struct.unpack(
+                self.FOOTER, f.read(footerSize))
+        count = (footerOffset - tableOffset) / 8
+        f.seek(tableOffset)
+        self.offsets = struct.unpack("!%dQ" % count, f.read(count * 8))
+        self._position = 0
+        self._chunkIndex = None
+        self._chunk = ''
+
+    def _getChunk(self, idx):
+        if idx != self._chunkIndex:
+            start, end = self.offsets[idx:idx + 2]
+            self.f.seek(start)
+            self._chunk = zlib.decompress(self.f.read(end - start))
+            self._chunkIndex = idx
+        return self._chunk
+
+    def read(self, amt = None):
+        if amt is None or amt > self.size - self._position:
+            amt = self.size - self._position
+        l = []
+        while amt > 0:
+            idx, start = divmod(self._position, self.checkpointSize)
+            buf = self._getChunk(idx)[start:start + amt]
+            if not buf:
+                raise ShortReadError("Expected %d bytes, got none" % amt)
+            l.append(buf)
+            amt -= len(buf)
+            self._position += len(buf)
+        return ''.join(l)
+
+    def seek(self, offset, whence = 0):
+        if whence == 1:
+            offset += self._position
+        elif whence == 2:
+            offset += self.size
+        self._position = max(0, min(offset, self.size))
+
+    def tell(self):
+        return self._position
+
 class CpioExploder(CpioStream):
 
     def explode(self, destDir):
@@ -33,6 +33,8 @@
 static PyMethodDef CStreamsMethods[] = {
     { "splitFrozenStreamSet", StreamSet_split, METH_VARARGS },
     { "whiteOutFrozenStreamSet", StreamSet_remove, METH_VARARGS },
+    { "diffFileMaps", TroveFiles_diff, METH_VARARGS },
+    { "applyFileChanges", TroveFiles_apply, METH_VARARGS },
     { NULL },
 };
 
@@ -23,6 +23,8 @@ void stringstreaminit(PyObject * m);
 
 PyObject *StreamSet_split(PyObject *self, PyObject *args);
 PyObject *StreamSet_remove(PyObject *self, PyObject *args);
+PyObject *TroveFiles_diff(PyObject *self, PyObject *args);
+PyObject *TroveFiles_apply(PyObject *self, PyObject *args);
 
 extern PyTypeObject StringStreamType;
 extern PyTypeObject NumericStreamType;
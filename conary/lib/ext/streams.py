@@ -159,14 +159,37 @@ _tagInfo = namedtuple('_tagInfo', 'tag sizeType type name')
 
 class StreamSet(_BaseStream):
     streamDict = None
+    lazyStreams = None
     ignoreUnknown = FAIL_UNKNOWN
 
     def __init__(self, data=None, offset=0):
+        # Lazy streams are created when they're first accessed. If this
+        # object is being reinitialized they may already exist, so reset
+        # them the same way as everything else.
+        fresh = '_lazyData' not in self.__dict__
         self._unknownTags = []
+        self._lazyData = {}
+        lazyTags = self._getLazyTags()
         for tag in self._getTags():
+            if fresh and tag.name in lazyTags:
+                continue
             setattr(self, tag.name, tag.type())
         if data is not None:
-            self.thaw(data[offset:])
+            self._thaw(data[offset:], fresh)
+
+    def __getattr__(self, name):
+        # Only called when normal lookup fails, which is the case for lazy
+        # streams which haven't been accessed yet.
+        tag = self._getLazyTags().get(name)
+        if tag is None:
+            raise AttributeError("'%s' object has no attribute '%s'" %
+                    (type(self).__name__, name))
+        value = tag.type()
+        frozen = self.__dict__.get('_lazyData', {}).pop(name, None)
+        if frozen is not None:
+            value.thaw(frozen)
+        setattr(self, name, value)
+        return value
 
     @classmethod
     def _getTags(cls):
@@ -184,6 +207,17 @@ class StreamSet(_BaseStream):
             cls._streamTags = tags
         return tags
 
+    @classmethod
+    def _getLazyTags(cls):
+        lazyTags = cls.__dict__.get('_lazyTags', None)
+        if lazyTags is None:
+            lazyTags = {}
+            if cls.lazyStreams:
+                lazyTags = dict((tag.name, tag) for tag in cls._getTags()
+                        if tag.name in cls.lazyStreams)
+            cls._lazyTags = lazyTags
+        return lazyTags
+
     def __eq__(self, other, skipSet=None):
         if type(self) != type(other):
             return False
@@ -274,7 +308,13 @@ class StreamSet(_BaseStream):
         return tagNum, sizeType, substream, frozen
 
     def thaw(self, frozen):
+        self._thaw(frozen, False)
+
+    def _thaw(self, frozen, fresh):
+        # fresh is set if the lazy streams of self are known not to exist
+        # yet, which is the case when thawing from __init__
         tagMap = dict((x.tag, x) for x in self._getTags())
+        lazyTags = self._getLazyTags()
         self._unknownTags = []
         while frozen:
             tagNum, sizeType, substream, frozen = self._readTag(frozen)
@@ -289,6 +329,14 @@ class StreamSet(_BaseStream):
                     continue
                 else:
                     raise ValueError("unknown tag in stream set")
+            if tag.name in lazyTags:
+                if not fresh:
+                    try:
+                        delattr(self, tag.name)
+                    except AttributeError:
+                        pass
+                self._lazyData[tag.name] = substream
+                continue
             setattr(self, tag.name, tag.type(substream))
 
     def diff(self, other, ignoreUnknown=False):
@@ -346,3 +394,26 @@ def splitFrozenStreamSet(frozen):
 
 def whiteOutFrozenStreamSet(frozen, skipId):
     raise NotImplementedError
+
+
+def diffFileMaps(newMap, oldMap):
+    added = [ x for x in newMap if x not in oldMap ]
+    removed = [ x for x in oldMap if x not in newMap ]
+    changed = [ x for (x, val) in newMap.iteritems()
+                if x in oldMap and oldMap[x] != val ]
+    return added, removed, changed
+
+
+def applyFileChanges(fileMap, newFiles, changedFiles):
+    for (pathId, dirName, baseName, fileId, version) in newFiles:
+        fileMap[pathId] = (dirName, baseName, fileId, version)
+
+    for (pathId, dirName, baseName, fileId, version) in changedFiles:
+        (origDir, origBase, origFileId, origVersion) = fileMap[pathId]
+        if baseName is None:
+            dirName, baseName = origDir, origBase
+        if not version:
+            version = origVersion
+        if not fileId:
+            fileId = origFileId
+        fileMap[pathId] = (dirName, baseName, fileId, version)
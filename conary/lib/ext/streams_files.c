@@ -0,0 +1,201 @@
+/*
+ * Copyright (c) SAS Institute Inc.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+/*
+ * Bulk operations on the file lists of troves (TroveRefsFilesStream),
+ * which map pathId -> (dirName, baseName, fileId, version). Large troves
+ * have hundreds of thousands of entries, and walking them in Python
+ * dominates changeset generation and application.
+ */
+
+#include <Python.h>
+
+#include "pycompat.h"
+#include "streams.h"
+
+
+/* diffFileMaps(new, old) -> (added, removed, changed)
+ *
+ * Returns lists of the pathIds which are only in new, only in old, and
+ * in both but with different values.
+ */
+PyObject *TroveFiles_diff(PyObject *self, PyObject *args) {
+    PyObject *newMap, *oldMap, *key, *newVal, *oldVal;
+    PyObject *added = NULL, *removed = NULL, *changed = NULL;
+    Py_ssize_t pos;
+    int rc;
+
+    if (!PyArg_ParseTuple(args, "O!O!", &PyDict_Type, &newMap,
+                          &PyDict_Type, &oldMap))
+        return NULL;
+
+    if (!(added = PyList_New(0)) || !(removed = PyList_New(0)) ||
+            !(changed = PyList_New(0)))
+        goto onerror;
+
+    pos = 0;
+    while (PyDict_Next(newMap, &pos, &key, &newVal)) {
+        oldVal = PyDict_GetItem(oldMap, key);
+        if (oldVal == NULL) {
+            if (PyList_Append(added, key))
+                goto onerror;
+            continue;
+        }
+
+        /* tuple comparison checks identity before calling __eq__, so
+           unchanged entries sharing version objects are cheap */
+        rc = PyObject_RichCompareBool(newVal, oldVal, Py_NE);
+        if (rc < 0)
+            goto onerror;
+        if (rc && PyList_Append(changed, key))
+            goto onerror;
+    }
+
+    pos = 0;
+    while (PyDict_Next(oldMap, &pos, &key, &oldVal)) {
+        rc = PyDict_Contains(newMap, key);
+        if (rc < 0)
+            goto onerror;
+        if (!rc && PyList_Append(removed, key))
+            goto onerror;
+    }
+
+    return Py_BuildValue("(NNN)", added, removed, changed);
+
+onerror:
+    Py_XDECREF(added);
+    Py_XDECREF(removed);
+    Py_XDECREF(changed);
+    return NULL;
+}
+
+static int getFileTuple(PyObject *item, PyObject **pathId,
+                        PyObject **dirName, PyObject **baseName,
+                        PyObject **fileId, PyObject **version) {
+    if (!PyTuple_Check(item) || PyTuple_GET_SIZE(item) != 5) {
+        PyErr_SetString(PyExc_TypeError,
+                        "(pathId, dirName, baseName, fileId, version) "
+                        "tuple expected");
+        return -1;
+    }
+
+    *pathId = PyTuple_GET_ITEM(item, 0);
+    *dirName = PyTuple_GET_ITEM(item, 1);
+    *baseName = PyTuple_GET_ITEM(item, 2);
+    *fileId = PyTuple_GET_ITEM(item, 3);
+    *version = PyTuple_GET_ITEM(item, 4);
+
+    return 0;
+}
+
+static int setFile(PyObject *map, PyObject *pathId, PyObject *dirName,
+                   PyObject *baseName, PyObject *fileId, PyObject *version) {
+    PyObject *val;
+    int rc;
+
+    val = PyTuple_Pack(4, dirName, baseName, fileId, version);
+    if (val == NULL)
+        return -1;
+
+    rc = PyDict_SetItem(map, pathId, val);
+    Py_DECREF(val);
+    return rc;
+}
+
+/* applyFileChanges(map, newFiles, changedFiles)
+ *
+ * Applies the raw new and changed file lists of a TroveChangeSet to a
+ * file map, the same way Trove.addRawFile() and Trove.updateRawFile() do.
+ */
+PyObject *TroveFiles_apply(PyObject *self, PyObject *args) {
+    PyObject *map, *newFiles, *changedFiles, *item, *orig, *seq;
+    PyObject *pathId, *dirName, *baseName, *fileId, *version;
+    Py_ssize_t i, len;
+    int rc;
+
+    if (!PyArg_ParseTuple(args, "O!OO", &PyDict_Type, &map, &newFiles,
+                          &changedFiles))
+        return NULL;
+
+    seq = PySequence_Fast(newFiles, "new file list must be a sequence");
+    if (seq == NULL)
+        return NULL;
+
+    len = PySequence_Fast_GET_SIZE(seq);
+    for (i = 0; i < len; i++) {
+        item = PySequence_Fast_GET_ITEM(seq, i);
+        if (getFileTuple(item, &pathId, &dirName, &baseName, &fileId,
+                         &version) ||
+                setFile(map, pathId, dirName, baseName, fileId, version)) {
+            Py_DECREF(seq);
+            return NULL;
+        }
+    }
+    Py_DECREF(seq);
+
+    seq = PySequence_Fast(changedFiles,
+                          "changed file list must be a sequence");
+    if (seq == NULL)
+        return NULL;
+
+    len = PySequence_Fast_GET_SIZE(seq);
+    for (i = 0; i < len; i++) {
+        item = PySequence_Fast_GET_ITEM(seq, i);
+        if (getFileTuple(item, &pathId, &dirName, &baseName, &fileId,
+                         &version)) {
+            Py_DECREF(seq);
+            return NULL;
+        }
+
+        orig = PyDict_GetItem(map, pathId);
+        if (orig == NULL) {
+            PyErr_SetObject(PyExc_KeyError, pathId);
+            Py_DECREF(seq);
+            return NULL;
+        }
+
+        if (baseName == Py_None) {
+            dirName = PyTuple_GET_ITEM(orig, 0);
+            baseName = PyTuple_GET_ITEM(orig, 1);
+        }
+
+        rc = PyObject_IsTrue(version);
+        if (rc < 0) {
+            Py_DECREF(seq);
+            return NULL;
+        } else if (!rc) {
+            version = PyTuple_GET_ITEM(orig, 3);
+        }
+
+        rc = PyObject_IsTrue(fileId);
+        if (rc < 0) {
+            Py_DECREF(seq);
+            return NULL;
+        } else if (!rc) {
+            fileId = PyTuple_GET_ITEM(orig, 2);
+        }
+
+        if (setFile(map, pathId, dirName, baseName, fileId, version)) {
+            Py_DECREF(seq);
+            return NULL;
+        }
+    }
+    Py_DECREF(seq);
+
+    Py_RETURN_NONE;
+}
+
+/* vim: set sts=4 sw=4 expandtab : */
@@ -40,12 +40,14 @@ struct tagInfo {
     int size;
     PyObject * name;
     PyObject * type;
+    int lazy;
 };
 
 typedef struct {
     PyObject_HEAD
     struct tagInfo * tags;
     int tagCount;
+    int lazyCount;
 } StreamSetDefObject;
 
 typedef struct {
@@ -56,10 +58,14 @@ typedef struct {
         int sizeType;
         PyObject * data;
     } * unknownTags;
+    /* frozen data for lazy streams which haven't been thawed yet, keyed
+       by stream name; NULL until something needs to be stored */
+    PyObject * lazyData;
+    int initialized;
 } StreamSetObject;
 
 static int Thaw_raw(PyObject * self, StreamSetDefObject * ssd,
-		    char * data, int dataLen, int offset);
+		    char * data, int dataLen, int offset, int fresh);
 
 /* ------------------------------------- */
 /* StreamSetDef Implementation           */
@@ -79,14 +85,14 @@ static int StreamSetDef_Init(PyObject * self, PyObject * args,
 			     PyObject * kwargs) {
     /* Borrowed references */
     StreamSetDefObject * ssd = (void *) self;
-    PyObject *spec;
+    PyObject *spec, *lazy = Py_None;
     /* Kept references */
     PyListObject *items = NULL;
-    static char * kwlist[] = { "spec", NULL };
-    int i, j;
+    static char * kwlist[] = { "spec", "lazy", NULL };
+    int i, j, rc;
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!", kwlist,
-				     &PyDict_Type, &spec)) {
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!|O", kwlist,
+				     &PyDict_Type, &spec, &lazy)) {
         return -1;
     }
 
@@ -96,6 +102,7 @@ static int StreamSetDef_Init(PyObject * self, PyObject * args,
     }
 
     ssd->tagCount = Py_SIZE(items);
+    ssd->lazyCount = 0;
     ssd->tags = malloc(ssd->tagCount * sizeof(*ssd->tags));
     if (ssd->tags == NULL) {
         PyErr_NoMemory();
@@ -119,6 +126,14 @@ static int StreamSetDef_Init(PyObject * self, PyObject * args,
         ssd->tags[i].name = PYBYTES_FromString(name);
         ssd->tags[i].type = streamType;
         Py_INCREF(streamType);
+
+        if (lazy != Py_None) {
+            rc = PySequence_Contains(lazy, ssd->tags[i].name);
+            if (rc == -1)
+                goto onerror;
+            ssd->tags[i].lazy = rc;
+            ssd->lazyCount += rc;
+        }
     }
 
     /* simple bubble sort */
@@ -152,7 +167,7 @@ onerror:
 
 static StreamSetDefObject * StreamSet_GetSSD(PyTypeObject *o) {
     /* returns a borrowed reference to the ssd */
-    PyObject *sd;
+    PyObject *sd, *lazy;
     int rc;
     PyObject *arg;
     StreamSetDefObject * ssd;
@@ -189,11 +204,23 @@ static StreamSetDefObject * StreamSet_GetSSD(PyTypeObject *o) {
 	return NULL;
     }
 
+    /* streams listed in lazyStreams are thawed on first access */
+    lazy = PyObject_GetAttrString((PyObject *) o, "lazyStreams");
+    if (!lazy) {
+	PyErr_Clear();
+	lazy = Py_None;
+	Py_INCREF(lazy);
+    }
+
     ssd = (void *) PyObject_New(StreamSetDefObject, &StreamSetDefType);
-    if (NULL == ssd)
+    if (NULL == ssd) {
+	Py_DECREF(sd);
+	Py_DECREF(lazy);
 	return NULL;
-    arg = PyTuple_New(1);
+    }
+    arg = PyTuple_New(2);
     PyTuple_SetItem(arg, 0, sd);
+    PyTuple_SetItem(arg, 1, lazy);
     rc = StreamSetDef_Init((PyObject *) ssd, arg, NULL);
     Py_DECREF(arg);
     if (-1 == rc)
@@ -770,10 +797,17 @@ static int StreamSet_Init(PyObject * o, PyObject * args,
 
     self->unknownCount = 0;
     self->unknownTags = NULL;
+    Py_CLEAR(self->lazyData);
 
     for (i = 0; i < ssd->tagCount; i++) {
 	PyObject * obj;
 
+        /* lazy streams are created when they're first accessed. if this
+           object is being reinitialized they may already exist, so
+           reset them the same way as everything else */
+        if (ssd->tags[i].lazy && !self->initialized)
+            continue;
+
         if (!(obj = PyObject_CallFunction(ssd->tags[i].type, NULL)))
 	    return -1;
 
@@ -785,12 +819,16 @@ static int StreamSet_Init(PyObject * o, PyObject * args,
 	Py_DECREF(obj);
     }
 
-    if (!data)
+    if (!data) {
+        self->initialized = 1;
 	return 0;
+    }
 
-    if (Thaw_raw(o, ssd, data, dataLen, offset))
+    if (Thaw_raw(o, ssd, data, dataLen, offset, !self->initialized))
 	return -1;
 
+    self->initialized = 1;
+
     return 0;
 }
 
@@ -804,9 +842,82 @@ static void StreamSet_Dealloc(PyObject * self) {
 
     if (sset->unknownCount)
         free(sset->unknownTags);
+    Py_XDECREF(sset->lazyData);
     Py_TYPE(self)->tp_free(self);
 }
 
+static StreamSetDefObject * StreamSet_FindSSD(PyTypeObject *o) {
+    /* like StreamSet_GetSSD, but returns NULL without setting an
+       exception if the ssd hasn't been created yet */
+    PyObject * ssd;
+
+    ssd = PyDict_GetItemString(o->tp_dict, "_streamDict");
+    if (ssd == NULL || Py_TYPE(ssd) != &StreamSetDefType)
+        return NULL;
+
+    return (StreamSetDefObject *) ssd;
+}
+
+static PyObject * StreamSet_GetAttr(PyObject * self, PyObject * name) {
+    StreamSetObject * sset = (StreamSetObject *) self;
+    StreamSetDefObject * ssd;
+    PyObject * obj, * data, * ro;
+    int i, rc;
+
+    obj = PyObject_GenericGetAttr(self, name);
+    if (obj || !PyErr_ExceptionMatches(PyExc_AttributeError))
+        return obj;
+
+    /* lazy streams aren't set until they're needed. look for one
+       which matches this name, and thaw it now */
+    ssd = StreamSet_FindSSD(Py_TYPE(self));
+    if (ssd == NULL || !ssd->lazyCount)
+        return NULL;
+
+    for (i = 0; i < ssd->tagCount; i++) {
+        if (!ssd->tags[i].lazy)
+            continue;
+        rc = PyObject_RichCompareBool(name, ssd->tags[i].name, Py_EQ);
+        if (rc == -1)
+            return NULL;
+        if (rc)
+            break;
+    }
+
+    if (i == ssd->tagCount)
+        return NULL;
+
+    PyErr_Clear();
+
+    if (!(obj = PyObject_CallFunction(ssd->tags[i].type, NULL)))
+        return NULL;
+
+    data = NULL;
+    if (sset->lazyData)
+        data = PyDict_GetItem(sset->lazyData, ssd->tags[i].name);
+
+    if (data) {
+        ro = PyObject_CallMethod(obj, "thaw", "O", data);
+        if (!ro) {
+            Py_DECREF(obj);
+            return NULL;
+        }
+        Py_DECREF(ro);
+
+        if (PyDict_DelItem(sset->lazyData, ssd->tags[i].name)) {
+            Py_DECREF(obj);
+            return NULL;
+        }
+    }
+
+    if (PyObject_SetAttr(self, ssd->tags[i].name, obj)) {
+        Py_DECREF(obj);
+        return NULL;
+    }
+
+    return obj;
+}
+
 static PyObject * StreamSet_Thaw(PyObject * o, PyObject * args) {
     char * data = NULL;
     int dataLen;
@@ -820,7 +931,7 @@ static PyObject * StreamSet_Thaw(PyObject * o, PyObject * args) {
 	return NULL;
     }
 
-    if (Thaw_raw(o, ssd, data, dataLen, 0))
+    if (Thaw_raw(o, ssd, data, dataLen, 0, 0))
 	return NULL;
 
     Py_INCREF(Py_None);
@@ -828,10 +939,12 @@ static PyObject * StreamSet_Thaw(PyObject * o, PyObject * args) {
 }
 
 static int Thaw_raw(PyObject * self, StreamSetDefObject * ssd,
-		    char * data, int dataLen, int offset) {
+		    char * data, int dataLen, int offset, int fresh) {
+    /* fresh is set if the lazy streams of self are known not to
+       exist yet, which is the case when thawing from __init__ */
     char * streamData, * chptr, * end;
     int size, i, sizeType;
-    PyObject * attr, * ro;
+    PyObject * attr, * ro, * frozen;
     int ignoreUnknown = -1;
     unsigned int streamId;
     StreamSetObject * sset = (StreamSetObject *) self;
@@ -876,7 +989,43 @@ static int Thaw_raw(PyObject * self, StreamSetDefObject * ssd,
             continue;
 	}
 
-	attr = PyObject_GetAttr((PyObject *) self, ssd->tags[i].name);
+        if (ssd->tags[i].lazy) {
+            attr = NULL;
+            if (!fresh) {
+                /* thaw() on top of an existing stream is a merge for
+                   some types, so streams which have already been created
+                   (or have data waiting) are thawed in place */
+                if (sset->lazyData &&
+                        PyDict_GetItem(sset->lazyData, ssd->tags[i].name))
+                    attr = PyObject_GetAttr(self, ssd->tags[i].name);
+                else {
+                    attr = PyObject_GenericGetAttr(self, ssd->tags[i].name);
+                    if (!attr) {
+                        if (!PyErr_ExceptionMatches(PyExc_AttributeError))
+                            return -1;
+                        PyErr_Clear();
+                    }
+                }
+            }
+
+            if (!attr) {
+                if (!sset->lazyData && !(sset->lazyData = PyDict_New()))
+                    return -1;
+
+                frozen = PYBYTES_FromStringAndSize(streamData, size);
+                if (!frozen)
+                    return -1;
+                if (PyDict_SetItem(sset->lazyData, ssd->tags[i].name,
+                                   frozen)) {
+                    Py_DECREF(frozen);
+                    return -1;
+                }
+                Py_DECREF(frozen);
+                continue;
+            }
+        } else {
+            attr = PyObject_GetAttr((PyObject *) self, ssd->tags[i].name);
+        }
         if (!attr) {
             return -1;
         }
@@ -1195,7 +1344,7 @@ PyTypeObject StreamSetType = {
     StreamSet_Hash,                 /*tp_hash */
     0,				    /*tp_call*/
     0,                              /*tp_str*/
-    0,                              /*tp_getattro*/
+    StreamSet_GetAttr,              /*tp_getattro*/
     0,                              /*tp_setattro*/
     0,                              /*tp_as_buffer*/
     Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE,             /*tp_flags*/
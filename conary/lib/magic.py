@@ -15,10 +15,12 @@
 #
 
 
+import cPickle
 import os
 import re
 import stat
 import string
+import time
 import xml.dom.minidom
 import zipfile
 import gzip as gzip_module
@@ -29,6 +31,7 @@ from conary import rpmhelper
 from conary.lib import debhelper
 from conary.lib import elf
 from conary.lib import javadeps
+from conary.lib import sha1helper
 from conary.lib import util
 
 MSI_MAGIC_STRINGS = (
@@ -432,13 +435,199 @@ def magic(path, basedir=''):
     return None
 
 class magicCache(dict):
-    def __init__(self, basedir=''):
+    def __init__(self, basedir='', diskCache=None):
         self.basedir = basedir
+        self.diskCache = diskCache
     def __getitem__(self, name):
         if name not in self:
-            self[name] = magic(name, self.basedir)
+            if self.diskCache is not None:
+                self[name] = self.diskCache.magic(name, self.basedir)
+            else:
+                self[name] = magic(name, self.basedir)
         return dict.__getitem__(self, name)
 
+# Bump whenever the contents computed for any of the classes stored in
+# the disk cache change, so that stale entries are ignored.
+MAGIC_CACHE_VERSION = 1
+
+class MagicDiskCache(object):
+    """
+    Persistent cache of magic results shared between cooks, indexed by
+    the sha1 of the file contents.  Only classes whose contents depend
+    on nothing but the file contents (ELF and ar inspection, jar class
+    dependencies and script interpreters) are stored; everything else
+    is always computed by L{magic}, and only files whose headers match
+    one of those classes are hashed at all.  Each entry is a separate pickle;
+    L{prune} removes the least recently used entries once there are
+    more than C{maxEntries} of them.
+    """
+    cacheable = ('ELF', 'ar', 'jar', 'script')
+
+    def __init__(self, top, maxEntries=50000):
+        self.top = top
+        self.maxEntries = maxEntries
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.pruned = 0
+
+    def _entryPath(self, sha1):
+        sha1 = sha1helper.sha1ToString(sha1)
+        return os.sep.join((self.top, sha1[:2], sha1[2:]))
+
+    @staticmethod
+    def _mayBeCacheable(n):
+        # the cheap header checks of magic() for the classes which are
+        # cached; other files are not worth reading through and hashing
+        try:
+            f = open(n)
+            try:
+                b = f.read(7)
+            finally:
+                f.close()
+        except (IOError, OSError):
+            # magic() knows how to read files without read permission
+            return True
+        return (b[:4] == '\x7fELF' or b[:7] == '!<arch>' or
+                b[:4] == 'PK\x03\x04' or b[:2] == '#!')
+
+    def _isCacheable(self, m):
+        if m is None or m.__class__.__name__ not in self.cacheable:
+            return False
+        if m.__class__ is jar and not m.contents['files']:
+            # a jar without classes may really be a malformed zip file,
+            # which is classified by its path rather than its contents
+            return False
+        return True
+
+    def get(self, sha1, path, basedir=''):
+        """
+        Return the cached magic object for the file contents identified
+        by C{sha1}, placed at C{path}, or None if nothing usable is
+        cached.
+        """
+        entryPath = self._entryPath(sha1)
+        try:
+            f = open(entryPath)
+            try:
+                version, name, contents = cPickle.load(f)
+            finally:
+                f.close()
+        except (IOError, EOFError, ValueError, TypeError,
+                cPickle.UnpicklingError):
+            return None
+        if version != MAGIC_CACHE_VERSION or name not in self.cacheable:
+            return None
+        try:
+            # entries are expired in order of last use
+            os.utime(entryPath, None)
+        except OSError:
+            pass
+        cls = globals()[name]
+        m = cls.__new__(cls)
+        Magic.__init__(m, path, basedir)
+        m.contents = contents
+        return m
+
+    def put(self, sha1, m):
+        """
+        Store the magic object C{m} for the file contents identified by
+        C{sha1}, if its class can be cached.  Errors writing to the
+        cache are ignored.
+        """
+        if not self._isCacheable(m):
+            return
+        entryPath = self._entryPath(sha1)
+        data = cPickle.dumps((MAGIC_CACHE_VERSION, m.__class__.__name__,
+                              m.contents), cPickle.HIGHEST_PROTOCOL)
+        try:
+            util.mkdirChain(os.path.dirname(entryPath))
+            # write under a temporary name so that concurrent cooks never
+            # see partial entries
+            tmpPath = '%s.%d.tmp' % (entryPath, os.getpid())
+            f = open(tmpPath, 'w')
+            try:
+                f.write(data)
+            finally:
+                f.close()
+            os.rename(tmpPath, entryPath)
+        except (IOError, OSError):
+            return
+        self.stored += 1
+
+    def magic(self, path, basedir=''):
+        """
+        Like L{magic}, but consults and updates the cache.
+        """
+        if basedir and not basedir.endswith('/'):
+            basedir += '/'
+        n = basedir + path
+        if not util.exists(n) or not util.isregular(n):
+            return None
+        if not self._mayBeCacheable(n):
+            return magic(path, basedir)
+        try:
+            sha1 = sha1helper.sha1FileBin(n)
+        except (IOError, OSError):
+            return magic(path, basedir)
+        m = self.get(sha1, path, basedir)
+        if m is not None:
+            self.hits += 1
+            return m
+        self.misses += 1
+        m = magic(path, basedir)
+        self.put(sha1, m)
+        return m
+
+    def prune(self):
+        """
+        Remove the least recently used entries beyond C{maxEntries}, as
+        well as temporary files left behind by interrupted cooks.
+        """
+        entries = []
+        try:
+            subdirs = os.listdir(self.top)
+        except OSError:
+            return
+        for subdir in subdirs:
+            subdir = os.path.join(self.top, subdir)
+            try:
+                names = os.listdir(subdir)
+            except OSError:
+                continue
+            for name in names:
+                entryPath = os.path.join(subdir, name)
+                try:
+                    sb = os.stat(entryPath)
+                except OSError:
+                    continue
+                if name.endswith('.tmp'):
+                    # only remove temporary files old enough not to
+                    # belong to a running cook
+                    if sb.st_mtime < time.time() - 3600:
+                        self._remove(entryPath)
+                    continue
+                entries.append((sb.st_mtime, entryPath))
+        if len(entries) <= self.maxEntries:
+            return
+        entries.sort()
+        for mtime, entryPath in entries[:len(entries) - self.maxEntries]:
+            if self._remove(entryPath):
+                self.pruned += 1
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            # another cook got there first, or the cache is not ours
+            return False
+        return True
+
+    def report(self):
+        return ('magic cache: %d hits, %d misses, %d stored, %d pruned'
+                % (self.hits, self.misses, self.stored, self.pruned))
+
 # internal helpers
 
 def _string(buffer):
@@ -295,6 +295,9 @@ def getKeyFromString(keyId, data):
 
 def seekKeyById(keyId, keyRing):
     if isinstance(keyRing, str):
+        index = getKeyringIndex(keyRing)
+        if index is not None:
+            return index.seekKey(keyId)
         try:
             keyRing = util.ExtendedFile(keyRing, buffering = False)
         except (IOError, OSError), e:
@@ -467,15 +470,18 @@ def getFingerprint(keyId, keyFile=''):
 def addKeys(keys, fpath):
     """Add keys to the file"""
     return addPackets(keys, fpath, "getKeyFingerprint",
-        PGP_Message, "iterMainKeys")
+        PGP_Message, "iterMainKeys", indexKeys = True)
 
 def addKeyTimestampPackets(pkts, fpath):
     """Add key timestamp packets to the file"""
     return addPackets(pkts, fpath, "getKeyId",
         TimestampPacketDatabase, "iterTrustPackets")
 
-def addPackets(pkts, fpath, pktIdFunc, messageFactory, streamIterFunc):
-    """Add packets to the file. Return the packet IDs for the added packets"""
+def addPackets(pkts, fpath, pktIdFunc, messageFactory, streamIterFunc,
+               indexKeys = False):
+    """Add packets to the file. Return the packet IDs for the added packets.
+    If indexKeys is True, the packets are main keys, and a KeyringIndex
+    for the new file is saved next to it."""
     # This code really expects the stream to be based on a file, since we need
     # a fileno() too
 
@@ -494,6 +500,7 @@ def addPackets(pkts, fpath, pktIdFunc, messageFactory, streamIterFunc):
     tempf = util.ExtendedFdopen(tmpfd)
 
     pktIds = []
+    indexEntries = []
 
     # Lock the stream
     try:
@@ -524,6 +531,8 @@ def addPackets(pkts, fpath, pktIdFunc, messageFactory, streamIterFunc):
                 ipkt.merge(pktsDict[iPktId])
                 pktIds.append(iPktId)
                 del pktsDict[iPktId]
+            if indexKeys:
+                indexEntries.append((ipkt, tempf.tell()))
             ipkt.writeAll(tempf)
 
         # Add the rest of the packets
@@ -531,17 +540,184 @@ def addPackets(pkts, fpath, pktIdFunc, messageFactory, streamIterFunc):
             pktId = getattr(pkt, pktIdFunc)()
             if pktId not in pktsDict:
                 continue
+            if indexKeys:
+                indexEntries.append((pkt, tempf.tell()))
             pkt.writeAll(tempf)
             del pktsDict[pktId]
             pktIds.append(pktId)
 
+        if indexKeys:
+            # The rename below keeps the inode, size and modification time
+            index = KeyringIndex.fromKeys(fpath,
+                    _getKeyringStamp(os.fstat(tempf.fileno())), indexEntries)
+
         # Now copy the keyring back
         tempf.close()
         os.rename(tmpfname, fpath)
+        if indexKeys:
+            index.save()
+            _keyringIndexes[fpath] = index
         return pktIds
     finally:
         fcntl.lockf(streamfd, fcntl.LOCK_UN)
 
+def _getKeyringStamp(st):
+    return "%d %d %r" % (st.st_ino, st.st_size, st.st_mtime)
+
+class KeyringIndex(object):
+    """
+    Maps the fingerprints of the keys and subkeys in a keyring (and the key
+    IDs of version 3 keys) to the offset of their main key packet, so keys
+    can be read without parsing the keyring up to them. The index is only
+    valid for the keyring file with the inode, size and modification time
+    recorded in its stamp.
+    """
+    __slots__ = [ 'path', 'stamp', 'entries', '_bySuffix' ]
+
+    suffix = '.idx'
+    magic = 'conary-keyring-index 1'
+
+    def __init__(self, path, stamp, entries):
+        self.path = path
+        self.stamp = stamp
+        # (key ID, offset) in keyring order
+        self.entries = entries
+        self._bySuffix = {}
+        for entry in entries:
+            self._bySuffix.setdefault(entry[0][-8:], []).append(entry)
+
+    @staticmethod
+    def _iterKeyIds(pkt):
+        pkt.initSubPackets()
+        for key in itertools.chain([ pkt ], pkt.iterSubKeys()):
+            yield key.getKeyFingerprint()
+            if key.version == 3:
+                yield key.getKeyId()
+
+    @classmethod
+    def fromKeys(cls, path, stamp, keys):
+        """Create the index from (main key, offset) pairs"""
+        entries = []
+        for pkt, offset in keys:
+            entries.extend((x, offset) for x in cls._iterKeyIds(pkt))
+        return cls(path, stamp, entries)
+
+    @classmethod
+    def build(cls, path, stamp):
+        """Index the keyring by reading all of its packets. Return None if
+        the keyring can not be read"""
+        try:
+            stream = util.ExtendedFile(path, buffering = False)
+        except (IOError, OSError):
+            return None
+        keys = []
+        offset = 0
+        try:
+            for pkt in PGP_Message(stream, start = 0).iterPackets():
+                if isinstance(pkt, PGP_MainKey):
+                    try:
+                        pkt.initSubPackets()
+                    except InvalidBodyError:
+                        # Skipped by iterMainKeys as well
+                        pass
+                    else:
+                        keys.append((pkt, offset))
+                offset = pkt._nextStreamPos
+            return cls.fromKeys(path, stamp, keys)
+        except PGPError:
+            return None
+
+    @classmethod
+    def load(cls, path, stamp):
+        """Read the index saved for the keyring. Return None if there is
+        none, or if it was saved for a different version of the file"""
+        try:
+            f = open(path + cls.suffix)
+            try:
+                lines = f.read().splitlines()
+            finally:
+                f.close()
+        except IOError:
+            return None
+        if not lines or lines[0] != '%s %s' % (cls.magic, stamp):
+            return None
+        entries = []
+        try:
+            for line in lines[1:]:
+                keyId, offset = line.split()
+                entries.append((keyId, int(offset)))
+        except ValueError:
+            return None
+        return cls(path, stamp, entries)
+
+    def save(self):
+        """Write the index next to the keyring. Failing to do so is not an
+        error, keys are then found by reading the keyring"""
+        try:
+            f = util.AtomicFile(self.path + self.suffix, mode = 'w')
+            f.write('%s %s\n' % (self.magic, self.stamp))
+            for keyId, offset in self.entries:
+                f.write('%s %d\n' % (keyId, offset))
+            f.commit()
+        except (IOError, OSError):
+            pass
+
+    def iterOffsets(self, keyId):
+        """Iterate over the offsets of the main keys which may have a key
+        with this key ID, in keyring order"""
+        keyId = keyId.upper()
+        if len(keyId) >= 8:
+            entries = self._bySuffix.get(keyId[-8:], [])
+        else:
+            entries = self.entries
+        seen = set()
+        for entryKeyId, offset in entries:
+            if offset not in seen and entryKeyId.endswith(keyId):
+                seen.add(offset)
+                yield offset
+
+    def seekKey(self, keyId):
+        """Return the first key with this key ID, or False, like
+        seekKeyById"""
+        stream = None
+        for offset in self.iterOffsets(keyId):
+            if stream is None:
+                try:
+                    stream = util.ExtendedFile(self.path, buffering = False)
+                except (IOError, OSError):
+                    return False
+            pkt = PGP_Message(stream, start = offset)._getPacket()
+            pkt.initSubPackets()
+            for key in itertools.chain([ pkt ], pkt.iterSubKeys()):
+                if key.hasKeyId(keyId):
+                    return key
+        return False
+
+# keyring path -> KeyringIndex
+_keyringIndexes = {}
+
+def getKeyringIndex(path):
+    """Return an up to date KeyringIndex for the keyring at path, or None if
+    the keyring can not be indexed. Indexes are kept in memory, read from
+    the file saved by addKeys if it is current, or built by reading the
+    keyring; a stale index file is replaced."""
+    try:
+        stamp = _getKeyringStamp(os.stat(path))
+    except OSError:
+        return None
+    index = _keyringIndexes.get(path)
+    if index is not None and index.stamp == stamp:
+        return index
+    index = KeyringIndex.load(path, stamp)
+    if index is None:
+        index = KeyringIndex.build(path, stamp)
+        if index is None:
+            return None
+        if os.path.exists(path + KeyringIndex.suffix):
+            index.save()
+    _keyringIndexes[path] = index
+    return index
+
 def verifyRFC2440Checksum(data):
     # RFC 2440 5.5.3 - Secret Key Packet Formats documents the checksum
     if len(data) < 2:
@@ -15,6 +15,7 @@
 #
 
 
+import itertools
 import os
 import sys
 import tempfile
@@ -23,7 +24,7 @@ from time import time
 
 from conary import callbacks, versions
 from conary.lib.util import log
-from conary.lib import graph, util, api
+from conary.lib import digestlib, graph, util, api
 
 import openpgpfile
 from openpgpfile import BadPassPhrase
@@ -34,6 +35,11 @@ from openpgpfile import parseAsciiArmorKey
 from openpgpfile import PublicKeyring
 from openpgpfile import SEEK_SET, SEEK_END
 from openpgpfile import TRUST_UNTRUSTED, TRUST_TRUSTED
+from openpgpfile import DSA, RSA
+
+# Batches of at least this many signatures to verify are split across
+# processes
+VERIFY_POOL_MIN = 32
 
 #-----#
 #OpenPGPKey structure:
@@ -180,6 +186,124 @@ class OpenPGPKeySignature(object):
 class _KeyNotFound(KeyNotFound):
     errorIsUncatchable = True
 
+def _verifySignature(args):
+    # runs in pool processes; keys are passed as their public numbers
+    keyType, keyTuple, data, sig = args
+    if keyType == 'RSA':
+        cryptoKey = RSA.construct(keyTuple)
+    else:
+        cryptoKey = DSA.construct(keyTuple)
+    return bool(cryptoKey.verify(data, sig))
+
+def _verifySignatures(checks):
+    """
+    Returns whether each C{(key, data, sig)} in C{checks} verifies,
+    using a pool of processes for large lists.
+    """
+    processes = 1
+    if len(checks) >= VERIFY_POOL_MIN:
+        try:
+            import multiprocessing
+            processes = min(multiprocessing.cpu_count(),
+                            len(checks) // (VERIFY_POOL_MIN // 2))
+        except (ImportError, NotImplementedError):
+            pass
+
+    if processes > 1:
+        args = []
+        for key, data, sig in checks:
+            cryptoKey = key.cryptoKey
+            if key.isRSA():
+                keyTuple = (cryptoKey.n, cryptoKey.e)
+            else:
+                keyTuple = (cryptoKey.y, cryptoKey.g, cryptoKey.p,
+                            cryptoKey.q)
+            args.append((key.getType(), keyTuple, data + str(sig[1]),
+                         sig[2]))
+        try:
+            pool = multiprocessing.Pool(processes)
+            try:
+                return pool.map(_verifySignature, args)
+            finally:
+                pool.terminate()
+        except OSError, e:
+            log.debug('verifying signatures in a single process: %s', e)
+
+    return [ bool(key.cryptoKey.verify(data + str(sig[1]), sig[2]))
+             for key, data, sig in checks ]
+
+class VerifiedSignatureCache(object):
+    """
+    Records the signatures which have been verified, so that they do not
+    have to be verified again.  Entries are keyed on the signed data, the
+    signature, and the fingerprint, revocation and expiration of the key
+    which made it; once a key is revoked or its expiration changes, the
+    signatures it made are verified again.  If a path is given, entries
+    are appended to that file and read back by later processes; it must
+    not be writable by anyone who cannot write to the keyrings.
+    """
+    maxEntries = 100000
+
+    def __init__(self, path = None):
+        self.path = path
+        self._entries = None
+
+    @staticmethod
+    def getEntry(key, data, sig):
+        digest = digestlib.sha1()
+        for item in (key.getFingerprint(), key.isRevoked(),
+                     key.getTimestamp(), sig[0], sig[1], sig[2]):
+            digest.update(str(item))
+            digest.update('\0')
+        digest.update(data)
+        return digest.hexdigest()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = set()
+        if not self.path:
+            return
+        try:
+            f = open(self.path)
+            try:
+                self._entries.update(x.strip() for x in f)
+            finally:
+                f.close()
+        except IOError:
+            return
+
+        if len(self._entries) > self.maxEntries:
+            # start over rather than let the file grow forever
+            self._entries = set()
+            try:
+                open(self.path, 'w').close()
+            except IOError:
+                pass
+
+    def has(self, entry):
+        self._load()
+        return entry in self._entries
+
+    def add(self, entries):
+        self._load()
+        new = [ x for x in entries if x not in self._entries ]
+        if not new:
+            return
+        self._entries.update(new)
+        if not self.path:
+            return
+        try:
+            util.mkdirChain(os.path.dirname(self.path))
+            f = open(self.path, 'a')
+            try:
+                f.write(''.join(x + '\n' for x in new))
+            finally:
+                f.close()
+        except (IOError, OSError), e:
+            log.debug('could not record verified signatures in %s: %s',
+                      self.path, e)
+
 class OpenPGPKeyCache:
     """
     Base class for a key cache
@@ -187,6 +311,55 @@ class OpenPGPKeyCache:
     def __init__(self):
         self.publicDict = {}
         self.privateDict = {}
+        self.signatureCache = VerifiedSignatureCache()
+
+    def setSignatureCachePath(self, path):
+        """
+        Sets the file used to remember verified signatures across
+        processes; with no path they are only remembered by this cache.
+        """
+        if path != self.signatureCache.path:
+            self.signatureCache = VerifiedSignatureCache(path)
+
+    def verifyString(self, key, data, sig):
+        """
+        Same as C{key.verifyString(data, sig)}, but signatures which have
+        been verified before are not verified again.
+        """
+        return self.verifyStrings([ (key, data, sig) ])[0]
+
+    def verifyStrings(self, checks):
+        """
+        Verifies a list of C{(key, data, sig)} tuples, returning the result
+        of C{key.verifyString(data, sig)} for each.  Signatures which have
+        not been verified before are verified together, in several
+        processes if there are enough of them.
+        """
+        results = [ None ] * len(checks)
+        pending = {}
+        for i, (key, data, sig) in enumerate(checks):
+            if key.getFingerprint() != sig[0]:
+                results[i] = -1
+                continue
+
+            entry = self.signatureCache.getEntry(key, data, sig)
+            if self.signatureCache.has(entry):
+                results[i] = key.getTrustLevel()
+            else:
+                pending.setdefault(entry, []).append(i)
+
+        pending = pending.items()
+        verified = _verifySignatures([ checks[x[1][0]] for x in pending ])
+        for (entry, indexes), ok in itertools.izip(pending, verified):
+            for i in indexes:
+                if ok:
+                    results[i] = checks[i][0].getTrustLevel()
+                else:
+                    results[i] = -1
+
+        self.signatureCache.add(entry for (entry, indexes), ok
+                                in itertools.izip(pending, verified) if ok)
+        return results
 
     def getPublicKey(self, keyId):
         raise NotImplementedError
@@ -220,6 +393,8 @@ class OpenPGPKeyFileCache(OpenPGPKeyCache):
         OpenPGPKeyCache.__init__(self)
         self.callback = callback
         self.publicPaths = []
+        # (keyring path, key ID) -> (keyring stamp, OpenPGPKey)
+        self._keyringKeys = {}
         self._setPrivateKeyringPath()
 
     def _setPrivateKeyringPath(self, privatePath = None):
@@ -297,10 +472,20 @@ class OpenPGPKeyFileCache(OpenPGPKeyCache):
 
     def _getPublicKey(self, keyId, label = None, warn = True):
         for publicPath in self.publicPaths:
+            # keys parsed earlier are reused as long as the keyring is
+            # unchanged; the trust computation asks for the same keys often
+            index = openpgpfile.getKeyringIndex(publicPath)
+            cached = self._keyringKeys.get((publicPath, keyId))
+            if index is not None and cached and cached[0] == index.stamp:
+                return cached[1]
             try:
                 key = seekKeyById(keyId, publicPath)
                 if key:
-                    return OpenPGPKey(key, key.getCryptoKey(), 0)
+                    key = OpenPGPKey(key, key.getCryptoKey(), 0)
+                    if index is not None:
+                        self._keyringKeys[(publicPath, keyId)] = (
+                                                    index.stamp, key)
+                    return key
             except (KeyNotFound, IOError):
                 pass
 
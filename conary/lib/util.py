@@ -2421,6 +2421,108 @@ class TimestampedMap(object):
         return (type(self), (self.delta,))
 
 
+class LRUCache(object):
+    """
+    A dictionary-like cache holding at most C{limit} entries. When the
+    cache is full, the least recently used entry is discarded to make room
+    for a new one. Lookups and stores are O(1).
+
+    Hit and miss counters are kept in C{hits} and C{misses} so callers
+    can report how effective the cache is.
+    """
+    # each entry is a list of [ prev, next, key, value ]
+    _PREV, _NEXT, _KEY, _VALUE = range(4)
+    _MISSING = object()
+
+    def __init__(self, limit = 10000):
+        assert(limit > 0)
+        self.limit = limit
+        self.hits = 0
+        self.misses = 0
+        self._map = {}
+        self._root = root = []
+        root[:] = [ root, root, None, None ]
+
+    def _unlink(self, link):
+        prev, next = link[self._PREV], link[self._NEXT]
+        prev[self._NEXT] = next
+        next[self._PREV] = prev
+
+    def _append(self, link):
+        root = self._root
+        last = root[self._PREV]
+        link[self._PREV] = last
+        link[self._NEXT] = root
+        last[self._NEXT] = root[self._PREV] = link
+
+    def get(self, key, default = None):
+        link = self._map.get(key, None)
+        if link is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._unlink(link)
+        self._append(link)
+        return link[self._VALUE]
+
+    def __getitem__(self, key):
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        link = self._map.get(key, None)
+        if link is not None:
+            link[self._VALUE] = value
+            self._unlink(link)
+            self._append(link)
+            return
+
+        if len(self._map) >= self.limit:
+            oldest = self._root[self._NEXT]
+            self._unlink(oldest)
+            del self._map[oldest[self._KEY]]
+
+        link = [ None, None, key, value ]
+        self._append(link)
+        self._map[key] = link
+
+    def __delitem__(self, key):
+        link = self._map.pop(key)
+        self._unlink(link)
+
+    def pop(self, key, default = _MISSING):
+        link = self._map.pop(key, None)
+        if link is None:
+            if default is self._MISSING:
+                raise KeyError(key)
+            return default
+        self._unlink(link)
+        return link[self._VALUE]
+
+    def __contains__(self, key):
+        return key in self._map
+
+    def __len__(self):
+        return len(self._map)
+
+    def keys(self):
+        """Returns the keys, least recently used first"""
+        keys = []
+        link = self._root[self._NEXT]
+        while link is not self._root:
+            keys.append(link[self._KEY])
+            link = link[self._NEXT]
+        return keys
+
+    def clear(self):
+        self._map.clear()
+        root = self._root
+        root[:] = [ root, root, None, None ]
+        self.hits = self.misses = 0
+
+
 def statFile(pathOrFile, missingOk=False, inodeOnly=False):
     """Return a (dev, inode, size, mtime, ctime) tuple of the given file.
 
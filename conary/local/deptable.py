@@ -47,6 +47,12 @@ class DependencyWorkTables:
         if removeTables:
             schema.resetTable(self.cu, "RemovedTroveIds")
 
+        # rows for DepCheck are loaded in batches; merge() loads the rest
+        self.depCheck = self.db.bulkloader("DepCheck",
+                         [ "troveId", "depNum", "flagCount", "isProvides",
+                           "class", "name", "flag", "merged" ],
+                         start_transaction = False)
+
     def _mergeTmpTable(self, tmpName, depTable, reqTable, provTable,
                        dependencyTables, multiplier = 1):
         substDict = { 'tmpName'   : tmpName,
@@ -199,12 +205,10 @@ class DependencyWorkTables:
                     depList.append((troveNum, classId, dep))
                     depListLen += 1
 
-        self.db.bulkload("DepCheck", toInsert,
-                         [ "troveId", "depNum", "flagCount", "isProvides",
-                           "class", "name", "flag", "merged" ],
-                         start_transaction = False)
+        self.depCheck.extend(toInsert)
 
     def merge(self, intoDatabase = False, skipProvides = False):
+        self.depCheck.flush()
         if intoDatabase:
             assert(not skipProvides)
             self._mergeTmpTable("DepCheck", "Dependencies", "Requires",
@@ -45,6 +45,14 @@ except AttributeError:
     BaseCapsulePlugin = object
 
 
+# Files of the rpm database which change when packages are installed or
+# erased; see also MetaCapsuleDatabase.availablePlugins
+RPMDB_DIR = '/var/lib/rpm'
+RPMDB_FILES = ('Packages', 'Packages.db', 'rpmdb.sqlite', 'rpmdb.sqlite-wal')
+# Name of the cache of rpm database keys, next to the conary database
+RPMDB_KEY_CACHE = 'rpmdb-keys'
+
+
 def rpmkey(hdr):
     return "%s-%s-%s.%s" % ( hdr['name'], hdr['version'],
                              hdr['release'], hdr['arch'])
@@ -167,9 +175,13 @@ class RpmCapsuleOperation(SingleCapsuleOperation):
 
     def _CheckRPMDBContents(self, testNvras, ts, errStr,
             unpackFailures=None, enforceUnpackFailures=None):
-        mi = ts.dbMatch()
-        installedNvras = set([(h['name'], h['version'], h['release'], h['arch'])
-                              for h in mi])
+        # only look up the packages being tested instead of walking the
+        # whole rpm database
+        installedNvras = set()
+        for name in set(x[0] for x in testNvras):
+            installedNvras.update(
+                    (h['name'], h['version'], h['release'], h['arch'])
+                    for h in ts.dbMatch('name', name))
         missingNvras = testNvras.difference(installedNvras)
 
         if unpackFailures and not enforceUnpackFailures:
@@ -568,6 +580,30 @@ class RpmCapsuleOperation(SingleCapsuleOperation):
                                    ignoreMissing = True)
 
 
+class InstalledRpmHeader(object):
+    """
+    Package in the rpm database which is known from the rpm database key
+    cache. The header is only read from the rpm database when it is
+    unloaded.
+    """
+    __slots__ = [ 'root', 'nevra', 'digest' ]
+
+    def __init__(self, root, nevra, digest):
+        self.root = root
+        self.nevra = nevra
+        self.digest = digest
+
+    def unload(self):
+        txnSet = rpm.TransactionSet(self.root)
+        for rpmlibHeader in txnSet.dbMatch('name', self.nevra.name):
+            if (rpmhelper.NEVRA.fromHeader(rpmlibHeader) == self.nevra and
+                    RpmCapsulePlugin._digest(rpmlibHeader) == self.digest):
+                return rpmlibHeader.unload()
+        raise errors.UpdateError('RPM database changed during capsule '
+                                 'sync: %s is no longer installed'
+                                 % (self.nevra,))
+
+
 class RpmCapsulePlugin(BaseCapsulePlugin):
     kind = 'rpm'
 
@@ -588,6 +624,16 @@ class RpmCapsulePlugin(BaseCapsulePlugin):
         return capsules.PartialTuple((nevra, digest))
 
     def getCapsuleKeysFromTarget(self):
+        # The keys of the packages in the rpm database are saved after every
+        # scan, along with a stamp of the rpm database files; the database
+        # is only scanned again once it has changed.
+        stamp = self._getRpmdbStamp()
+        cachePath = self._getKeyCachePath()
+        if stamp and cachePath:
+            headersByKey = self._loadKeyCache(cachePath, stamp)
+            if headersByKey is not None:
+                return headersByKey
+
         txnSet = rpm.TransactionSet(self.root)
         matchIter = txnSet.dbMatch()
         headersByKey = {}
@@ -599,8 +645,68 @@ class RpmCapsulePlugin(BaseCapsulePlugin):
             digest = self._digest(rpmlibHeader)
             key = capsules.PartialTuple((nevra, digest))
             headersByKey[key] = rpmlibHeader
+
+        if stamp and cachePath:
+            self._saveKeyCache(cachePath, stamp, headersByKey)
         return headersByKey
 
+    def _getRpmdbStamp(self):
+        stamp = []
+        top = util.joinPaths(self.root, RPMDB_DIR)
+        for name in RPMDB_FILES:
+            try:
+                st = os.stat(os.path.join(top, name))
+            except OSError:
+                continue
+            stamp.append('%s:%d:%d:%r:%r' % (name, st.st_ino, st.st_size,
+                                              st.st_mtime, st.st_ctime))
+        return ' '.join(stamp)
+
+    def _getKeyCachePath(self):
+        dbPath = getattr(self.db, 'dbpath', ':memory:')
+        if dbPath == ':memory:':
+            return None
+        return os.path.join(os.path.dirname(dbPath), RPMDB_KEY_CACHE)
+
+    def _loadKeyCache(self, path, stamp):
+        try:
+            f = open(path)
+            try:
+                if f.readline().rstrip('\n') != stamp:
+                    return None
+                headersByKey = {}
+                for line in f:
+                    fields = [ x != '-' and x or None for x in line.split() ]
+                    name, epoch, version, release, arch, digest = fields
+                    if epoch is not None:
+                        epoch = int(epoch)
+                    if digest is not None:
+                        digest = sha1helper.sha1FromString(digest)
+                    nevra = rpmhelper.NEVRA(name, epoch, version, release,
+                                            arch)
+                    key = capsules.PartialTuple((nevra, digest))
+                    headersByKey[key] = InstalledRpmHeader(self.root, nevra,
+                                                           digest)
+            finally:
+                f.close()
+        except (IOError, OSError, ValueError):
+            return None
+        return headersByKey
+
+    def _saveKeyCache(self, path, stamp, headersByKey):
+        try:
+            f = util.AtomicFile(path, chmod = 0600)
+            f.write(stamp + '\n')
+            for nevra, digest in sorted(headersByKey):
+                if digest is not None:
+                    digest = sha1helper.sha1ToString(digest)
+                fields = list(nevra) + [ digest ]
+                f.write(' '.join(x is None and '-' or str(x)
+                                 for x in fields) + '\n')
+            f.commit()
+        except (IOError, OSError), e:
+            log.debug('could not save rpm database keys in %s: %s', path, e)
+
     def _getPhantomNVF(self, header):
         """Choose a NVF for a new phantom package"""
         binCount = 1
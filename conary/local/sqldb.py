@@ -120,9 +120,10 @@ class DBTroveFiles:
 
         streamId = cu.lastrowid
 
-        for tag in tags:
-            cu.execute("INSERT INTO DBFileTags(streamId, tagId) VALUES (?, ?)",
-                       streamId, self.tags[tag])
+        if tags:
+            cu.executemany("INSERT INTO DBFileTags(streamId, tagId) "
+                           "VALUES (?, ?)",
+                           [ (streamId, self.tags[tag]) for tag in tags ])
 
     def iterPath(self, path):
         cu = self.db.cursor()
@@ -676,9 +677,9 @@ order by
                 empty INTEGER,
                 flavor %(STRING)s
             )""" % self.db.keywords)
-            for flavor in self.flavorsNeeded.keys():
-                cu.execute("INSERT INTO flavorsNeeded VALUES(?, ?)",
-                           None, flavor.freeze())
+            cu.executemany("INSERT INTO flavorsNeeded VALUES(?, ?)",
+                           [ (None, flavor.freeze())
+                             for flavor in self.flavorsNeeded.keys() ])
             cu.execute("""
             INSERT INTO Flavors (flavorId, flavor)
             SELECT flavorsNeeded.empty, flavorsNeeded.flavor
@@ -815,12 +816,13 @@ order by
                         pathId BLOB,
                         tag %(STRING)s)""" % self.db.keywords)
 
-        stmt = cu.compile("""
-                INSERT INTO NewFiles (pathId, versionId, path, fileId,
-                                      stream, isPresent)
-                        VALUES (?, ?, ?, ?, ?, ?)""")
+        # the rows are gathered by addFile() and loaded in batches
+        newFiles = self.db.bulkloader("NewFiles",
+                    [ "pathId", "versionId", "path", "fileId", "stream",
+                      "isPresent" ])
+        newFileTags = self.db.bulkloader("NewFileTags", [ "pathId", "tag" ])
 
-        return (cu, troveInstanceId, stmt, oldTroveId)
+        return (cu, troveInstanceId, newFiles, newFileTags, oldTroveId)
 
     def _sanitizeTroveCollection(self, cu, instanceId, nameHint = None):
         # examine the list of present, missing, and not inPristine troves
@@ -924,17 +926,17 @@ order by
 
     def addFile(self, troveInfo, pathId, path, fileId, fileVersion,
                 fileStream = None, isPresent = True):
-        (cu, troveInstanceId, addFileStmt, oldInstanceId) = troveInfo
+        (cu, troveInstanceId, newFiles, newFileTags, oldInstanceId) = troveInfo
         versionId = self.getVersionId(fileVersion, self.addVersionCache)
 
         if fileStream:
-            cu.execstmt(addFileStmt, pathId, versionId, path, fileId,
-                        fileStream, isPresent)
+            newFiles.add(pathId, versionId, path, fileId, fileStream,
+                         isPresent)
 
             tags = files.frozenFileTags(fileStream)
 
             if tags:
-                cu.executemany("INSERT INTO NewFileTags VALUES (?, ?)",
+                newFileTags.extend(
                                itertools.izip(itertools.repeat(pathId), tags))
         else:
             cu.execute("""
@@ -945,7 +947,9 @@ order by
                     pathId, oldInstanceId)
 
     def addTroveDone(self, troveInfo):
-        (cu, troveInstanceId, addFileStmt, oldInstanceId) = troveInfo
+        (cu, troveInstanceId, newFiles, newFileTags, oldInstanceId) = troveInfo
+        newFiles.flush()
+        newFileTags.flush()
 
         cu.execute("""
             INSERT INTO DBTroveFiles (pathId, versionId, path, fileId,
@@ -976,16 +980,18 @@ order by
         cu.execute("""CREATE TEMPORARY TABLE UserReplaced(
                         name STRING, version STRING, flavor STRING,
                         pathId BLOB)""")
+        rows = []
         for (name, version, flavor), fileList in userReplaced.iteritems():
             for pathId, content, fileObj in fileList:
                 flavorStr = flavor.freeze()
                 if not flavorStr:
                     flavorStr = None
 
-                cu.execute("""
-                    INSERT INTO UserReplaced(name, version, flavor, pathId)
-                        VALUES (?, ?, ?, ?)
-                """, name, version.asString(), flavorStr, pathId)
+                rows.append((name, version.asString(), flavorStr, pathId))
+        cu.executemany("""
+            INSERT INTO UserReplaced(name, version, flavor, pathId)
+                VALUES (?, ?, ?, ?)
+        """, rows)
 
         cu.execute("""
             UPDATE DBTroveFiles SET isPresent = 0 WHERE
@@ -18,7 +18,12 @@
 from conary import streams
 from conary.local import schema
 
+_freezers = {}
+
 def createFreezer(tag):
+    Freezer = _freezers.get(tag)
+    if Freezer is not None:
+        return Freezer
 
     class Freezer(streams.StreamSet):
 
@@ -26,6 +31,7 @@ def createFreezer(tag):
 
     Freezer.streamDict = { tag : (streams.DYNAMIC, streams.StringStream,
                                   'val' ) }
+    _freezers[tag] = Freezer
 
     return Freezer
 
@@ -43,7 +49,7 @@ class TroveInfoTable:
         c = ':' in n and not n.endswith(':source')
         newInfo = []
         for (tag, (size, streamType, name)) in trove.troveInfo.streamDict.iteritems():
-            frz = trove.troveInfo.__getattribute__(name).freeze()
+            frz = getattr(trove.troveInfo, name).freeze()
             if frz:
                 # FIXME: somehow we're getting buildReqs and loadedTrovs in the
                 # troveInfo table for components.  prevent this until the bug
@@ -64,18 +70,17 @@ class TroveInfoTable:
     def getInfo(self, cu, trove, idNum):
         cu.execute("SELECT infoType, data FROM TroveInfo WHERE instanceId=?",
                    idNum)
-        unknown = ''
+        # rebuild the frozen trove info and thaw it all at once; streams
+        # which are thawed lazily are left alone until they're used
+        frozen = []
         for (tag, frz) in cu:
-            if tag in trove.troveInfo.streamDict:
-                name = trove.troveInfo.streamDict[tag][2]
-                trove.troveInfo.__getattribute__(name).thaw(cu.frombinary(frz))
-            elif tag == -1:
-                unknown += cu.frombinary(frz)
+            if tag == -1:
+                frozen.append(cu.frombinary(frz))
             else:
                 Freezer = createFreezer(tag)
                 f = Freezer()
-                f.val.set(frz)
-                unknown += f.freeze()
+                f.val.set(cu.frombinary(frz))
+                frozen.append(f.freeze())
 
-        if unknown:
-            trove.troveInfo.thaw(unknown)
+        if frozen:
+            trove.troveInfo.thaw(''.join(frozen))
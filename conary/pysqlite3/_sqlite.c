@@ -1288,6 +1288,13 @@ _stmt_step(pysqlstmt *self, PyObject *args)
 		   reset the statement in order to get a useful
 		   error message */
 		result = sqlite3_reset(self->p_stmt);
+		if (result == SQLITE_SCHEMA) {
+			/* the statement was prepared before the schema
+			   changed; the message is not always set for it */
+			PyErr_SetString(_sqlite_ProgrammingError,
+					"database schema has changed");
+			return NULL;
+		}
 		PyErr_SetString(_sqlite_ProgrammingError,
 				sqlite3_errmsg(self->con->p_db));
 		return NULL;
@@ -1334,6 +1341,29 @@ _stmt_reset(pysqlstmt *self)
 	return Py_None;
 }
 
+static char _stmt_clear_bindings_doc [] =
+"clear_bindings()\n\
+Sets all of the bind parameters of the statement back to NULL.";
+
+static PyObject*
+_stmt_clear_bindings(pysqlstmt *self)
+{
+	if(self->p_stmt == NULL) {
+		PyErr_SetString(_sqlite_ProgrammingError,
+				"Statement has already been finalized.");
+		return NULL;
+	}
+
+	if (sqlite3_clear_bindings(self->p_stmt) != SQLITE_OK) {
+		PyErr_SetString(_sqlite_DatabaseError,
+				sqlite3_errmsg(self->con->p_db));
+		return NULL;
+	}
+
+	Py_INCREF(Py_None);
+	return Py_None;
+}
+
 static char _stmt_finalize_doc [] =
 "finalize()\n\
 Frees the virtual machine associated with a stmtiled SQL statement.";
@@ -1594,6 +1624,9 @@ _stmt_get_description(pysqlstmt* self)
 static PyMethodDef _stmt_methods[] = {
 	{ "bind",
 	 (PyCFunction) _stmt_bind, METH_VARARGS, _stmt_bind_doc },
+	{ "clear_bindings",
+	 (PyCFunction) _stmt_clear_bindings, METH_NOARGS,
+	 _stmt_clear_bindings_doc },
 	{ "finalize",
 	 (PyCFunction) _stmt_finalize, METH_NOARGS, _stmt_finalize_doc },
 	{ "reset",
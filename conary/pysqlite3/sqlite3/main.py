@@ -14,6 +14,13 @@ if _sqlite.sqlite_version_info() < (3,2,1):
 
 _BEGIN = "BEGIN IMMEDIATE"
 
+# number of idle prepared statements each connection keeps for reuse, and
+# the kinds of statements worth keeping
+STATEMENT_CACHE_SIZE = 100
+_CACHED_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+# what stepping a statement prepared before a schema change raises
+_SCHEMA_CHANGED = "database schema has changed"
+
 if sys.version_info[:2] >= (2,2):
     MyStopIteration = StopIteration
 else:
@@ -108,6 +115,8 @@ class Cursor:
         self.con.cursors[id(self)] = self
 
         self.stmt = None
+        self.stmtSQL = None
+        self.stmtReused = False
         self._reset()
         self.rowcount = -1
         self.rownumber = 0
@@ -120,15 +129,46 @@ class Cursor:
         self.closed = None
         self.description = None
         self.current_row = None
-        if self.stmt is not None:
-            try:
-                self.stmt.reset()
-            # XXX sqlite3_stmt_reset() returns a return code that
-            # reflects the last error for the vdbm.  We should ignore
-            # it since we're destroying this statement anyway
-            except _sqlite.DatabaseError:
-                pass
-            self.stmt = None
+        self._releaseStatement()
+
+    def _releaseStatement(self):
+        # hands the current statement back to the connection for reuse
+        if self.stmt is None:
+            return
+        stmt, SQL = self.stmt, self.stmtSQL
+        self.stmt = self.stmtSQL = None
+        try:
+            stmt.reset()
+            stmt.clear_bindings()
+        # XXX sqlite3_stmt_reset() returns a return code that
+        # reflects the last error for the vdbm.  We should ignore
+        # it since we're destroying this statement anyway
+        except _sqlite.DatabaseError:
+            return
+        try:
+            self.con._cacheStatement(SQL, stmt)
+        except ReferenceError:
+            # the connection is gone
+            pass
+
+    def _prepare(self, SQL):
+        self._releaseStatement()
+        self.stmt, self.stmtReused = self.con._getStatement(SQL)
+        self.stmtSQL = SQL
+
+    def _run(self, bindFn, parms):
+        try:
+            bindFn(parms)
+            self.current_row = self.stmt.step()
+        except _sqlite.ProgrammingError, e:
+            if not self.stmtReused or e.args[0] != _SCHEMA_CHANGED:
+                raise
+            # the statement was kept from before the schema changed
+            self.stmt = self.con.db.prepare(self.stmtSQL)
+            self.stmtReused = False
+            bindFn(parms)
+            self.current_row = self.stmt.step()
+        self.stmtReused = False
 
     def _checkNotClosed(self, methodname=None):
         if self.closed:
@@ -164,11 +204,23 @@ class Cursor:
                     self.con._begin()
         return startingTransaction, SQL
 
+    def _bind(self, (parms, kwargs)):
+        # lists/tuples are positionals
+        for i, parm in enumerate(parms):
+            self.stmt.bind(i + 1, parm)
+        # the sqlite C bindings require us to reference these bind parameters as :name
+        for pkey, pval in kwargs.items():
+            # the sqlite bindings don't like 'binding' unkown named arguments
+            try:
+                self.stmt.bind(":" + pkey, pval)
+            except _sqlite.ProgrammingError, e:
+                if e.args[0] == "Bind parameter name unknown to the query":
+                    continue
+                raise
+
     def execute(self, SQL, *parms, **kwargs):
         startingTransaction, SQL = self._preExecute("execute", SQL, kwargs)
 
-        # prepare the statement
-        self.stmt = self.con.db.prepare(SQL)
         # first dereference the list/tuple if it is encapsulated
         if len(parms) == 1:
             if isinstance(parms[0], tuple) or \
@@ -176,30 +228,21 @@ class Cursor:
                    isinstance(parms[0], dict) or \
                    isinstance(parms[0], Row):
                 parms = parms[0]
-        # now bind the arguments. lists/tuples are positionals
-        if isinstance(parms, tuple) or isinstance(parms, list) \
-               or isinstance(params, Row):
-            for i, parm in enumerate(parms):
-                self.stmt.bind(i + 1, parm)
         # hashes are named parameters
-        elif isinstance(parms, dict):
+        if isinstance(parms, dict):
             for pkey, pval in parms.iteritems():
                 if pkey[0] == ":":
                     pkey = pkey[1:]
                 kwargs[pkey] = pval
-        else:
+            parms = ()
+        elif not (isinstance(parms, tuple) or isinstance(parms, list)
+                  or isinstance(parms, Row)):
             raise _sqlite.ProgrammingError, \
                   "Don't know how to bind these parameters"
-        # the sqlite C bindings require us to reference these bind parameters as :name
-        for pkey, pval in kwargs.items():
-            # the sqlite bindings don't like 'binding' unkown named arguments
-            try:
-                self.stmt.bind(":" + pkey, pval)
-            except _sqlite.ProgrammingError, e:
-                if e.args[0] == "Bind parameter name unknown to the query":
-                    continue
-                raise
-        self.current_row = self.stmt.step()
+
+        # prepare the statement, bind the arguments and run it
+        self._prepare(SQL)
+        self._run(self._bind, (parms, kwargs))
         if startingTransaction:
             self.con.inTransaction = True
         self.description = self.stmt.get_description()
@@ -208,26 +251,28 @@ class Cursor:
         # you to do "for row in cu.execute(...)"
         return self
 
+    def _bindMany(self, parms):
+        self.stmt.reset()
+        if isinstance(parms,tuple) or isinstance(parms, list) \
+               or isinstance(parms, Row):
+            # bind as positional arguments
+            for i, parm in enumerate(parms):
+                self.stmt.bind(i+1, parm)
+        elif isinstance(parms, dict):
+            # bind as named arguments
+            for pkey, pval in parms.iteritems():
+                if pkey[0] != ":": pkey = ":" + pkey
+                self.stmt.bind(pkey, pval)
+        else:
+            # this better be an int or string or we'll fail here
+            self.stmt.bind(1, parms)
+
     def executemany(self, query, parm_sequence, **kw):
         startingTransaction, SQL = self._preExecute("executemany", query, kw)
         # prepare the statement
-        self.stmt = self.con.db.prepare(SQL)
+        self._prepare(SQL)
         for parms in parm_sequence:
-            self.stmt.reset()
-            if isinstance(parms,tuple) or isinstance(parms, list) \
-                   or isinstance(parms, Row):
-                # bind as positional arguments
-                for i, parm in enumerate(parms):
-                    self.stmt.bind(i+1, parm)
-            elif isinstance(parms, dict):
-                # bind as named arguments
-                for pkey, pval in parms.iteritems():
-                    if pkey[0] != ":": pkey = ":" + pkey
-                    self.stmt.bind(pkey, pval)
-            else:
-                # this better be an int or string or we'll fail here
-                self.stmt.bind(1, parms)
-            self.current_row = self.stmt.step()
+            self._run(self._bindMany, parms)
             if startingTransaction:
                 self.con.inTransaction = True
             self.closed = 0
@@ -252,6 +297,11 @@ class Cursor:
             pass
 
     def __del__(self):
+        try:
+            self._releaseStatement()
+        except:
+            pass
+
         # Disassociate ourselves from our connection.
         try:
             cursors = self.con.cursors
@@ -371,6 +421,10 @@ class Connection:
 
         self.cursors = weakref.WeakValueDictionary()
 
+        # idle prepared statements, by their SQL
+        self.statements = {}
+        self.statementCacheSize = STATEMENT_CACHE_SIZE
+
         if timeout is not None:
             self.db.sqlite_busy_timeout(timeout)
 
@@ -402,6 +456,37 @@ class Connection:
                 except weakref.ReferenceError:
                     pass
 
+    def _getStatement(self, SQL):
+        """
+        Returns a prepared statement for C{SQL}, and whether it is an idle
+        statement being reused. Only one cursor uses a statement at a
+        time.
+        """
+        stmt = self.statements.pop(SQL, None)
+        if stmt is None:
+            return self.db.prepare(SQL), False
+        return stmt, True
+
+    def _cacheStatement(self, SQL, stmt):
+        # keeps a statement which has been reset for reuse
+        if (self.closed or SQL in self.statements
+                or SQL.lstrip()[:6].upper() not in _CACHED_STATEMENTS):
+            return
+        if len(self.statements) >= self.statementCacheSize:
+            if self.statementCacheSize <= 0:
+                return
+            self.statements.popitem()
+        self.statements[SQL] = stmt
+
+    def _clearStatements(self):
+        statements = self.statements
+        self.statements = {}
+        for stmt in statements.itervalues():
+            try:
+                stmt.finalize()
+            except _sqlite.DatabaseError:
+                pass
+
     def _execute(self, sql):
         c = self.cursor()
         c.execute(sql)
@@ -460,6 +545,8 @@ class Connection:
         if self.inTransaction:
             self.rollback()
 
+        # statements which are not finalized keep the database open
+        self._clearStatements()
         self.db.close()
         self.closed = 1
 
@@ -1948,50 +1948,116 @@ class DictAsCsf:
         self.items.sort()
         self.next = 0
 
-def _convertChangeSetV2V1(inPath, outPath):
-    inFc = filecontainer.FileContainer(
-                        util.ExtendedFile(inPath, "r", buffering = False))
-    assert(inFc.version == filecontainer.FILE_CONTAINER_VERSION_FILEID_IDX)
-    outFcObj = util.ExtendedFile(outPath, "w+", buffering = False)
-    outFc = filecontainer.FileContainer(outFcObj,
-            version = filecontainer.FILE_CONTAINER_VERSION_WITH_REMOVES)
-
-    info = inFc.getNextFile()
-    lastPathId = None
-    size = 0
-    while info:
-        key, tag, f = info
-        if len(key) == 36:
-            # snip off the fileId
-            key = key[0:16]
-
-            if key == lastPathId:
-                raise changeset.PathIdsConflictError(key)
-
-            size -= 20
-
-        if 'ptr' in tag:
-            # I'm not worried about this pointing to the wrong file; that
-            # can only happen if there are multiple files with the same
-            # PathId, which would cause the conflict we test for above
-            oldCompressed = f.read()
-            old = gzip.GzipFile(None, "r",
-                                fileobj = StringIO(oldCompressed)).read()
-            new = old[0:16]
-            newCompressedF = StringIO()
-            gzip.GzipFile(None, "w", fileobj = newCompressedF).write(new)
-            newCompressed = newCompressedF.getvalue()
-            fc = filecontents.FromString(newCompressed, compressed = True)
-            size -= len(oldCompressed) - len(newCompressed)
-        else:
-            fc = filecontents.FromFile(f)
+class _ChangeSetV2V1Reader(object):
+    """
+    File object reading the version 1 (FILE_CONTAINER_VERSION_WITH_REMOVES)
+    form of a version 2 changeset, without writing the converted changeset
+    anywhere. Only the container header and the file table entries are
+    rewritten: file IDs are removed from the entry names, and config file
+    pointers are shortened. File contents are read from the original
+    changeset as they are needed, and are never decompressed. The size of
+    the converted changeset is known before it is read.
+    """
+
+    bufSize = 128 * 1024
+
+    def __init__(self, inPath):
+        self.f = util.ExtendedFile(inPath, "r", buffering = False)
+        inFc = filecontainer.FileContainer(self.f)
+        assert(inFc.version == filecontainer.FILE_CONTAINER_VERSION_FILEID_IDX)
 
-        outFc.addFile(key, fc, tag, precompressed = True)
+        # strings to write, or (offset, size) ranges of the old changeset
+        parts = [ filecontainer.FILE_CONTAINER_MAGIC +
+            struct.pack("!I", filecontainer.FILE_CONTAINER_VERSION_WITH_REMOVES)
+        ]
+        lastPathId = None
         info = inFc.getNextFile()
+        while info:
+            key, tag, f = info
+            if len(key) == 36:
+                # snip off the fileId
+                key = key[0:16]
+
+                if key == lastPathId:
+                    raise PathIdsConflictError(key)
+
+            if 'ptr' in tag:
+                # I'm not worried about this pointing to the wrong file; that
+                # can only happen if there are multiple files with the same
+                # PathId, which would cause the conflict we test for above
+                old = gzip.GzipFile(None, "r",
+                                    fileobj = StringIO(f.read())).read()
+                newCompressedF = StringIO()
+                gzip.GzipFile(None, "w",
+                              fileobj = newCompressedF).write(old[0:16])
+                contents = newCompressedF.getvalue()
+                size = len(contents)
+            else:
+                contents = (f.start, f.size)
+                size = f.size
+
+            header, footer = filecontainer.FileContainer._packFileHeader(
+                                                            key, tag, size)
+            parts.append(header)
+            parts.append(contents)
+            if footer:
+                parts.append(footer)
+            info = inFc.getNextFile()
+
+        self.size = 0
+        for part in parts:
+            if isinstance(part, str):
+                self.size += len(part)
+            else:
+                self.size += part[1]
+        self.parts = iter(parts)
+        self.current = ''
+
+    def read(self, size = -1):
+        if size >= 0:
+            return self._read(size)
+        l = []
+        data = self._read(self.bufSize)
+        while data:
+            l.append(data)
+            data = self._read(self.bufSize)
+        return ''.join(l)
+
+    def _read(self, size):
+        # returns at most size bytes, never crossing the end of a part
+        while not self.current:
+            try:
+                part = self.parts.next()
+            except StopIteration:
+                return ''
+            # contents are passed through one block at a time
+            if isinstance(part, str) or part[1]:
+                self.current = part
+        if isinstance(self.current, str):
+            data = self.current[:size]
+            self.current = self.current[size:]
+            return data
+        offset, left = self.current
+        data = self.f.pread(min(size, left), offset)
+        if len(data) < min(size, left):
+            raise IOError("changeset %s is truncated" % self.f.name)
+        if left > len(data):
+            self.current = (offset + len(data), left - len(data))
+        else:
+            self.current = ''
+        return data
 
+    def close(self):
+        self.f.close()
+
+def _convertChangeSetV2V1(inPath, outPath):
+    reader = _ChangeSetV2V1Reader(inPath)
+    outFcObj = util.ExtendedFile(outPath, "w+", buffering = False)
+    util.copyfileobj(reader, outFcObj)
     outFcObj.close()
+    reader.close()
 
-    return size
+    return reader.size - os.stat(inPath).st_size
 
 def getNativeChangesetVersion(protocolVersion):
     """Return the native changeset version supported by a client speaking the
@@ -19,6 +19,7 @@ import base64
 import gzip
 import itertools
 import os
+import struct
 import time
 import urllib
 import xml
@@ -54,7 +55,7 @@ PermissionAlreadyExists = errors.PermissionAlreadyExists
 shims = xmlshims.NetworkConvertors()
 
 # end of range or last protocol version + 1
-CLIENT_VERSIONS = range(36, 71 + 1)
+CLIENT_VERSIONS = range(36, 72 + 1)
 
 from conary.repository.trovesource import TROVE_QUERY_ALL, TROVE_QUERY_PRESENT, TROVE_QUERY_NORMAL
 
@@ -423,6 +424,8 @@ class NetworkRepositoryClient(xmlshims.NetworkConvertors,
                 caCerts=caCerts, proxyMap=proxyMap,
                 connectAttempts=connectAttempts, systemId=systemId)
         self.localRep = localRepository
+        # servers which turned down getChangeSetStream()
+        self._noChangeSetStream = set()
 
         trovesource.SearchableTroveSource.__init__(self, searchableByType=True)
         self.searchAsRepository()
@@ -1551,6 +1554,89 @@ class NetworkRepositoryClient(xmlshims.NetworkConvertors,
 
             return self.localRep.getTroves(troveList, pristine=True)
 
+        def _splitChangeSetInfo(infoList):
+            sizes = [ x[0] for x in infoList ]
+            extraTroveList = [ x for x in itertools.chain(
+                                *[ x[1] for x in infoList ] ) ]
+            extraFileList = [ x for x in itertools.chain(
+                                *[ x[2] for x in infoList ] ) ]
+            removedTroveList = [ x for x in itertools.chain(
+                                *[ x[3] for x in infoList ] ) ]
+            return sizes, extraTroveList, extraFileList, removedTroveList
+
+        def _copyChangeSet(inF, outFile, url, sizes, wrapper, abortCheck):
+            if wrapper:
+                copyCallback = wrapper.callback
+            else:
+                copyCallback = None
+
+            totalSize = util.copyfileobj(inF, outFile,
+                                         callback = copyCallback,
+                                         abortCheck = abortCheck,
+                                         rateLimit = self.downloadRateLimit)
+
+            # attempt to remove temporary local files
+            # possibly created by a shim client
+            if os.path.exists(url) and os.access(url, os.W_OK):
+                os.unlink(url)
+
+            if totalSize == None:
+                raise errors.RepositoryError("Unknown error downloading changeset")
+            elif 'content-length' in inF.headers:
+                expectSize = long(inF.headers['content-length'])
+                if totalSize != expectSize:
+                    raise errors.RepositoryError("Changeset was truncated in "
+                            "transit (expected %d bytes, got %d bytes)" %
+                            (expectSize, totalSize))
+            elif totalSize != sum(sizes):
+                raise errors.RepositoryError("Changeset was truncated in "
+                        "transit (expected %d bytes, got %d bytes)" %
+                        (sum(sizes), totalSize))
+
+            return totalSize
+
+        def _readChangeSetStream(inF, outFile, jobCount, wrapper, abortCheck):
+            # Copies the changesets from a getChangeSetStream() download to
+            # outFile and returns the information sent along with them. Each
+            # changeset is preceded by the length of its information and
+            # its size.
+            if wrapper:
+                copyCallback = wrapper.callback
+            else:
+                copyCallback = None
+
+            infoList = []
+            totalSize = 0
+            for i in range(jobCount):
+                header = inF.read(12)
+                if len(header) != 12:
+                    raise errors.RepositoryError("Changeset was truncated in "
+                            "transit (got %d bytes)" % totalSize)
+                infoLen, size = struct.unpack('!IQ', header)
+                info = util.xmlrpcLoad(inF.read(infoLen))[0][0]
+
+                if wrapper:
+                    # the total grows as the server creates the changesets
+                    wrapper.total += size
+                copied = util.copyfileobj(inF, outFile,
+                                          callback = copyCallback,
+                                          abortCheck = abortCheck,
+                                          rateLimit = self.downloadRateLimit,
+                                          sizeLimit = size,
+                                          total = totalSize)
+                if copied == None:
+                    raise errors.RepositoryError(
+                            "Unknown error downloading changeset")
+                elif copied != size:
+                    raise errors.RepositoryError("Changeset was truncated in "
+                            "transit (expected %d bytes, got %d bytes)" %
+                            (totalSize + size, totalSize + copied))
+
+                totalSize += size
+                infoList.append(info)
+
+            return infoList
+
         def _getCsFromRepos(target, cs, server, job, recurse,
                             withFiles, withFileContents,
                             excludeAutoSource, filesNeeded,
@@ -1573,32 +1659,40 @@ class NetworkRepositoryClient(xmlshims.NetworkConvertors,
             elif changesetVersion and serverVersion > 47:
                 args += (changesetVersion, )
 
-            l = server.getChangeSet(*args)
-            if serverVersion >= 50:
-                url = l[0]
-                sizes = [ x[0] for x in l[1] ]
-                extraTroveList = [ x for x in itertools.chain(
-                                    *[ x[1] for x in l[1] ] ) ]
-                extraFileList = [ x for x in itertools.chain(
-                                    *[ x[2] for x in l[1] ] ) ]
-                removedTroveList = [ x for x in itertools.chain(
-                                    *[ x[3] for x in l[1] ] ) ]
-            elif serverVersion < 38:
-                (url, sizes, extraTroveList, extraFileList) = l
-                removedTroveList = []
+            streamed = False
+            if (serverVersion >= 72 and
+                    server._serverName not in self._noChangeSetStream and
+                    changesetVersion in (None,
+                            filecontainer.FILE_CONTAINER_VERSION_LATEST)):
+                try:
+                    url = server.getChangeSetStream(
+                                        *(args[:5] + (mirrorMode,)))
+                    streamed = True
+                except errors.MethodNotSupported:
+                    self._noChangeSetStream.add(server._serverName)
+
+            if streamed:
+                # the changesets are created while we download them, and
+                # the information about each one comes along with it
+                sizes = []
             else:
-                (url, sizes, extraTroveList,
-                 extraFileList, removedTroveList) = l
-            # ensure that sizes are integers.  protocol version 44 and
-            # later sends them as strings instead of ints due to the 2
-            # GiB limitation
-            sizes = [ int(x) for x in sizes ]
+                l = server.getChangeSet(*args)
+                if serverVersion >= 50:
+                    url = l[0]
+                    (sizes, extraTroveList, extraFileList,
+                     removedTroveList) = _splitChangeSetInfo(l[1])
+                elif serverVersion < 38:
+                    (url, sizes, extraTroveList, extraFileList) = l
+                    removedTroveList = []
+                else:
+                    (url, sizes, extraTroveList,
+                     extraFileList, removedTroveList) = l
+                # ensure that sizes are integers.  protocol version 44 and
+                # later sends them as strings instead of ints due to the 2
+                # GiB limitation
+                sizes = [ int(x) for x in sizes ]
             server.setAbortCheck(None)
 
-            chgSetList += _cvtTroveList(extraTroveList)
-            filesNeeded.update(_cvtFileList(extraFileList))
-            removedList += _cvtTroveList(removedTroveList)
-
             # "forceProxy" here makes sure that multi-part requests go back
             # through the same proxy on subsequent requests.
             forceProxy = server.usedProxy()
@@ -1613,39 +1707,31 @@ class NetworkRepositoryClient(xmlshims.NetworkConvertors,
                 wrapper = callbacks.CallbackRateWrapper(
                     callback, callback.downloadingChangeSet,
                     sum(sizes))
-                copyCallback = wrapper.callback
                 abortCheck = callback.checkAbort
             else:
-                copyCallback = None
+                wrapper = None
                 abortCheck = None
 
             # seek to the end of the file
             outFile.seek(0, 2)
             start = outFile.tell()
-            totalSize = util.copyfileobj(inF, outFile,
-                                         callback = copyCallback,
-                                         abortCheck = abortCheck,
-                                         rateLimit = self.downloadRateLimit)
-
-            # attempt to remove temporary local files
-            # possibly created by a shim client
-            if os.path.exists(url) and os.access(url, os.W_OK):
-                os.unlink(url)
 
-            if totalSize == None:
-                raise errors.RepositoryError("Unknown error downloading changeset")
-            elif 'content-length' in inF.headers:
-                expectSize = long(inF.headers['content-length'])
-                if totalSize != expectSize:
-                    raise errors.RepositoryError("Changeset was truncated in "
-                            "transit (expected %d bytes, got %d bytes)" %
-                            (expectSize, totalSize))
-            elif totalSize != sum(sizes):
-                raise errors.RepositoryError("Changeset was truncated in "
-                        "transit (expected %d bytes, got %d bytes)" %
-                        (sum(sizes), totalSize))
+            if streamed:
+                infoList = _readChangeSetStream(inF, outFile, len(job),
+                                                wrapper, abortCheck)
+                (sizes, extraTroveList, extraFileList,
+                 removedTroveList) = _splitChangeSetInfo(infoList)
+                sizes = [ int(x) for x in sizes ]
+                totalSize = sum(sizes)
+            else:
+                totalSize = _copyChangeSet(inF, outFile, url, sizes, wrapper,
+                                           abortCheck)
             inF.close()
 
+            chgSetList += _cvtTroveList(extraTroveList)
+            filesNeeded.update(_cvtFileList(extraFileList))
+            removedList += _cvtTroveList(removedTroveList)
+
             for size in sizes:
                 f = util.SeekableNestedFile(outFile, size, start)
                 try:
@@ -53,7 +53,7 @@ from conary.errors import InvalidRegex
 # one in the list is the lowest protocol version we support and th
 # last one is the current server protocol version. Remember that range stops
 # at MAX - 1
-SERVER_VERSIONS = range(36, 71 + 1)
+SERVER_VERSIONS = range(36, 72 + 1)
 
 # We need to provide transitions from VALUE to KEY, we cache them as we go
 
@@ -144,6 +144,7 @@ class NetworkRepositoryServer(xmlshims.NetworkConvertors):
         self.serializeCommits = cfg.serializeCommits
         self.paranoidCommits = cfg.paranoidCommits
         self.excludeCapsuleContents = cfg.excludeCapsuleContents
+        self.changesetStreaming = cfg.changesetStreaming
 
         self.__delDB = False
         self.log = tracelog.getLog(None)
@@ -1528,7 +1529,10 @@ class NetworkRepositoryServer(xmlshims.NetworkConvertors):
 
         return (cs, allTrovesNeeded, allFilesNeeded, allRemovedTroves)
 
-    def _createChangeSet(self, destFile, jobList, recurse = False, **kwargs):
+    def _iterChangeSets(self, jobList, recurse = False, **kwargs):
+        # Yields (cs, trovesNeeded, filesNeeded, removedTroves) for each
+        # job in jobList, in order, with the lists converted for the wire.
+        # Each changeset is yielded as soon as it has been created.
         def _cvtTroveList(l):
             new = []
             for (name, (oldV, oldF), (newV, newF), absolute) in l:
@@ -1580,41 +1584,49 @@ class NetworkRepositoryServer(xmlshims.NetworkConvertors):
 
             return new
 
-        def oneChangeSet(destFile, jobs, **kwargs):
+        def oneChangeSet(jobs, **kwargs):
             # dedup jobs here; duplicates confuse the createChangeSet
             # iterator.
-            jobDict = dict.fromkeys(jobs)
-            jobOrder = jobDict.keys()
-            for result in self.repos.createChangeSet(jobOrder,
-                         excludeCapsuleContents = self.excludeCapsuleContents,
-                         **kwargs):
-                job = jobOrder.pop(0)
-                jobDict[job] = result
-
-            rc = []
+            jobOrder = []
+            jobDict = {}
             for job in jobs:
-                cs, trovesNeeded, filesNeeded, removedTroves = jobDict[job]
-                start = destFile.tell()
-                size = cs.appendToFile(destFile, withReferences = True)
+                if job not in jobDict:
+                    jobDict[job] = None
+                    jobOrder.append(job)
 
-                rc.append((str(size), _cvtTroveList(trovesNeeded),
-                                  _cvtFileList(filesNeeded),
-                                  _cvtTroveList(removedTroves),
-                                  str(destFile.tell() - start)))
-
-
-            return rc
+            csIter = itertools.izip(jobOrder,
+                        self.repos.createChangeSet(jobOrder,
+                         excludeCapsuleContents = self.excludeCapsuleContents,
+                         **kwargs))
+            for job in jobs:
+                while jobDict[job] is None:
+                    doneJob, result = csIter.next()
+                    jobDict[doneJob] = result
 
-        # --- def _createChangeSet() begins here
+                cs, trovesNeeded, filesNeeded, removedTroves = jobDict[job]
+                yield (cs, _cvtTroveList(trovesNeeded),
+                       _cvtFileList(filesNeeded),
+                       _cvtTroveList(removedTroves))
 
-        retList = []
+        # --- def _iterChangeSets() begins here
 
         if recurse:
             for job in jobList:
-                retList += oneChangeSet(destFile, [ job ], **kwargs)
+                for result in oneChangeSet([ job ], **kwargs):
+                    yield result
         else:
-            retList = oneChangeSet(destFile, jobList, recurse = recurse,
-                                   **kwargs)
+            for result in oneChangeSet(jobList, recurse = recurse, **kwargs):
+                yield result
+
+    def _createChangeSet(self, destFile, jobList, recurse = False, **kwargs):
+        retList = []
+        for (cs, trovesNeeded, filesNeeded, removedTroves) in \
+                    self._iterChangeSets(jobList, recurse = recurse, **kwargs):
+            start = destFile.tell()
+            size = cs.appendToFile(destFile, withReferences = True)
+
+            retList.append((str(size), trovesNeeded, filesNeeded,
+                            removedTroves, str(destFile.tell() - start)))
 
         return retList
 
@@ -1662,6 +1674,95 @@ class NetworkRepositoryServer(xmlshims.NetworkConvertors):
 
         return url, rc
 
+    @accessReadOnly
+    @requireClientProtocol(72)
+    def getChangeSetStream(self, authToken, clientVersion, chgSetList,
+                           recurse, withFiles, withFileContents,
+                           excludeAutoSource, mirrorMode = False):
+        """
+        Like getChangeSet(), but returns only a URL; the changesets are
+        created while that URL is being downloaded instead of being written
+        out in full first. For each job the download contains a header
+        packed as '!IQ' with the length of the job's info and the size of
+        its changeset, the info (what getChangeSet() returns for the job,
+        as an XML-RPC response) and then the changeset itself.
+        """
+        if not self.changesetStreaming:
+            raise errors.MethodNotSupported('getChangeSetStream')
+
+        self.log(2, [x[0] for x in chgSetList],
+                 list(set([x[2][0] for x in chgSetList])),
+                 "recurse=%s withFiles=%s withFileContents=%s" % (
+            recurse, withFiles, withFileContents))
+
+        cu = self.db.cursor()
+        roleIds = self.auth.getAuthRoles(cu, authToken)
+        if not roleIds:
+            raise errors.InsufficientPermission
+
+        # Requesting hidden troves directly is OK, e.g. commit hooks
+        self._checkPermissions(authToken, chgSetList, hidden=True)
+
+        # the job is kept in wire format until the download starts
+        (fd, path) = tempfile.mkstemp(dir = self.tmpPath,
+                                      suffix = '.csj-out')
+        jobFile = os.fdopen(fd, 'w')
+        try:
+            cPickle.dump((list(roleIds), chgSetList, recurse, withFiles,
+                          withFileContents, excludeAutoSource, mirrorMode),
+                         jobFile, cPickle.HIGHEST_PROTOCOL)
+            jobFile.close()
+        except:
+            util.removeIfExists(path)
+            raise
+
+        return os.path.join(self.urlBase(),
+                            "changeset?%s" % os.path.basename(path)[:-4])
+
+    def openChangeSetStream(self, path):
+        """
+        Returns an iterator which creates the changesets for a job saved
+        by getChangeSetStream(), yielding an (info, csFile) tuple for each
+        one. info is what getChangeSet() returns for the job and csFile is
+        the changeset, with references to the contents store, in a file
+        container. The job file is removed; IOError is raised if it does
+        not exist.
+        """
+        jobFile = open(path, 'rb')
+        os.unlink(path)
+        (roleIds, chgSetList, recurse, withFiles, withFileContents,
+                    excludeAutoSource, mirrorMode) = cPickle.load(jobFile)
+        jobFile.close()
+
+        chgSetList = [ self._cvtJobEntry(None, x) for x in chgSetList ]
+        return self._iterChangeSetStream(chgSetList,
+                                    recurse = recurse,
+                                    withFiles = withFiles,
+                                    withFileContents = withFileContents,
+                                    excludeAutoSource = excludeAutoSource,
+                                    roleIds = roleIds,
+                                    mirrorMode = mirrorMode)
+
+    def _iterChangeSetStream(self, jobList, **kwargs):
+        # this runs outside of callWrapper(), so it has to finish the
+        # transaction itself
+        try:
+            for (cs, trovesNeeded, filesNeeded, removedTroves) in \
+                                    self._iterChangeSets(jobList, **kwargs):
+                csFile = util.ExtendedStringIO()
+                size = cs.appendToFile(csFile, withReferences = True)
+                del cs
+
+                yield ((str(size), trovesNeeded, filesNeeded, removedTroves,
+                        str(csFile.tell())), csFile)
+        except:
+            if self.db.inTransaction(default=True):
+                self.db.rollback()
+            raise
+
+        if self.db.inTransaction(default=True):
+            self.db.commit()
+
     @accessReadOnly
     def getChangeSetFingerprints(self, authToken, clientVersion, chgSetList,
                     recurse, withFiles, withFileContents, excludeAutoSource,
@@ -2918,7 +3019,7 @@ class NetworkRepositoryServer(xmlshims.NetworkConvertors):
                 currentTroveInfo.thaw(cu.frombinary(data))
             else:
                 name = currentTroveInfo.streamDict[tag][2]
-                currentTroveInfo.__getattribute__(name).thaw(cu.frombinary(data))
+                getattr(currentTroveInfo, name).thaw(cu.frombinary(data))
             if currentMark is None:
                 currentMark = tmark
             currentMark = min(currentMark, tmark)
@@ -3709,6 +3810,7 @@ class ServerConfig(ConfigFile):
     memCachePrefix          = CfgString
     changesetCacheDir       = CfgPath
     changesetCacheLogFile   = CfgPath
+    changesetStreaming      = (CfgBool, False)
     closed                  = CfgString
     commitAction            = CfgString
     contentsDir             = CfgPath
@@ -19,12 +19,15 @@ import cPickle
 import itertools
 import os
 import resource
+import stat
+import struct
 import tempfile
 import time
 import urllib2
 
 from conary import constants, conarycfg, rpmhelper, trove, versions
-from conary.lib import digestlib, sha1helper, tracelog, urlparse, util
+from conary.lib import cpiostream, digestlib, sha1helper, tracelog, urlparse
+from conary.lib import util
 from conary.lib.http import http_error
 from conary.lib.http import request as req_mod
 from conary.repository import changeset, datastore, errors, netclient
@@ -509,6 +512,21 @@ class ChangesetFilter(BaseProxy):
             return self._convertChangeSetV2V1(csPath, size, destCsVersion)
         assert False, "Unknown versions"
 
+    def _openConvertedChangeSet(self, csPath, size, destCsVersion, csVersion):
+        """
+        Returns a file object reading the changeset in csPath converted to
+        destCsVersion, and the size of the converted changeset.  Version 2
+        changesets are converted as they are read, without a temporary copy.
+        """
+        if (csVersion, destCsVersion) == (_CSVER2, _CSVER1):
+            reader = changeset._ChangeSetV2V1Reader(csPath)
+            return reader, reader.size
+        path, size = self._convertChangeSet(csPath, size, destCsVersion,
+                                            csVersion)
+        fObj = open(path)
+        os.unlink(path)
+        return fObj, size
+
     def _convertChangeSetV3V2(self, cspath, size, destCsVersion):
         (fd, newCsPath) = tempfile.mkstemp(dir = self.cfg.tmpDir,
                                            suffix = '.tmp')
@@ -1025,21 +1043,28 @@ class ChangesetFilter(BaseProxy):
             idx = verHash[oldV]
 
             for iterV in reversed(verPath[:idx]):
-                # Convert the changeset
-                path, newSize = self._convertChangeSet(csPath, csInfo.size,
-                                                       iterV, oldV)
-                csInfo.size = newSize
-                csInfo.version = iterV
-
                 cachable = (csInfo.fingerprint and self.csCache)
 
                 if not cachable:
+                    # Convert the changeset
+                    path, newSize = self._convertChangeSet(csPath,
+                            csInfo.size, iterV, oldV)
+                    csInfo.size = newSize
+                    csInfo.version = iterV
                     # we're not caching; erase the old version
                     os.unlink(csPath)
                     csPath = path
                 else:
-                    csPath = self.csCache.set((csInfo.fingerprint, iterV),
-                        (csInfo, open(path), None))
+                    # Convert the changeset as it is written to the cache
+                    fObj, newSize = self._openConvertedChangeSet(csPath,
+                            csInfo.size, iterV, oldV)
+                    csInfo.size = newSize
+                    csInfo.version = iterV
+                    try:
+                        csPath = self.csCache.set((csInfo.fingerprint, iterV),
+                            (csInfo, fObj, newSize))
+                    finally:
+                        fObj.close()
 
                 oldV = iterV
 
@@ -1253,7 +1278,7 @@ class ChangesetFilter(BaseProxy):
                 neededFileKeys.append((pathId, fileId, path, configFileSha1))
 
             if neededFileKeys:
-                dl = self.CapsuleDownloader(self.cfg.capsuleServerUrl)
+                dl = self._getCapsuleDownloader()
                 rpmKey = self._getCapsuleKey(trvCs.getTroveInfo().capsule.rpm)
                 fileInfoList = [x[2:4] for x in neededFileKeys]
                 fileObjs = dl.downloadCapsuleFiles(rpmKey, capsuleSha1,
@@ -1307,13 +1332,16 @@ class ChangesetFilter(BaseProxy):
             newChangeset)
         rpmSha1 = fileObj.contents.sha1()
 
-        dl = self.CapsuleDownloader(self.cfg.capsuleServerUrl)
+        dl = self._getCapsuleDownloader()
         rpmKey = self._getCapsuleKey(rpmData)
         rpmContents = dl.downloadCapsule(rpmKey, rpmSha1)
         destChangeset.addFileContents(pathId, fileId, contType,
                             rpmContents, cfgFile = False)
         return rpmSha1
 
+    def _getCapsuleDownloader(self):
+        return self.CapsuleDownloader(self.cfg.capsuleServerUrl)
+
     @classmethod
     def _getCapsuleKey(cls, rpmData):
         return (rpmData.name(), rpmData.epoch(), rpmData.version(),
@@ -1568,6 +1596,149 @@ class FileCachingChangesetFilter(BaseCachingChangesetFilter):
         BaseCachingChangesetFilter.__init__(self, cfg, basicUrl)
         util.mkdirChain(cfg.proxyContentsDir)
         self.contents = datastore.DataStore(cfg.proxyContentsDir)
+        # Use only 1/4 our file descriptor limit for locks, like
+        # ChangesetCache
+        limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+        self.maxContentsLocks = limit / 4
+
+    def _getCapsuleDownloader(self):
+        return self.CachingCapsuleDownloader(self.cfg.capsuleServerUrl,
+                                             self.contents)
+
+    class CachingCapsuleDownloader(ChangesetFilter.CapsuleDownloader):
+        """
+        Keeps the capsules downloaded from the capsule server in the proxy
+        contents store, along with an index from the sha1 of each file in
+        the capsule payload to the offset and size of its contents in the
+        uncompressed payload. Files found in the index are read from a
+        seekable copy of the payload instead of being downloaded one at a
+        time.
+        """
+
+        bufSize = 128 * 1024
+        emptySha1 = sha1helper.sha1ToString(sha1helper.sha1String(''))
+
+        def __init__(self, url, contents):
+            ChangesetFilter.CapsuleDownloader.__init__(self, url)
+            self.contents = contents
+
+        def downloadCapsule(self, capsuleKey, sha1sum):
+            path = self._getCapsulePath(capsuleKey, sha1sum)
+            return self.fromFile(open(path))
+
+        def downloadCapsuleFiles(self, capsuleKey, capsuleSha1sum, fileList):
+            results = [ None ] * len(fileList)
+            # (offset, size) -> indexes in fileList
+            neededRanges = {}
+            index = None
+            for i, (fileName, fileSha1sum) in enumerate(fileList):
+                if capsuleSha1sum == fileSha1sum or fileName == '':
+                    results[i] = self.downloadCapsule(capsuleKey,
+                                                      capsuleSha1sum)
+                    continue
+                if self._sha1(fileSha1sum) == self.emptySha1:
+                    # ghost files are not in the payload at all
+                    results[i] = self.fromFile(util.BoundedStringIO())
+                    continue
+                if index is None:
+                    index = self._getCapsuleIndex(capsuleKey, capsuleSha1sum)
+                fileRange = index.get(self._sha1(fileSha1sum))
+                if fileRange is None:
+                    results[i] = self.downloadCapsuleFile(capsuleKey,
+                            capsuleSha1sum, fileName, fileSha1sum)
+                else:
+                    neededRanges.setdefault(fileRange, []).append(i)
+
+            if not neededRanges:
+                return results
+
+            payload = cpiostream.CheckpointedPayload(self.contents.openRawFile(
+                    self._sha1(capsuleSha1sum) + '-p'))
+            for (offset, size), idxList in sorted(neededRanges.items()):
+                payload.seek(offset)
+                data = util.BoundedStringIO()
+                self._copy(payload, data, size)
+                # every file gets a stream of its own
+                for i in idxList[1:]:
+                    data.seek(0)
+                    out = util.BoundedStringIO()
+                    self._copy(data, out, size)
+                    out.seek(0)
+                    results[i] = self.fromFile(out)
+                data.seek(0)
+                results[idxList[0]] = self.fromFile(data)
+            return results
+
+        def _getCapsulePath(self, capsuleKey, sha1sum):
+            key = self._sha1(sha1sum) + '-r'
+            if not self.contents.hasFile(key):
+                fileObj = ChangesetFilter.CapsuleDownloader.downloadCapsule(
+                        self, capsuleKey, sha1sum)
+                # the download has been checked against the sha1 already
+                self.contents.addFile(fileObj.get(), key, precompressed = True,
+                                      integrityCheck = False)
+            return self.contents.hashToPath(key)
+
+        def _getCapsuleIndex(self, capsuleKey, sha1sum):
+            key = self._sha1(sha1sum) + '-x'
+            payloadKey = self._sha1(sha1sum) + '-p'
+            if self.contents.hasFile(key) and self.contents.hasFile(payloadKey):
+                index = {}
+                for line in self.contents.openRawFile(key):
+                    fileSha1, offset, size = line.split()
+                    index[fileSha1] = (int(offset), int(size))
+                return index
+
+            # keep a seekable copy of the payload, so files are read without
+            # decompressing the payload up to them
+            payloadPath = self.contents.hashToPath(payloadKey)
+            self.contents.makeDir(payloadPath)
+            payloadFile = util.AtomicFile(payloadPath)
+            try:
+                writer = cpiostream.CheckpointWriter(
+                        rpmhelper.UncompressedRpmPayload(
+                            open(self._getCapsulePath(capsuleKey, sha1sum))),
+                        payloadFile)
+                index = self._indexPayload(writer)
+                writer.close()
+                payloadFile.commit()
+            finally:
+                payloadFile.close()
+
+            out = util.BoundedStringIO()
+            for fileSha1, (offset, size) in sorted(index.iteritems()):
+                out.write('%s %d %d\n' % (fileSha1, offset, size))
+            out.seek(0)
+            self.contents.addFile(out, key, precompressed = True,
+                                  integrityCheck = False)
+            return index
+
+        @classmethod
+        def _indexPayload(cls, payload):
+            index = {}
+            cpioObj = cpiostream.CpioStream(payload)
+            for entry in cpioObj:
+                if not stat.S_ISREG(entry.header.mode):
+                    continue
+                offset = cpioObj.tell()
+                digest = digestlib.sha1()
+                buf = entry.payload.read(cls.bufSize)
+                while buf:
+                    digest.update(buf)
+                    buf = entry.payload.read(cls.bufSize)
+                # hardlinked files only carry their contents once
+                index.setdefault(digest.hexdigest(),
+                                 (offset, entry.header.filesize))
+            return index
+
+        @classmethod
+        def _copy(cls, src, dest, size):
+            while size:
+                buf = src.read(min(size, cls.bufSize))
+                if not buf:
+                    raise errors.RepositoryError('capsule payload is truncated')
+                dest.write(buf)
+                size -= len(buf)
 
     def getFileContents(self, caller, authToken, clientVersion, fileList,
                         authCheckOnly = False):
@@ -1597,6 +1768,62 @@ class FileCachingChangesetFilter(BaseCachingChangesetFilter):
 
             neededFiles.append((encFileId, encVersion))
 
+        # only one request fetches a given file from upstream; requests
+        # which wait for it use the contents it saved
+        neededFiles, coalescedFiles, locks = self._lockFileContents(
+                                                            neededFiles)
+        try:
+            hasFiles.extend(coalescedFiles)
+            self._getFileContents(caller, clientVersion, hasFiles,
+                                  neededFiles)
+        finally:
+            for lock in locks:
+                lock.unlock()
+
+        url, sizes = self._saveFileContentsChangeset(clientVersion, fileList)
+        return url, sizes
+
+    def _lockFileContents(self, fileList):
+        """
+        Lock the contents store entries for the files in fileList, in
+        sorted order so concurrent requests can not deadlock. A request
+        which has to wait for a lock usually finds the file saved by the
+        request holding it.
+
+        Returns the files which still need to be fetched, the files which
+        were saved while waiting, and the locks to release once the
+        fetched files are saved.
+        """
+        byFileId = {}
+        for encFileId, encVersion in fileList:
+            fileId = sha1helper.sha1ToString(self.toFileId(encFileId))
+            byFileId.setdefault(fileId, []).append((encFileId, encVersion))
+
+        neededFiles = []
+        coalescedFiles = []
+        locks = []
+        savedBytes = 0
+        for fileId in sorted(byFileId):
+            path = self.contents.hashToPath(fileId + '-c')
+            self.contents.makeDir(path)
+            lock = util.LockedFile(path)
+            shouldLock = len(locks) < self.maxContentsLocks
+            fileObj = lock.open(shouldLock = shouldLock)
+            if fileObj is None:
+                if shouldLock:
+                    locks.append(lock)
+                neededFiles.extend(byFileId[fileId])
+            else:
+                savedBytes += os.fstat(fileObj.fileno()).st_size
+                fileObj.close()
+                coalescedFiles.extend(byFileId[fileId])
+
+        if coalescedFiles:
+            self.log(2, "file contents coalesced=%d upstream bytes saved=%d"
+                     % (len(coalescedFiles), savedBytes))
+        return neededFiles, coalescedFiles, locks
+
+    def _getFileContents(self, caller, clientVersion, hasFiles, neededFiles):
         # make sure this user has permissions for these file contents. an
         # exception will get raised if we don't have sufficient permissions
         if hasFiles:
@@ -1622,7 +1849,7 @@ class FileCachingChangesetFilter(BaseCachingChangesetFilter):
                     ((filePath, fileSha1), (encFileId, encVersion)))
 
             if indexerContent:
-                dl = self.CapsuleDownloader(self.cfg.capsuleServerUrl)
+                dl = self._getCapsuleDownloader()
                 for (capsuleType, capsuleKey, capsuleSha1), valList in \
                         indexerContent.items():
                     fileInfoList = [ x[0] for x in valList ]
@@ -1642,9 +1869,6 @@ class FileCachingChangesetFilter(BaseCachingChangesetFilter):
             self._saveFileContents(neededFiles, url, sizes,
                     forceProxy=caller._lastProxy)
 
-        url, sizes = self._saveFileContentsChangeset(clientVersion, fileList)
-        return url, sizes
-
     def _saveFileContents(self, fileList, url, sizes, forceProxy):
         # insure that the size is an integer -- protocol version
         # 44 returns a string to avoid XML-RPC marshal limits
@@ -1784,6 +2008,13 @@ class ProxyRepositoryServer(Memcache, FileCachingChangesetFilter):
             self._baseUrlOverride = urlparse.urlunparse(items)
 
 
+    def getChangeSetStream(self, caller, authToken, clientVersion, *args,
+                           **kwargs):
+        # streamed changesets are downloaded straight from the repository,
+        # which this proxy can't pass through or cache; clients fall back
+        # to getChangeSet()
+        raise errors.MethodNotSupported('getChangeSetStream')
+
     def getFileContentsFromTrove(self, caller, authToken, clientVersion,
                                  troveName, version, flavor, pathList):
         (url, sizes) = caller.getFileContentsFromTrove(
@@ -2130,6 +2361,26 @@ class ChangesetFileReader(object):
             items = [ (localName, size, 0, 0) ]
         return items
 
+    @classmethod
+    def iterChangeSetStream(cls, changeSets, contentsStore):
+        """
+        Serializes the (info, csFile) tuples returned by
+        NetworkRepositoryServer.openChangeSetStream(), yielding chunks of
+        bytes. Each changeset is preceded by the length of its XML-RPC
+        encoded info and its expanded size (as a network order 32 bit and
+        64 bit integer), and then the info.
+        """
+        for info, csFile in changeSets:
+            infoData = util.xmlrpcDump((info,), methodresponse = 1)
+            yield struct.pack('!IQ', len(infoData), long(info[0]))
+            yield infoData
+
+            cs = filecontainer.FileContainer(csFile)
+            for data in cs.dumpIter(cls.readNestedFile,
+                                    args=(contentsStore,)):
+                yield data
+            del cs
+
     def writeItems(self, items, wfile, contentsStore=None):
         for path, size, isChangeset, preserveFile in items:
             if isChangeset:
@@ -269,15 +269,16 @@ class TroveStore:
         # then using all of the and's in this join
 
         schema.resetTable(cu, 'tmpIVF')
+        rows = []
         for troveName in troveDict.keys():
             outD[troveName] = {}
             for version in troveDict[troveName]:
                 outD[troveName][version] = []
                 versionStr = version.asString()
                 vMap[versionStr] = version
-                cu.execute("INSERT INTO tmpIVF VALUES (?, ?, ?)",
-                           (troveName, versionStr, versionStr),
-                           start_transaction = False)
+                rows.append((troveName, versionStr, versionStr))
+        self.db.bulkload("tmpIVF", rows, [ "item", "version", "fullVersion" ],
+                         start_transaction = False)
         self.db.analyze("tmpIVF")
         cu.execute("""
         SELECT Items.item, fullVersion, Flavors.flavor
@@ -654,24 +655,15 @@ class TroveStore:
         else:
             oldInstanceId = None
 
-        cu.execute("""
-        INSERT INTO tmpNewTroves (itemId, branchId, flavorId,
-                                  instanceId, versionId,
-                                  finalTimeStamp, troveType,
-                                  oldInstanceId, hidden)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, troveItemId, troveBranchId, troveFlavorId,
+        self.newTroves.add(troveItemId, troveBranchId, troveFlavorId,
              troveInstanceId, troveVersionId,
              '%.3f' % trv.getVersion().timeStamps()[-1],
              trv.getType(), oldInstanceId, int(hidden))
 
         # Fold tmpNewFiles into FileStreams
         if len(newFilesInsertList):
-            self.db.bulkload("tmpNewFiles",
-                    [ x + (troveInstanceId,) for x in newFilesInsertList ],
-                    [ "pathId", "versionId", "fileId",
-                      "dirnameId", "basenameId", "pathChanged",
-                      "instanceId" ])
+            self.newFiles.extend(
+                    [ x + (troveInstanceId,) for x in newFilesInsertList ])
 
         # iterate over both strong and weak troves, and set weakFlag to
         # indicate which kind we're looking at when
@@ -702,11 +694,7 @@ class TroveStore:
                                trv.getType()))
 
         if len(insertList):
-            self.db.bulkload("tmpTroves", insertList, [
-                "item", "version", "frozenVersion", "timestamps",
-                "finalTimestamp",
-                "branch", "label", "flavor", "flags", "instanceId",
-                "troveType"])
+            self.includedTroves.extend(insertList)
 
         # process troveInfo and metadata...
         self.troveInfoTable.addInfo(cu, trv, troveInstanceId)
@@ -715,14 +703,16 @@ class TroveStore:
             # don't bother with any of this unless there actually are redirects
             schema.resetTable(cu, 'tmpNewRedirects')
             # now add the redirects
+            redirects = []
             for (name, branch, flavor) in trv.iterRedirects():
                 if flavor is None:
                     frz = None
                 else:
                     frz = flavor.freeze()
-                cu.execute("INSERT INTO tmpNewRedirects (item, branch, flavor) "
-                           "VALUES (?, ?, ?)", (name, str(branch), frz),
-                           start_transaction=False)
+                redirects.append((name, str(branch), frz))
+            self.db.bulkload("tmpNewRedirects", redirects,
+                             [ "item", "branch", "flavor" ],
+                             start_transaction = False)
             self.db.analyze("tmpNewRedirects")
 
             # again need to pay attention to CheckTrovesCache and use
@@ -773,6 +763,19 @@ class TroveStore:
         self.depAdder = deptable.BulkDependencyLoader(self.db, cu)
         self.newStreamsByFileId = dict()
 
+        # rows for the trove set are gathered and loaded in batches;
+        # addTroveSetDone() loads what is left before merging them
+        self.newTroves = self.db.bulkloader("tmpNewTroves",
+            [ "itemId", "branchId", "flavorId", "instanceId", "versionId",
+              "finalTimeStamp", "troveType", "oldInstanceId", "hidden" ])
+        self.newFiles = self.db.bulkloader("tmpNewFiles",
+            [ "pathId", "versionId", "fileId", "dirnameId", "basenameId",
+              "pathChanged", "instanceId" ])
+        self.includedTroves = self.db.bulkloader("tmpTroves",
+            [ "item", "version", "frozenVersion", "timestamps",
+              "finalTimestamp", "branch", "label", "flavor", "flags",
+              "instanceId", "troveType" ])
+
         schema.resetTable(cu, 'tmpNewPaths')
         l = [(cu.binary(x),) for x in dirNames]
         self.db.bulkload("tmpNewPaths", l, [ "path" ])
@@ -862,6 +865,10 @@ class TroveStore:
             callback = callbacks.UpdateCallback()
         cu = self.db.cursor()
 
+        for loader in (self.newTroves, self.newFiles, self.includedTroves):
+            loader.flush()
+        self.newTroves = self.newFiles = self.includedTroves = None
+
         self._mergeIncludedTroves(cu)
         self._mergeTroveNewFiles(cu)
 
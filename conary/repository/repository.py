@@ -344,6 +344,21 @@ class ChangeSetJob:
         assert(hasattr(callback, 'verifyTroveSignatures'))
         return callback.verifyTroveSignatures(trv)
 
+    def preverifyTroveSignatures(self, csTroveList, callback):
+        # verify the signatures of all of the new troves together; the
+        # checkTroveSignatures() call for each trove then finds them in
+        # the key cache's verified signature cache
+        troveInfoList = []
+        for csTrove in csTroveList:
+            troveInfo = csTrove.getTroveInfo()
+            if troveInfo is not None:
+                troveInfoList.append((troveInfo,
+                                csTrove.getNewVersion().trailingLabel()))
+
+        trove.preverifyDigitalSignatures(troveInfoList,
+                keyCache = getattr(callback, 'keyCache', None),
+                warn = getattr(callback, 'trustThreshold', 0) > 0)
+
     def _handleContents(self, pathId, fileId, fileStream,
                         configRestoreList, normalRestoreList,
                         oldFileId = None, oldVersion = None, oldfile = None,
@@ -474,6 +489,12 @@ class ChangeSetJob:
                                 newList if x.getOldVersion() ]
         oldTroveIter = repos.iterTroves(oldTrovesNeeded, hidden = True)
 
+        if len(newList) > 1 and hasattr(callback, 'verifyTroveSignatures'):
+            self.preverifyTroveSignatures(
+                    [ x for x in newList
+                      if x.troveType() != trove.TROVE_TYPE_REMOVED ],
+                    callback)
+
         troveNo = 0
         for csTrove in newList:
             if csTrove.troveType() == trove.TROVE_TYPE_REMOVED:
@@ -853,14 +853,12 @@ class SearchableTroveSource(AbstractTroveSource):
         if not toCalc:
             return
         if flavorCheck == _CHECK_TROVE_STRONG_FLAVOR:
-            strongFlavors = [x.toStrongFlavor() for x in toCalc]
-            toCalc = zip(strongFlavors, toCalc)
-            scores = ((x[0].score(flavorQuery), x[1]) \
-                                        for x in toCalc)
+            scores = deps.scoreStrongFlavorList(toCalc, flavorQuery)
         else:
-            scores = ((flavorQuery.score(x), x) for x in flavorList)
+            scores = deps.scoreFlavorList(flavorQuery, toCalc)
 
-        scoreCache.update(((flavorQuery, x[1]),x[0]) for x in scores)
+        scoreCache.update(((flavorQuery, x[1]), x[0])
+                          for x in itertools.izip(scores, toCalc))
 
     def _addFilteredFlavorsToResults(self, version, flavorList, flavorQuery,
                                    usedFlavors, queryResults, latestFilter,
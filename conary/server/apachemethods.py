@@ -206,7 +206,21 @@ def get(port, isSecure, repos, req, restHandler=None, authToken=None, repServer=
 
         localName = repos.tmpPath + "/" + req.args + "-out"
 
-        if localName.endswith(".cf-out"):
+        if localName.endswith(".csj-out"):
+            # changesets which are created while they are sent
+            if repServer is None:
+                return apache.HTTP_NOT_FOUND
+            try:
+                changeSets = repServer.openChangeSetStream(localName)
+            except IOError:
+                return apache.HTTP_NOT_FOUND
+
+            req.content_type = "application/x-conary-change-set-stream"
+            for data in proxy.ChangesetFileReader.iterChangeSetStream(
+                    changeSets, repos.getContentsStore()):
+                req.write(data)
+            return apache.OK
+        elif localName.endswith(".cf-out"):
             try:
                 f = open(localName, "r")
             except IOError:
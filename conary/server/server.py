@@ -109,6 +109,9 @@ class HttpRequests(SimpleHTTPRequestHandler):
                 # handle CNY-1142
                 self.send_error(400)
                 return None
+            if queryString.endswith('.csj'):
+                self.sendChangesetStream(queryString)
+                return None
             csfr = ChangesetFileReader(self.tmpDir)
             items = csfr.getItems(queryString)
             if items is None:
@@ -129,6 +132,49 @@ class HttpRequests(SimpleHTTPRequestHandler):
         else:
             self.send_error(501)
 
+    def sendChangesetStream(self, queryString):
+        localName = self.tmpDir + "/" + queryString + "-out"
+        if self.netProxy or os.path.realpath(localName) != localName:
+            self.send_error(404)
+            return
+
+        repos = self.netRepos.repos
+        repos.reopen()
+        try:
+            changeSets = repos.openChangeSetStream(localName)
+        except IOError:
+            self.send_error(404)
+            return
+
+        # HTTP/1.1 clients get the changesets chunked, with the total size
+        # in a trailer; others get them until the connection is closed
+        chunked = (self.request_version == 'HTTP/1.1')
+        if chunked:
+            self.protocol_version = 'HTTP/1.1'
+        self.close_connection = 1
+        self.send_response(200)
+        self.send_header("Content-type",
+                         "application/x-conary-change-set-stream")
+        self.send_header("Connection", "close")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("Trailer", "X-Conary-Changeset-Size")
+        self.end_headers()
+
+        totalSize = 0
+        for data in ChangesetFileReader.iterChangeSetStream(changeSets,
+                                                    repos.getContentsStore()):
+            if not data:
+                continue
+            totalSize += len(data)
+            if chunked:
+                data = "%x\r\n%s\r\n" % (len(data), data)
+            self.wfile.write(data)
+
+        if chunked:
+            self.wfile.write("0\r\nX-Conary-Changeset-Size: %d\r\n\r\n"
+                             % totalSize)
+
     def do_POST(self):
         if self.headers.get('Content-Type', '') == 'text/xml':
             authToken = self.getAuth()
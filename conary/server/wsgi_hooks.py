@@ -347,8 +347,9 @@ class ConaryHandler(object):
         finally:
             # This closes the repository server immediately after the initial
             # request handling phase, meaning that 'generator' responses will
-            # not have access to it. Currently the only generator is
-            # _produceChangeset() which does not need a repository server.
+            # not have access to it. _produceChangeset() does not need a
+            # repository server; _produceChangesetStream() takes it over
+            # and closes it when it is done.
             self.close()
 
     def _handleRequest(self, request):
@@ -477,6 +478,10 @@ class ConaryHandler(object):
             return self._makeError('403 Forbidden',
                     "Illegal changeset request")
 
+        if path.endswith('.csj-out'):
+            # Changesets which are created while they are sent
+            return self._getChangesetStream(path)
+
         items = []
         totalSize = 0
 
@@ -547,6 +552,38 @@ class ConaryHandler(object):
             if not preserveFile:
                 os.unlink(path)
 
+    def _getChangesetStream(self, path):
+        if not self.repositoryServer:
+            return self._makeError('404 Not Found', "Changeset not found")
+        try:
+            changeSets = self.repositoryServer.openChangeSetStream(path)
+        except IOError, err:
+            if err.errno == errno.ENOENT:
+                return self._makeError('404 Not Found',
+                        "Changeset not found")
+            raise
+
+        # The response needs the repository server until it is done, so it
+        # takes it over and closes it itself.
+        repositoryServer = self.repositoryServer
+        self.repositoryServer = None
+
+        # No content length; the server sends this chunked
+        return self.responseFactory(
+                status='200 OK',
+                app_iter=self._produceChangesetStream(repositoryServer,
+                    changeSets),
+                content_type='application/x-conary-change-set-stream',
+                )
+
+    def _produceChangesetStream(self, repositoryServer, changeSets):
+        try:
+            for data in proxy.ChangesetFileReader.iterChangeSetStream(
+                    changeSets, self.contentsStore):
+                yield data
+        finally:
+            repositoryServer.close()
+
     def putChangeset(self):
         """PUT method -- handle changeset uploads."""
         if not self.repositoryServer:
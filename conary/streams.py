@@ -38,6 +38,8 @@ LongLongStream = cstreams.LongLongStream
 
 splitFrozenStreamSet = cstreams.splitFrozenStreamSet
 whiteOutFrozenStreamSet = cstreams.whiteOutFrozenStreamSet
+diffFileMaps = cstreams.diffFileMaps
+applyFileChanges = cstreams.applyFileChanges
 
 SMALL = cstreams.SMALL
 LARGE = cstreams.LARGE
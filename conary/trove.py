@@ -841,7 +841,7 @@ class MetadataItem(streams.StreamSet):
                 except KeyNotFound:
                     missingKeys.append(signature[0])
                     continue
-                lev = key.verifyString(digest, signature)
+                lev = keyCache.verifyString(key, digest, signature)
                 if lev == -1:
                     badFingerprints.append(key.getFingerprint())
                 elif lev < TRUST_TRUSTED:
@@ -1335,6 +1335,15 @@ class TroveInfo(streams.StreamSet):
         _TROVEINFO_TAG_PATHCONFLICTS : (DYNAMIC, StringOrderedStreamCollection, "pathConflicts" ),
         _TROVEINFO_TAG_INSTALLTIME   : (DYNAMIC, streams.LongLongStream, 'installTime'),
     }
+    # most callers only look at a few fields, so the large ones are left
+    # frozen until they're accessed
+    lazyStreams = dict((x, True) for x in
+                       ( 'buildReqs', 'loadedTroves', 'sigs', 'pathHashes',
+                         'policyProviders', 'dirHashes', 'scripts',
+                         'metadata', 'troveCopiedFrom', 'searchPath',
+                         'derivedFrom', 'clonedFromList', 'capsule',
+                         'mtimes', 'properties', 'buildRefs',
+                         'pathConflicts' ))
 
     v0SignatureExclusions = _getTroveInfoSigExclusions(streamDict)
     _oldMetadataItems = dict([ (x[1][2], True) for x in
@@ -1668,7 +1677,7 @@ class Trove(streams.StreamSet):
             except KeyNotFound:
                 missingKeys.append(signature[0])
                 continue
-            lev = key.verifyString(digest(), signature)
+            lev = keyCache.verifyString(key, digest(), signature)
             if lev == -1:
                 badFingerprints.append(key.getFingerprint())
             elif lev < TRUST_TRUSTED:
@@ -2136,7 +2145,14 @@ class Trove(streams.StreamSet):
 
         fileMap = {}
 
-        if not skipFiles:
+        if not skipFiles and not needNewFileMap:
+            assert(not self.type() or not trvCs.getNewFileList(raw = True))
+            streams.applyFileChanges(self.idMap,
+                                     trvCs.getNewFileList(raw = True),
+                                     trvCs.getChangedFileList(raw = True))
+            for pathId in trvCs.getOldFileList():
+                self.removeFile(pathId)
+        elif not skipFiles:
             for (pathId, dirName, baseName, fileId, fileVersion) in \
                             trvCs.getNewFileList(raw = True):
                 self.addRawFile(pathId, dirName, baseName, fileVersion, fileId)
@@ -2407,23 +2423,12 @@ class Trove(streams.StreamSet):
         chgSet.setProvides(self.provides())
         chgSet.setRedirects(self.redirects)
 
-        removedIds = []
-        addedIds = []
-        sameIds = {}
         filesNeeded = []
 
         if not self.type():
             # we just ignore file information for nonnormal troves
-            allIds = self.idMap.keys() + themMap.keys()
-            for pathId in allIds:
-                inSelf = self.idMap.has_key(pathId)
-                inThem = themMap.has_key(pathId)
-                if inSelf and inThem:
-                    sameIds[pathId] = None
-                elif inSelf:
-                    addedIds.append(pathId)
-                else:
-                    removedIds.append(pathId)
+            addedIds, removedIds, changedIds = \
+                                streams.diffFileMaps(self.idMap, themMap)
 
             for pathId in removedIds:
                 chgSet.oldFile(pathId)
@@ -2436,7 +2441,7 @@ class Trove(streams.StreamSet):
                 chgSet.newFile(pathId, os.path.join(selfDir, selfBase),
                                selfFileId, selfVersion)
 
-            for pathId in sameIds.keys():
+            for pathId in changedIds:
                 (selfDir, selfBase, selfFileId,
                                     selfVersion) = self.idMap[pathId]
                 (themDir, themBase, themFileId,
@@ -3466,6 +3471,55 @@ class ReferencedFileList(list, streams.InfoStream):
         if data is not None:
             self.thaw(data)
 
+def preverifyDigitalSignatures(troveInfoList, keyCache = None,
+                               warn = False):
+    """
+    Verifies the digital signatures in a list of C{(troveInfo, label)}
+    tuples all at once, so that the L{Trove.verifyDigitalSignatures}
+    calls which follow find them in the verified signature cache.  Missing
+    keys and bad signatures are left for those calls to report.
+
+    @param troveInfoList: trove info to verify, and the label to look
+    keys up on
+    @type troveInfoList: list of (TroveInfo, versions.Label) tuples
+    @param keyCache: cache of keys to verify trove signatures against
+    @type keyCache: openpgpkey.OpenPGPKeyCache
+    @param warn: warn about keys which cannot be retrieved
+    @type warn: bool
+    """
+    if keyCache is None:
+        keyCache = openpgpkey.getKeyCache()
+    # metadata signatures are always verified against the global cache
+    metaKeyCache = openpgpkey.getKeyCache()
+
+    def getKey(keyCache, keyId, label, warn):
+        try:
+            return keyCache.getPublicKey(keyId, label, warn = warn)
+        except KeyNotFound:
+            return None
+
+    checks = []
+    metaChecks = []
+    for troveInfo, label in troveInfoList:
+        for version, digest, signature in troveInfo.sigs:
+            if not signature:
+                continue
+            key = getKey(keyCache, signature[0], label, warn)
+            if key is not None:
+                checks.append((key, digest(), signature))
+
+        for item in troveInfo.metadata:
+            for signatures in itertools.chain(item.oldSignatures,
+                                              item.signatures):
+                for signature in signatures.signatures:
+                    key = getKey(metaKeyCache, signature[0], label, False)
+                    if key is not None:
+                        metaChecks.append((key, signatures.digest(),
+                                           signature))
+
+    keyCache.verifyStrings(checks)
+    metaKeyCache.verifyStrings(metaChecks)
+
 _STREAM_TCS_NAME                    =  0
 _STREAM_TCS_OLD_VERSION             =  1
 _STREAM_TCS_NEW_VERSION             =  2
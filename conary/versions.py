@@ -30,6 +30,12 @@ from conary.lib import log, api
 
 staticLabelTable = {}
 
+def _intern(s):
+    # intern() only accepts plain strings
+    if type(s) is str:
+        return intern(s)
+    return s
+
 class AbstractRevision(object):
 
     """
@@ -428,6 +434,8 @@ class Revision(AbstractRevision):
         if self.sourceCount is None:
             raise ParseError("bad release string: %s" % value)
 
+        self.version = _intern(self.version)
+
 class Label(AbstractLabel):
 
     """
@@ -442,6 +450,14 @@ class Label(AbstractLabel):
     def __setstate__(self, val):
         (self.host, self.namespace, self.branch) = val
 
+    def __copy__(self):
+        # labels are immutable, so copies (including the ones made by
+        # VersionSequence.copy()) can share them
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
     @api.publicApi
     def asString(self, versus = None, frozen = False):
         """
@@ -540,6 +556,10 @@ class Label(AbstractLabel):
         if not self.branch:
             raise ParseError("branch tag may not be empty")
 
+        self.host = _intern(self.host)
+        self.namespace = _intern(self.namespace)
+        self.branch = _intern(self.branch)
+
 class StaticLabel(Label):
 
     def __init__(self):
@@ -1486,14 +1506,21 @@ def _VersionFromString(ver, defaultBranch = None, frozen = False,
 
     for part in parts:
         if expectLabel:
-            lastBranch = Label(part, template = lastBranch)
+            # fully qualified labels can be found in the intern table
+            # without parsing them; abbreviated ones never match a key
+            label = labelInternTable.get(part, None)
+            if label is None:
+                label = Label(part, template = lastBranch)
 
-            staticLabelClass = staticLabelTable.get(lastBranch.asString(),
-                                                    None)
-            if staticLabelClass is not None:
-                vList.append(staticLabelClass())
-            else:
-                vList.append(lastBranch)
+                staticLabelClass = staticLabelTable.get(label.asString(),
+                                                        None)
+                if staticLabelClass is not None:
+                    label = staticLabelClass()
+
+                label = internLabel(label)
+
+            lastBranch = label
+            vList.append(label)
             expectLabel = False
 
             if justShadowed:
@@ -1554,5 +1581,26 @@ def strToFrozen(verStr, timeStamps):
     assert(ts == len(timeStamps))
     return "/".join(spl)
 
+def internLabel(label):
+    """
+    Returns the shared instance of a label equal to the one passed in,
+    adding the label to the intern table if there isn't one yet. Labels are
+    immutable, so versions parsed from strings all share their labels
+    through this table.
+
+    @param label: label to intern
+    @type label: Label
+    @rtype: Label
+    """
+    key = label.asString()
+    shared = labelInternTable.get(key, None)
+    if shared is None:
+        labelInternTable[key] = label
+        return label
+
+    return shared
+
+# these are all weak so they never hold on to objects nobody else is using
 thawedVersionCache = weakref.WeakValueDictionary()
 stringVersionCache = weakref.WeakValueDictionary()
+labelInternTable = weakref.WeakValueDictionary()
@@ -0,0 +1,72 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from conary_test import rephelp
+
+from conary.conaryclient import cachewarm
+
+
+class CacheWarmTest(rephelp.RepositoryHelper):
+
+    def _addGroups(self):
+        for v in ('1', '2'):
+            self.addComponent('foo:runtime', v)
+            self.addCollection('foo', v, [':runtime'])
+        self.addComponent('bar:runtime', '2', filePrimer = 1)
+        self.addCollection('bar', '2', [':runtime'])
+        old = self.addCollection('group-dist', '1', [ 'foo' ])
+        new = self.addCollection('group-dist', '2', [ 'foo', 'bar' ])
+        return old.getNameVersionFlavor(), new.getNameVersionFlavor()
+
+    def testGetWarmJobs(self):
+        old, new = self._addGroups()
+        repos = self.openRepository()
+        jobs = cachewarm.getWarmJobs(repos, new, [ old ])
+        v1 = '/localhost@rpl:linux/1-1-1'
+        v2 = '/localhost@rpl:linux/2-1-1'
+        self.assertEqual(sorted(cachewarm._jobString(x) for x in jobs), [
+            'bar:runtime=%s[]' % v2,
+            'bar=%s[]' % v2,
+            'foo:runtime=%s[]--%s[]' % (v1, v2),
+            'foo:runtime=%s[]' % v2,
+            'foo=%s[]--%s[]' % (v1, v2),
+            'foo=%s[]' % v2,
+            'group-dist=%s[]--%s[]' % (v1, v2),
+            'group-dist=%s[]' % v2 ])
+
+        # without groups to update from only absolute jobs are needed
+        jobs = cachewarm.getWarmJobs(repos, new)
+        self.assertEqual(len(jobs), 5)
+        self.assertEqual([ x[3] for x in jobs ], [ True ] * 5)
+
+    def testWarmCache(self):
+        old, new = self._addGroups()
+        repos = self.openRepository()
+        jobs = cachewarm.getWarmJobs(repos, new, [ old ])
+        report = cachewarm.warmCache(self.cfg, jobs, threads = 2,
+                                     batchSize = 3)
+        self.assertEqual(report.getCoverage(), 1.0)
+        self.assertEqual(set(report.cached), set(jobs))
+        self.assertEqual(report.failed, [])
+
+        missing = ('group-missing', ) + new[1:]
+        report = cachewarm.warmCache(self.cfg,
+                    [ (missing[0], (None, None), missing[1:], True) ] + jobs,
+                    batchSize = 1)
+        self.assertEqual(len(report.failed), 1)
+        self.assertEqual(report.failed[0][0][0], 'group-missing')
+        self.assertEqual(report.getCoverage(), len(jobs) / (len(jobs) + 1.0))
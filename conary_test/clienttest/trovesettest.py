@@ -0,0 +1,81 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from testrunner import testhelp
+
+from conary.conaryclient import troveset
+from conary.errors import TroveSpecsNotFound
+
+
+class SearchAction(troveset.ParallelAction):
+
+    # stands in for FindAction
+
+    def __init__(self, primaryTroveSet, name):
+        troveset.ParallelAction.__init__(self, primaryTroveSet)
+        self.name = name
+
+    def searchAction(self, actionList, data):
+        for action in actionList:
+            if action.name in data.missing:
+                raise TroveSpecsNotFound([ action.name ])
+            action.outSet._setInstall(
+                        set([ (action.name, 'version', 'flavor') ]))
+
+        return True
+
+    __call__ = searchAction
+
+
+class ActionData(troveset.ActionData):
+
+    def __init__(self, missing = ()):
+        troveset.ActionData.__init__(self, None, None)
+        self.missing = missing
+
+
+class OperationGraphTest(testhelp.TestCase):
+
+    def _buildGraph(self):
+        g = troveset.OperationGraph()
+        first = troveset.StaticTroveTupleSet(graph = g)
+        second = troveset.StaticTroveTupleSet(graph = g)
+        foo = first._action('foo', ActionClass = SearchAction)
+        bar = first._action('bar', ActionClass = SearchAction)
+        baz = second._action('baz', ActionClass = SearchAction)
+        union = foo._action(bar, baz, ActionClass = troveset.UnionAction)
+        return g, union
+
+    def testRealizeTimer(self):
+        g, union = self._buildGraph()
+        timed = []
+        g.realize(ActionData(),
+                  timer = lambda nodes, elapsed: timed.append(len(nodes)))
+        self.assertEqual(sorted(x[0] for x in union._getInstallSet()),
+                         [ 'bar', 'baz', 'foo' ])
+        # the searches run as one batch, the union on its own
+        self.assertEqual(sorted(timed), [ 1, 3 ])
+
+    def testRealizeError(self):
+        g, union = self._buildGraph()
+        try:
+            g.realize(ActionData(missing = [ 'baz' ]))
+        except TroveSpecsNotFound, e:
+            self.assertEqual(e.specList, [ 'baz' ])
+        else:
+            self.fail('expected TroveSpecsNotFound')
+        self.assertFalse(union.realized)
@@ -1094,6 +1094,12 @@ class CmdLineTest(rephelp.RepositoryHelper):
                                     {'foo1' : 'baz', 'foo2' : 'bar2'},
                                'cleanAfterCook' : True})
 
+        self.checkCvc(
+                  'cook foo bar --jobs 3',
+                  'conary.build.cook.cookCommand',
+                  [None, ['foo', 'bar'], False, None],
+                  ignoreKeywords=True, jobs=3)
+
 
         #self.checkCvc(
         #          'cook test.recipe --resume 10 --cross x86_64 --flavor "[ipv6,ssl is: x86_64]"',
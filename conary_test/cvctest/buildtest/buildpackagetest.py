@@ -18,6 +18,10 @@
 import os
 from conary_test import rephelp
 
+from conary import files
+from conary.build import buildpackage
+from conary.lib import elf, sha1helper
+
 
 class BuildPackageTest(rephelp.RepositoryHelper):
     def _inodeCheck(self, path1, path2, same=True):
@@ -42,3 +46,82 @@ class HardlinkGroup(PackageRecipe):
         for p in built:
             self.updatePkg(self.workDir, p[0], p[1])
         assert(self._inodeCheck('/asdf/blah', '/asdf/bar', same=True))
+
+    def _component(self):
+        class Recipe(object):
+            # abstract base classes are not flavored
+            abstractBaseClass = True
+        return buildpackage.BuildComponent('test:runtime', Recipe())
+
+    def testContentsHasher(self):
+        paths = []
+        for i in range(3):
+            path = '%s/file%d' % (self.workDir, i)
+            self.writeFile(path, 'contents %d\n' % i)
+            paths.append(path)
+        unreadable = self.workDir + '/unreadable'
+        self.writeFile(unreadable, 'unreadable\n')
+        os.chmod(unreadable, 0200)
+        changed = self.workDir + '/changed'
+        self.writeFile(changed, 'contents\n')
+        link = self.workDir + '/link'
+        os.symlink('file0', link)
+        allPaths = paths + [ unreadable, changed, link ]
+
+        passed = {}
+        origFileFromFilesystem = files.FileFromFilesystem
+        def FileFromFilesystem(path, *args, **kwargs):
+            passed[path] = kwargs.get('sha1')
+            return origFileFromFilesystem(path, *args, **kwargs)
+        self.mock(files, 'FileFromFilesystem', FileFromFilesystem)
+
+        hasher = buildpackage.ContentsHasher(allPaths, threads=2)
+        # the threads exit once every file has been hashed
+        for t in hasher._threads:
+            t.join()
+        try:
+            self.writeFile(changed, 'changed contents\n')
+            os.utime(changed, (0, 0))
+            comp = self._component()
+            for path in allPaths:
+                comp.addFile(path[len(self.workDir):], path, hasher=hasher)
+        finally:
+            hasher.stop()
+        self.assertEqual(hasher.hits, 3)
+        passed = dict((os.path.basename(x), y and sha1helper.sha1ToString(y))
+                      for x, y in passed.iteritems())
+        self.assertEqual(passed,
+                { 'file0' : 'fe11464a5e94b149eb9872ce6b84a25ce953ad5a',
+                  'file1' : 'ee8c8b71d59878201628cd77c1512521ffac4a26',
+                  'file2' : 'ecfdb99723523c41c1095cdc2809a6e4e4e6eec3',
+                  'unreadable' : None,
+                  'changed' : None,
+                  'link' : None })
+        self.assertEqual(comp['/changed'][1].contents.sha1(),
+                         sha1helper.sha1String('changed contents\n'))
+
+    def testContentsHasherPrelinked(self):
+        path = self.workDir + '/prog'
+        self.writeFile(path, 'prelinked program\n')
+        os.chmod(path, 0755)
+        # a stand-in for prelink -y, which prints the unprelinked file
+        prelink = self.workDir + '/prelink'
+        self.writeFile(prelink, '#!/bin/sh\necho undone\n')
+        os.chmod(prelink, 0755)
+        self.mock(files, 'PRELINK_CMD', (prelink,))
+        self.mock(elf, 'prelinked', lambda x: True)
+
+        hasher = buildpackage.ContentsHasher([ path ], threads=1)
+        for t in hasher._threads:
+            t.join()
+        try:
+            comp = self._component()
+            f = comp.addFile('/prog', path, hasher=hasher)
+        finally:
+            hasher.stop()
+        # the digest of the file as written is not used for prelinked
+        # files
+        self.assertEqual(hasher.hits, 1)
+        self.assertEqual(sha1helper.sha1ToString(f.contents.sha1()),
+                         '928bffa1d09637bae24f681f5171c2cd26d9490a')
+        self.assertEqual(f.contents.size(), 7)
@@ -1446,6 +1446,115 @@ class TestClass(CPackageRecipe):
                                 changeSetFile='%s/tmp.ccs' % self.workDir)
         assert(built[0][1] == '/localhost@rpl:linux//local@local:COOK/1-1-0.1')
 
+    def testCookCache(self):
+        repos = self.openRepository()
+        trv = self.addComponent('simple:source', '1-1', '',
+                                [('simple.recipe', recipes.simpleRecipe)])
+        self.cfg.cookCacheDir = self.workDir + '/cook-cache'
+        def _cook():
+            loader, sourceVersion = loadrecipe.recipeLoaderFromSourceComponent(
+                                    'simple:source', self.cfg, repos,
+                                    versionStr=str(trv.getVersion()),
+                                    labelPath = self.cfg.buildLabel)
+            return self.discardOutput(cook.cookObject,
+                                      repos, self.cfg, [ loader ],
+                                      sourceVersion = sourceVersion,
+                                      prep = False)
+        try:
+            built = _cook()
+            self.assertEqual(built[0][1], '/localhost@rpl:linux/1-1-1')
+            self.assertEqual(len(os.listdir(self.cfg.cookCacheDir)), 1)
+
+            # the second cook has the same inputs, so it does not build
+            # anything; the cached troves are moved to the next version
+            def _fail(*args, **kwargs):
+                self.fail('package was built again')
+            self.mock(cook, '_createPackageChangeSet', _fail)
+            built = _cook()
+            self.assertEqual(built[0][1], '/localhost@rpl:linux/1-1-2')
+        finally:
+            self.cfg.cookCacheDir = None
+
+        first = self.findAndGetTrove('simple:runtime=1-1-1')
+        second = self.findAndGetTrove('simple:runtime=1-1-2')
+        self.assertEqual(
+            sorted((x[1], x[2]) for x in first.iterFileList()),
+            sorted((x[1], x[2]) for x in second.iterFileList()))
+        pkg = self.findAndGetTrove('simple=1-1-2')
+        self.assertEqual([ x[1] for x in pkg.iterTroveList(strongRefs=True) ],
+                         [ second.getVersion() ])
+
+    def testCookJobDependencies(self):
+        info = [ ('foo', [ 'bar:devel', 'foo:runtime', 'gcc:devel' ]),
+                 ('bar', [ 'glibc:devel=:1[is: x86]' ]),
+                 None,
+                 ('bar', [ 'baz:lib' ]),
+                 ('baz', []) ]
+        after = cook._getCookJobDependencies(info)
+        self.assertEqual(after, [ set([1, 3]), set(), set(), set([4]),
+                                  set() ])
+
+    def testCookParallel(self):
+        self.addComponent('simple:source', '1-1', '',
+                          [('simple.recipe', recipes.simpleRecipe)])
+        self.addComponent('double:source', '1.0-1', '',
+                          [('double.recipe', recipes.doubleRecipe1)])
+        # simple is rebuilt over an existing build, which the jobs would
+        # otherwise write relative changesets against
+        self.cookFromRepository('simple')
+        self.discardOutput(cook.cookCommand, self.cfg, ['simple', 'double'],
+                           False, {}, jobs=2)
+        self.findAndGetTrove('simple:runtime=1-1-2')
+        self.findAndGetTrove('double:runtime=1.0-1-1')
+
+    def testCookParallelFailure(self):
+        brokenRecipe = """
+class BrokenRecipe(PackageRecipe):
+    name = 'broken'
+    version = '1'
+    clearBuildReqs()
+    def setup(r):
+        r.Run('exit 1')
+"""
+        self.addComponent('simple:source', '1-1', '',
+                          [('simple.recipe', recipes.simpleRecipe)])
+        self.addComponent('broken:source', '1-1', '',
+                          [('broken.recipe', brokenRecipe)])
+        # the item which cooked is committed even though the other failed
+        self.assertRaises(SystemExit, self.discardOutput, cook.cookCommand,
+                          self.cfg, ['broken', 'simple'], False, {}, jobs=2)
+        self.findAndGetTrove('simple:runtime=1-1-1')
+        repos = self.openRepository()
+        self.assertEqual(repos.findTroves(self.cfg.buildLabel,
+                            [ ('broken:runtime', None, None) ],
+                            allowMissing=True), {})
+
+    def testCookParallelLocalFlavors(self):
+        self.openRepository()
+        origDir = os.getcwd()
+        os.chdir(self.workDir)
+        try:
+            self.writeFile('simple.recipe', """
+class SimpleRecipe(PackageRecipe):
+    name = 'simple'
+    version = '1'
+    clearBuildReqs()
+    def setup(r):
+        if Use.ssl:
+            r.Create('/ssl')
+        r.Create('/foo', contents='simple')
+""")
+            # both flavors are written to simple-1.ccs; they are cooked
+            # one after the other, so the last one wins
+            self.discardOutput(cook.cookCommand, self.cfg,
+                               ['simple.recipe[ssl]', 'simple.recipe[!ssl]'],
+                               False, {}, jobs=2)
+            cs = changeset.ChangeSetFromFile('simple-1.ccs')
+            flavors = set(x[2] for x in cs.getPrimaryTroveList())
+            self.assertEqual(flavors, set([ deps.parseFlavor('~!ssl') ]))
+        finally:
+            os.chdir(origDir)
+
     def testCookShowBuildreqs(self):
         repos = self.openRepository()
         origDir = os.getcwd()
@@ -19,7 +19,9 @@ import os
 import shutil
 import tempfile
 
-from conary.build import loadrecipe, use
+from conary import callbacks, files, trove, versions
+from conary.build import grouprecipe, loadrecipe, use
+from conary.deps import deps
 
 
 
@@ -78,3 +80,58 @@ class GroupRecipeTest(rephelp.RepositoryHelper):
             recipeObj.groups['group-test2'].checkPathConflicts)
         self.assertEqual(True,
             recipeObj.groups['group-test3'].checkPathConflicts)
+
+    def testHashConflicts(self):
+        # only paths whose hashes collide are looked at, and only troves
+        # with colliding hashes have their file lists fetched
+        v = versions.ThawVersion('/localhost@rpl:linux/1.0:1-1-1')
+        flv = deps.parseFlavor('')
+        def makeFile(perms):
+            fileObj = files.RegularFile(None)
+            fileObj.inode.perms.set(perms)
+            fileObj.inode.mtime.set(0)
+            fileObj.inode.owner.set('root')
+            fileObj.inode.group.set('root')
+            fileObj.contents.size.set(0)
+            fileObj.contents.sha1.set('\0' * 20)
+            return fileObj
+
+        fileObjs = {}
+        troves = {}
+        for name, fileList in (
+                ('foo:runtime', [ ('/a', 'A1', 0644), ('/b', 'B', 0644),
+                                  ('/c', 'C', 0644) ]),
+                ('bar:runtime', [ ('/a', 'A2', 0755), ('/b', 'B', 0644),
+                                  ('/d', 'D', 0644) ]),
+                ('baz:runtime', [ ('/e', 'E', 0644) ])):
+            trv = trove.Trove(name, v, flv)
+            for path, fileId, perms in fileList:
+                fileId = fileId.ljust(20, '\0')
+                trv.addFile(path.ljust(16, '\0'), path, v, fileId)
+                fileObjs[fileId] = makeFile(perms)
+            trv.computePathHashes()
+            troves[trv.getNameVersionFlavor()] = trv
+
+        fetched = []
+        class TroveSource:
+            def getFileVersions(self, l):
+                return [ fileObjs[x[1]] for x in l ]
+        class TroveCache:
+            troveSource = TroveSource()
+            def getPathHashesForTroveList(self, l):
+                return [ troves[x].getPathHashes() for x in l ]
+            def getTroves(self, l, withFiles = False):
+                fetched.extend(l)
+                return [ troves[x] for x in l ]
+        class Group:
+            def iterTroveListInfo(self):
+                for troveTup in sorted(troves):
+                    yield troveTup, True, True, None, None
+
+        conflicts = grouprecipe._getHashConflicts(Group(), TroveCache(),
+                                                  callbacks.CookCallback())
+        foo = ('foo:runtime', v, flv)
+        bar = ('bar:runtime', v, flv)
+        self.assertEqual([ (set(x), y) for x, y in conflicts ],
+                         [ (set([ foo, bar ]), [ '/a' ]) ])
+        self.assertEqual(sorted(fetched), [ bar, foo ])
@@ -872,6 +872,49 @@ Not using:
         assert(loadedTroves[0] == ('test1:source', v1, x64dep))
         assert(loadedTroves[1] == ('test2:source', v1, emptydep))
 
+    def testRecipeCache(self):
+        cache = loadrecipe.RecipeCache()
+        codeString = 'def f():\n    return 1\n'
+        code = cache.compile(codeString, '/a/foo.recipe')
+        self.assertEqual(code.co_filename, '/a/foo.recipe')
+        # the same text under another name reuses the compiled code, with
+        # the new name
+        code2 = cache.compile(codeString, '/b/foo.recipe')
+        self.assertEqual(code2.co_filename, '/b/foo.recipe')
+        self.assertEqual(code2.co_consts[0].co_filename, '/b/foo.recipe')
+        self.assertEqual(code2.co_code, code.co_code)
+        self.assertEqual(len(cache.code), 1)
+        self.assertRaises(SyntaxError, cache.compile, 'def', '/a/bad.recipe')
+
+        cacheDir = self.workDir + '/recipecache'
+        cache.compile(codeString, '/a/foo.recipe', cacheDir = cacheDir)
+        cache = loadrecipe.RecipeCache()
+        d = {}
+        exec cache.compile(codeString, '/c/foo.recipe',
+                           cacheDir = cacheDir) in d
+        self.assertEqual(d['f'](), 1)
+        self.assertEqual(d['f'].func_code.co_filename, '/c/foo.recipe')
+
+        # superclasses and their recipe files are fetched once
+        repos = self.openRepository()
+        self.addComponent('simplesuper:source', '1.0',
+                                [('simplesuper.recipe', simpleSuperRecipe)])
+        loadrecipe._recipeCache.clear()
+        calls = []
+        def counted(method):
+            def f(*args, **kw):
+                calls.append(method.__name__)
+                return method(*args, **kw)
+            return f
+        self.mock(repos, 'getFileContents', counted(repos.getFileContents))
+        self.mock(repos, 'getTrove', counted(repos.getTrove))
+        for i in range(2):
+            loader = loadrecipe.RecipeLoaderFromRepository('simplesuper',
+                                                           self.cfg, repos)
+            self.assertEqual(loader.getRecipe().name, 'simplesuper')
+        self.unmock()
+        self.assertEqual(sorted(calls), [ 'getFileContents', 'getTrove' ])
+
 # test case ends -------------------------------
 
 recipe1 = """
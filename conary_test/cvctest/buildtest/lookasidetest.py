@@ -642,6 +642,52 @@ class ArchiveTest(PackageRecipe):
         url5 = lookaside.laUrl('lookaside://lp:lightdm/lp:lightdm--466.tar.bz2')
         self.assertEqual(url5.host, 'lp:lightdm')
 
+    def testPrefetch(self):
+        self.resetCache()
+        try:
+            contentServer = rephelp.HTTPServerController(getRequester())
+            contentURL = contentServer.url()
+            repCache = lookaside.RepositoryCache(None, cfg=self.cfg)
+            ff = lookaside.FileFinder('test', repCache, cfg=self.cfg)
+            requests = [ ('%s/%d' % (contentURL, x), None, {},
+                          ff.SEARCH_ALL) for x in range(6) ]
+            requests.append(('%s/404' % contentURL, None, {},
+                             ff.SEARCH_ALL))
+            # duplicate requests are only fetched once
+            requests.append(requests[0])
+            # messages are logged in request order
+            self.logCheck(ff.prefetch, (requests,),
+                [ x for i in range(6) for x in
+                  ('+ Trying %s/%d...' % (contentURL, i),
+                   '+ Downloading %s/%d...' % (contentURL, i)) ] +
+                [ '+ Trying %s/404...' % contentURL ])
+            negativePath = os.path.join(self.cacheDir, 'NEGATIVE/test',
+                'localhost:%d' % contentServer.port, '404')
+            self.assertTrue(os.path.exists(negativePath))
+
+            # the lookups that follow are satisfied from the cache
+            for i in range(6):
+                inRepos, path = self.logCheck(ff.fetch,
+                    ('%s/%d' % (contentURL, i),), [])
+                self.assertEqual(open(path).read(), '/%d:1\n' % i)
+            self.logCheck(ff.fetch, ('%s/404' % contentURL,), [],
+                          kwargs = dict(allowNone = True))
+
+            # files matching the refresh filter are downloaded again,
+            # once
+            refreshFilter = lambda x: x == '1'
+            ff = lookaside.FileFinder('test', repCache, cfg=self.cfg)
+            self.logCheck(ff.prefetch, (requests[:2],),
+                [ '+ Trying %s/1...' % contentURL,
+                  '+ Downloading %s/1...' % contentURL ],
+                kwargs = dict(refreshFilter = refreshFilter))
+            inRepos, path = self.logCheck(ff.fetch,
+                ('%s/1' % contentURL,), [],
+                kwargs = dict(refreshFilter = refreshFilter))
+            self.assertEqual(open(path).read(), '/1:2\n')
+        finally:
+            contentServer.kill()
+
 
 def getRequester():
     accessed = {}
@@ -3756,6 +3756,48 @@ class TestRequires(PackageRecipe):
             self.assertFalse('perl: CGI::Apache' not in req)
             self.assertFalse('perl: DFSJFSD::FDSJFK' in req)
 
+    def testRequiresPerlBatched(self):
+        """
+        Test Perl requirements found by several perlreqs.pl processes
+        """
+        recipestr = r"""
+class TestRequires(PackageRecipe):
+    name = 'foo'
+    version = '1'
+    clearBuildReqs()
+    def setup(r):
+        r.Create('VENDOR_PERL/CGI/Apache.pl', contents='\n'.join((
+            '#!/usr/bin/perl',
+            '',
+            'package CGI::Apache;',
+            '',
+        )), mode=0755)
+        for name in ('a', 'b', 'c'):
+            r.Create('%(bindir)s/' + name, contents='\n'.join((
+                '#!/usr/bin/perl',
+                '',
+                'use CGI::Apache;',
+                '',
+            )), mode=0755)
+        r.Create('%(bindir)s/d', contents='\n'.join((
+            '#!/usr/bin/perl',
+            '',
+            'print "no modules";',
+            '',
+        )), mode=0755)
+""".replace('VENDOR_PERL', _findVendorPerl())
+        self.mock(packagepolicy, '_getWorkerCount', lambda: 2)
+        repos = self.openRepository()
+        trv = self.build(recipestr, "TestRequires")
+        for pathId, path, fileId, version, fileObj in repos.iterFilesInTrove(
+            trv.getName(), trv.getVersion(), trv.getFlavor(),
+            withFiles=True):
+            req = str(fileObj.requires())
+            if path in ('/usr/bin/a', '/usr/bin/b', '/usr/bin/c'):
+                self.assertIn('perl: CGI::Apache', req)
+            elif path == '/usr/bin/d':
+                self.assertNotIn('perl: CGI::Apache', req)
+
     def testRequiresPerlWithPerl(self):
         """
         Test Perl requirements when perl is packaged
@@ -16,6 +16,7 @@
 
 
 import os
+import stat
 import tempfile
 import shutil
 
@@ -93,3 +94,34 @@ class PolicyTest(rephelp.RepositoryHelper):
         assert(p2.invariantsubtrees == [ '/blah' ])
         p2.doProcess(r)
         assert(sorted(p2.traversed) == ['/foo-1/file-1', '/foo-2/file-2'])
+
+    def testTreeSnapshot(self):
+        SubtreeGlobPolicy.invariantsubtrees = [ '/blah' ]
+        r = DummyRecipe(self.cfg)
+        r.treeSnapshot = policy.TreeSnapshot()
+        destdir = r.macros.destdir
+        os.makedirs(destdir + '/blah/dir')
+        open(destdir + '/blah/file', 'w').close()
+        os.symlink('file', destdir + '/blah/link')
+
+        p = SubtreeGlobPolicy(r, exceptions=[('.*', stat.S_IFDIR)])
+        p.doProcess(r)
+        self.assertEqual(sorted(p.traversed), ['/blah/file', '/blah/link'])
+        self.assertEqual(r.treeSnapshot.fileType(destdir + '/blah/dir'),
+                         stat.S_IFDIR)
+        self.assertEqual(r.treeSnapshot.fileType(destdir + '/blah/link'),
+                         stat.S_IFLNK)
+        self.assertEqual(r.treeSnapshot.fileType(destdir + '/blah/none'),
+                         None)
+
+        # changes are seen once the snapshot has been revalidated
+        os.unlink(destdir + '/blah/link')
+        os.mkdir(destdir + '/blah/link')
+        open(destdir + '/blah/dir/file2', 'w').close()
+        r.treeSnapshot.revalidate()
+        p = SubtreeGlobPolicy(r, exceptions=[('.*', stat.S_IFDIR)])
+        p.doProcess(r)
+        self.assertEqual(sorted(p.traversed),
+                         ['/blah/dir/file2', '/blah/file'])
+        self.assertEqual(r.treeSnapshot.listDir(destdir + '/blah/none'),
+                         None)
@@ -31,7 +31,7 @@ from conary.conaryclient import clone
 from conary import conarycfg, conaryclient, errors, trove, versions
 from conary.deps import deps
 from conary.lib import util
-from conary.repository import filecontainer
+from conary.repository import changeset, filecontainer
 from conary.versions import VersionFromString as VFS
 from conary.versions import Label
 
@@ -1131,6 +1131,94 @@ The following clones will be created:
                        ('foo:run', '/localhost@rpl:1'),
                        ('foo:source', '/localhost@rpl:1')]))
 
+    def testCloneStageTimer(self):
+        self.addComponent('foo:source', '1')
+        self.addComponent('foo:run', '1')
+        self.addCollection('foo', '1', [':run'])
+        client = conaryclient.ConaryClient(self.cfg)
+        troveTup = client.getRepos().findTrove(self.cfg.installLabelPath,
+                                               ('foo', None, None))[0]
+
+        stages = []
+        options = clone.CloneOptions(
+                    timer = lambda stage, elapsed: stages.append(stage))
+        chooser = clone.CloneChooser(
+                    { troveTup[1].branch() : VFS('/localhost@rpl:1') },
+                    [ troveTup ], options)
+        ok, cs = client.createCloneChangeSetWithOptions(chooser, options)
+        assert(ok)
+        self.assertEqual(stages, [ 'determine troves', 'existing leaves',
+                                   'target sources', 'target binaries',
+                                   'recheck preclones', 'check needs',
+                                   'rewrite troves', 'build changeset' ])
+        self.assertEqual(sorted(x.getName() for x in cs.iterNewTroveList()),
+                         [ 'foo', 'foo:run', 'foo:source' ])
+
+    def testTroveCacheBatches(self):
+        class Repos(object):
+            def __init__(self, failOn = None, requests = None):
+                if requests is None:
+                    requests = []
+                self.requests = requests
+                self.failOn = failOn
+
+            def createChangeSet(self, jobList, **kw):
+                names = [ x[0] for x in jobList ]
+                self.requests.append(names)
+                if self.failOn in names:
+                    raise errors.RepositoryError('failed %s' % self.failOn)
+                cs = changeset.ChangeSet()
+                for name, oldInfo, newInfo, absolute in jobList:
+                    trv = trove.Trove(name, newInfo[0], newInfo[1])
+                    cs.newTrove(trv.diff(None, absolute = True)[0])
+                return cs
+
+        v = versions.ThawVersion('/localhost@rpl:linux/1.0:1-1-1')
+        flavor = deps.parseFlavor('')
+        troveTups = [ ('foo%d:run' % i, v, flavor) for i in range(10) ]
+
+        # every fetch thread gets a client of its own
+        repos = Repos()
+        workerRepos = []
+        def reposFactory():
+            workerRepos.append(Repos(requests = repos.requests))
+            return workerRepos[-1]
+
+        troveCache = clone.TroveCache(repos, None, threads = 3,
+                                      batchSize = 4,
+                                      reposFactory = reposFactory)
+        troves = troveCache.getTroves(troveTups)
+        self.assertEqual([ x.getNameVersionFlavor() for x in troves ],
+                         troveTups)
+        self.assertEqual(sorted(len(x) for x in repos.requests), [ 2, 4, 4 ])
+        self.assertTrue(1 <= len(workerRepos) <= 3)
+        self.assertEqual(len(set(id(x) for x in workerRepos)),
+                         len(workerRepos))
+
+        # troves already in the cache are not fetched again; a single
+        # batch is fetched through the main client
+        troveCache.getTroves(troveTups[8:] + [ ('bar:run', v, flavor) ])
+        self.assertEqual(repos.requests[-1], [ 'bar:run' ])
+        self.assertEqual(len(repos.requests), 4)
+
+        # without a factory the batches are fetched one at a time through
+        # the shared client
+        troveCache = clone.TroveCache(repos, None, threads = 3,
+                                      batchSize = 4)
+        troveCache.getTroves(troveTups)
+        self.assertEqual(len(repos.requests), 7)
+
+        failing = Repos(failOn = 'foo5:run')
+        troveCache = clone.TroveCache(failing, None,
+                                      threads = 3, batchSize = 4,
+                                      reposFactory = lambda: failing)
+        try:
+            troveCache.getTroves(troveTups)
+        except errors.RepositoryError, e:
+            self.assertEqual(str(e), 'failed foo5:run')
+        else:
+            self.fail('expected RepositoryError')
+
     @context('redirect', 'clone')
     def testPromoteRedirect(self):
         repos = self.openRepository()
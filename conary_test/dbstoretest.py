@@ -444,6 +444,22 @@ class DBStoreTest(DBStoreTestBase):
             ret.append((x, 2*x))
         assert(cu.execute("select val1, val2 from foo order by a").fetchall() == ret)
 
+    def testStatementReuse(self):
+        db = self.getDB()
+        cu = db.cursor()
+        cu.execute("create table foo (a %(PRIMARYKEY)s, val integer)" % db.keywords)
+        cu.executemany("insert into foo(val) values (?)", range(10))
+        for x in range(3):
+            cu.execute("select val from foo where val >= ? order by val", 8)
+            self.assertEqual(cu.fetchall(), [(8,), (9,)])
+        # statements kept from before the schema change still work
+        cu.execute("alter table foo add column other integer")
+        cu.execute("select val from foo where val >= ? order by val", 9)
+        self.assertEqual(cu.fetchall(), [(9,)])
+        cu.executemany("insert into foo(val) values (?)", [10, 11])
+        cu.execute("select count(*) from foo")
+        self.assertEqual(cu.fetchone()[0], 12)
+
     def testLastRowID(self):
         db = self.getDB()
         cu = db.cursor()
@@ -707,6 +723,27 @@ class DBStoreSchemaTest(DBStoreTestBase):
         cu.execute("select count(*) from bar")
         self.assertEqual(cu.fetchone()[0], 0)
         
+    def testBulkLoader(self):
+        db = self.getDB()
+        cu = db.cursor()
+        cu.execute("CREATE TABLE foo(id %(PRIMARYKEY)s, no INTEGER)" % db.keywords)
+        loader = db.bulkloader("foo", ["id", "no"], batchSize = 10)
+        for x in xrange(15):
+            loader.add(x, x + 100)
+        # a full batch is loaded as soon as it is gathered
+        self.assertEqual(len(loader), 5)
+        cu.execute("select count(*) from foo")
+        self.assertEqual(cu.fetchone()[0], 10)
+        loader.extend(itertools.izip(xrange(15, 25), xrange(115, 125)))
+        self.assertEqual(len(loader), 0)
+        loader.add(25, 125)
+        loader.flush()
+        self.assertEqual(len(loader), 0)
+        loader.flush()
+        cu.execute("select id, no from foo order by id")
+        self.assertEqual(cu.fetchall(),
+                         [ (x, x + 100) for x in xrange(26) ])
+
     def testExecuteArgs(self):
         db = self.getDB()
         cu = db.cursor()
@@ -53,6 +53,10 @@ from conary.deps.deps import (
         TroveDependencies,
         InstructionSetDependency,
         flavorDifferences,
+        getFlavorScoreCacheStats,
+        resetFlavorScoreCache,
+        scoreFlavorList,
+        scoreStrongFlavorList,
         )
 
 class DepsTest(unittest.TestCase):
@@ -690,6 +694,51 @@ class DepsTest(unittest.TestCase):
         _testDep('trove: foo(a)', 'trove: foo(a)', 3)
         _testDep('trove: foo(a) trove: bar(a)', 'trove: foo(a) trove: bar(a)', 6)
 
+    def testCompiledFlavorScores(self):
+        # the compiled scoring used by Flavor.score has to agree with
+        # the flag by flag scoring in DependencySet.score
+        flavors = [ parseFlavor(x) for x in (
+            '', 'use: is:', 'ssl', '~ssl', '!ssl', '~!ssl', 'ssl,~!krb',
+            '~ssl,!krb,~gtk', 'is: x86', 'is: x86(i686)',
+            'is: x86(~i686,!sse2)', 'is: x86(~!i686) x86_64',
+            'is: x86_64', 'is: x86(i486,i586,i686,sse,sse2) x86_64',
+            '~!bootstrap,ssl is: x86(i686)', 'ssl is: x86_64',
+            '!ssl is: x86(~cmov) target: x86_64',
+            ) ]
+        for system in flavors:
+            for required in flavors:
+                ref = DependencySet.score(system, required)
+                score = system.score(required)
+                self.assertEqual((score, type(score)), (ref, type(ref)))
+                self.assertEqual(system.stronglySatisfies(required),
+                    DependencySet.score(system.toStrongFlavor(),
+                                        required.toStrongFlavor())
+                            is not False)
+
+            self.assertEqual(scoreFlavorList(system, flavors),
+                [ DependencySet.score(system, x) for x in flavors ])
+            self.assertEqual(scoreStrongFlavorList(flavors, system),
+                [ DependencySet.score(x.toStrongFlavor(), system)
+                  for x in flavors ])
+
+    def testFlavorScoreCacheBounded(self):
+        try:
+            resetFlavorScoreCache(compileCacheSize = 5, scoreCacheSize = 10)
+            system = parseFlavor('ssl is: x86(i686)')
+            flavors = [ parseFlavor('~flag%d is: x86' % x)
+                        for x in range(20) ]
+            self.assertEqual(scoreFlavorList(system, flavors), [ 0 ] * 20)
+            stats = getFlavorScoreCacheStats()
+            self.assertEqual(stats['compiled'], 5)
+            self.assertEqual(stats['scores'], 10)
+            self.assertEqual(stats['scoreMisses'], 20)
+
+            # the most recent scores are still cached
+            scoreFlavorList(system, flavors[-10:])
+            self.assertEqual(getFlavorScoreCacheStats()['scoreMisses'], 20)
+        finally:
+            resetFlavorScoreCache()
+
 
 
     def testParseDependencies(self):
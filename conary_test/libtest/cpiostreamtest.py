@@ -110,6 +110,65 @@ class CpioStreamTest(testcase.TestCaseWithWorkDir):
         src.read(1)
         self.assertRaises(cpiostream.OutOfOrderRead, ent.payload.read)
 
+    def testIndex(self):
+        cpioPath = self._createCpio()
+        members = cpiostream.CpioStream(file(cpioPath)).index()
+        entries = [ (x.filename, x.header.filesize, x.payload.read())
+                    for x in cpiostream.CpioStream(file(cpioPath)) ]
+        self.assertEqual([ (x.filename, x.header.filesize) for x in members ],
+                         [ x[:2] for x in entries ])
+
+        f = file(cpioPath)
+        for member, (fileName, size, contents) in zip(members, entries):
+            f.seek(member.headerOffset)
+            self.assertEqual(f.read(6), cpiostream.CpioHeader.MAGIC)
+            f.seek(member.dataOffset)
+            self.assertEqual(f.read(size), contents)
+
+    def testRandomAccess(self):
+        cpioPath = self._createCpio()
+        contents = dict((x.filename, x.payload.read())
+                        for x in cpiostream.CpioStream(file(cpioPath)))
+
+        archive = cpiostream.RandomAccessCpio(file(cpioPath))
+        tarPm = archive.getEntry('./usr/lib/perl5/5.10.0/Archive/Tar.pm')
+        ptar = archive.getEntry('./usr/bin/ptar')
+        self.assertEqual(archive.getEntry('./missing'), None)
+        # reads of different entries can be interleaved
+        self.assertEqual(tarPm.payload.read(10),
+            contents['./usr/lib/perl5/5.10.0/Archive/Tar.pm'][:10])
+        self.assertEqual(ptar.payload.read(), contents['./usr/bin/ptar'])
+        self.assertEqual(tarPm.payload.read(),
+            contents['./usr/lib/perl5/5.10.0/Archive/Tar.pm'][10:])
+        self.assertEqual(dict((x.filename, x.payload.read()) for x in archive),
+                         contents)
+
+    def testCheckpointedPayload(self):
+        cpioPath = self._createCpio()
+        data = file(cpioPath).read()
+        ckptPath = os.path.join(self.workDir, 'archive.ckpt')
+        dest = file(ckptPath, "w+")
+        writer = cpiostream.CheckpointWriter(file(cpioPath), dest,
+                                             checkpointSize = 10000)
+        # the archive is indexed while the checkpointed copy is written
+        members = cpiostream.CpioStream(writer).index()
+        writer.close()
+        dest.close()
+
+        payload = cpiostream.CheckpointedPayload(file(ckptPath))
+        self.assertEqual(payload.size, len(data))
+        self.assertEqual(len(payload.offsets), len(data) / 10000 + 2)
+        self.assertEqual(payload.read(), data)
+        for offset in (0, 9999, 10000, 25000, len(data) - 5):
+            payload.seek(offset)
+            self.assertEqual(payload.read(20000), data[offset:offset + 20000])
+            self.assertEqual(payload.tell(), min(offset + 20000, len(data)))
+
+        archive = cpiostream.RandomAccessCpio(payload, members)
+        ent = archive.getEntry('./usr/lib/perl5/5.10.0/Archive/Tar.pm')
+        sha1sum = digestlib.sha1(ent.payload.read()).hexdigest()
+        self.assertEquals(sha1sum, 'cbe78d8a0d26a86436e4fc56f8581ffd3db4bd83')
+
     def _createCpio(self, rpmName = None):
         if rpmName is None:
             rpmName = 'perl-Archive-Tar-1.46-68.fc11.x86_64.rpm'
@@ -256,3 +256,49 @@ class MagicTest(rephelp.RepositoryHelper):
     def testXzFile(self):
         m = magic.magic(os.path.join(resources.get_archive(), 'foo.tar.xz'))
         self.assertEquals(m.name, 'xz')
+
+    def testMagicDiskCache(self):
+        cacheDir = os.path.join(self.workDir, 'magic-cache')
+        destDir = os.path.join(self.workDir, 'dest')
+        util.mkdirChain(destDir + '/bin')
+        util.copyfile(os.path.realpath(sys.executable),
+                      destDir + '/bin/python')
+        self.writeFile(destDir + '/bin/script', '#!/bin/sh -e\necho\n')
+        self.writeFile(destDir + '/bin/data', 'not magic\n')
+
+        cache = magic.MagicDiskCache(cacheDir, maxEntries = 1)
+        expected = {}
+        for path in ('/bin/python', '/bin/script', '/bin/data'):
+            m = cache.magic(path, destDir)
+            expected[path] = m and (m.name, m.contents)
+        self.assertEquals(expected['/bin/script'][0], 'script')
+        self.assertEquals(expected['/bin/python'][0], 'ELF')
+        self.assertEquals(expected['/bin/data'], None)
+        # files which cannot be cached are not hashed or looked up
+        self.assertEquals((cache.hits, cache.misses, cache.stored),
+                          (0, 2, 2))
+
+        # a new cache sees the stored results, for any path with the
+        # same contents
+        util.copyfile(destDir + '/bin/script', destDir + '/bin/script2')
+        cache = magic.MagicDiskCache(cacheDir, maxEntries = 1)
+        for path in ('/bin/python', '/bin/script', '/bin/data'):
+            m = cache.magic(path, destDir)
+            self.assertEquals(m and (m.name, m.contents), expected[path])
+        m = cache.magic('/bin/script2', destDir)
+        self.assertEquals(m.path, '/bin/script2')
+        self.assertEquals(m.__class__, magic.script)
+        self.assertEquals((cache.hits, cache.misses, cache.stored),
+                          (3, 0, 0))
+
+        # entries from an older analyzer are ignored
+        self.mock(magic, 'MAGIC_CACHE_VERSION', magic.MAGIC_CACHE_VERSION + 1)
+        cache = magic.MagicDiskCache(cacheDir, maxEntries = 1)
+        cache.magic('/bin/script', destDir)
+        self.assertEquals((cache.hits, cache.misses), (0, 1))
+
+        cache.prune()
+        self.assertEquals(cache.pruned, 1)
+        entries = [ x for x in os.listdir(cacheDir)
+                    if os.listdir(os.path.join(cacheDir, x)) ]
+        self.assertEquals(len(entries), 1)
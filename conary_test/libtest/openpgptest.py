@@ -1989,6 +1989,43 @@ class OpenPGPMessageTest(BaseTestHelper):
         finally:
             os.waitpid(pid, 0)
 
+    def testKeyringIndex(self):
+        keyring = os.path.join(self.workDir, "indexed-keyring")
+        indexPath = keyring + '.idx'
+        util.copyfile(self.getKeyring('pubringrev.gpg'), keyring)
+        msg = openpgpfile.PGP_Message(keyring, start = 0)
+        fingerprints = [ x.getKeyFingerprint() for x in msg.iterKeys() ]
+
+        # looking keys up in a keyring does not create an index file
+        for fpr in fingerprints:
+            for keyId in (fpr, fpr[-16:], fpr[-8:].lower()):
+                key = seekKeyById(keyId, keyring)
+                self.assertEqual(key.getKeyFingerprint(), fpr)
+        self.assertFalse(seekKeyById('NOTAVALIDFINGERPRINT', keyring))
+        self.assertFalse(os.path.exists(indexPath))
+
+        # adding keys does, for the new version of the keyring
+        newKey = openpgpfile.seekKeyById('F94E405E', self.getPublicFile())
+        openpgpfile.addKeys([ newKey ], keyring)
+        stamp = openpgpfile._getKeyringStamp(os.stat(keyring))
+        index = openpgpfile.KeyringIndex.load(keyring, stamp)
+        self.assertEqual(index.entries,
+                openpgpfile.KeyringIndex.build(keyring, stamp).entries)
+        key = seekKeyById('F94E405E', keyring)
+        self.assertEqual(key.getKeyFingerprint(),
+                         newKey.getKeyFingerprint())
+
+        # the index file is rebuilt when the keyring is changed by others
+        k = openpgpfile.seekKeyById('90B1E477', self.getPublicFile())
+        stream = open(keyring, "a")
+        k.writeAll(stream)
+        stream.close()
+        key = seekKeyById('90B1E477', keyring)
+        self.assertEqual(key.getKeyFingerprint(), k.getKeyFingerprint())
+        stamp = openpgpfile._getKeyringStamp(os.stat(keyring))
+        self.assertFalse(
+                openpgpfile.KeyringIndex.load(keyring, stamp) is None)
+
     def testExportKey(self):
         keyring = self.getKeyring('pubringrev.gpg')
         kId1 = 'A8E762BF91E3E6C5'
@@ -1142,6 +1142,34 @@ class UtilTest(testhelp.TestCase):
         self.assertTrue(v is missing)
 
 
+    def testLRUCache(self):
+        cache = util.LRUCache(3)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache['c'] = 3
+        self.assertEqual(cache.keys(), [ 'a', 'b', 'c' ])
+        # touching 'a' makes 'b' the oldest entry
+        self.assertEqual(cache['a'], 1)
+        cache['d'] = 4
+        self.assertEqual(cache.keys(), [ 'c', 'a', 'd' ])
+        self.assertFalse('b' in cache)
+        self.assertEqual(cache.get('b', 'missing'), 'missing')
+        self.assertRaises(KeyError, cache.__getitem__, 'b')
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        cache['c'] = 5
+        self.assertEqual(cache.keys(), [ 'a', 'd', 'c' ])
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.pop('a'), 1)
+        self.assertEqual(cache.pop('a', None), None)
+        del cache['d']
+        self.assertEqual(cache.keys(), [ 'c' ])
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.keys(), [])
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
     def testBz2File(self):
         fobj = file(os.path.join(resources.get_archive(),
                                  'distcc-2.9.tar.bz2'))
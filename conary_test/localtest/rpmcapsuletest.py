@@ -17,6 +17,12 @@
 
 from testrunner import testhelp
 
+import shutil
+import tempfile
+
+from conary import rpmhelper
+from conary.lib import util
+
 try:
     from conary.local import rpmcapsule as _rpmcapsule
     rpmcapsule = _rpmcapsule
@@ -43,3 +49,71 @@ class RpmCapsule(testhelp.TestCase):
         self.assertEqual(meth(OldFlags(), 'aaa'), True)
         self.assertEqual(meth(NewFlags(), 'managed'), True)
         self.assertEqual(meth(NewFlags(), 'unmanaged'), False)
+
+    def testCapsuleKeysFromTarget(self):
+        if rpmcapsule is None:
+            raise testhelp.SkipTestException('rpm not installed')
+
+        class Header(dict):
+            def unload(self):
+                return 'header for ' + self[rpmhelper.NAME]
+
+        headers = []
+        for name, epoch, digest in [ ('foo', None, '1' * 40),
+                                     ('bar', 0, None),
+                                     ('gpg-pubkey', None, None) ]:
+            hdr = Header({ rpmhelper.NAME : name, rpmhelper.EPOCH : epoch,
+                           rpmhelper.VERSION : '1.0',
+                           rpmhelper.RELEASE : '1',
+                           rpmhelper.ARCH : name != 'gpg-pubkey' and
+                                            'x86_64' or None })
+            if digest:
+                hdr[rpmhelper.SIG_SHA1] = digest
+            headers.append(hdr)
+
+        matches = []
+        class TransactionSet(object):
+            def __init__(self, root):
+                pass
+
+            def dbMatch(self, *args):
+                matches.append(args)
+                if args:
+                    return [ x for x in headers
+                             if x[rpmhelper.NAME] == args[1] ]
+                return headers
+        self.mock(rpmcapsule.rpm, 'TransactionSet', TransactionSet)
+
+        workDir = tempfile.mkdtemp()
+        try:
+            class Database(object):
+                root = workDir
+                dbpath = workDir + '/var/lib/conarydb/conarydb'
+            db = Database()
+            util.mkdirChain(workDir + '/var/lib/conarydb')
+            rpmdbPath = util.joinPaths(workDir, rpmcapsule.RPMDB_DIR)
+            util.mkdirChain(rpmdbPath)
+            file(rpmdbPath + '/Packages', 'w').write('1')
+            plugin = rpmcapsule.RpmCapsulePlugin(db)
+
+            scanned = plugin.getCapsuleKeysFromTarget()
+            self.assertEqual(matches, [ () ])
+            self.assertEqual(sorted(x[0].name for x in scanned),
+                             [ 'bar', 'foo' ])
+
+            # the rpm database has not changed, so it is not scanned again
+            cached = plugin.getCapsuleKeysFromTarget()
+            self.assertEqual(matches, [ () ])
+            self.assertEqual([ tuple(x) for x in sorted(cached) ],
+                             [ tuple(x) for x in sorted(scanned) ])
+            # headers are read when they are needed
+            key = [ x for x in cached if x[0].name == 'foo' ][0]
+            self.assertEqual(cached[key].unload(), 'header for foo')
+            self.assertEqual(matches, [ (), ('name', 'foo') ])
+
+            file(rpmdbPath + '/Packages', 'a').write('2')
+            del matches[:]
+            plugin.getCapsuleKeysFromTarget()
+            self.assertEqual(matches, [ () ])
+        finally:
+            shutil.rmtree(workDir)
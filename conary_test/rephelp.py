@@ -239,7 +239,7 @@ class RepositoryServer(base_server.BaseServer):
                  serverIdx=0, proxies=None, useSSL=False, forceSSL = False,
                  sslCert=None, sslKey=None, closed=False, commitAction = None,
                  deadlockRetry=None, excludeCapsuleContents=False,
-                 withCache=False):
+                 withCache=False, changesetStreaming=False):
         base_server.BaseServer.__init__(self)
         assert(isinstance(contents, ContentStore))
         assert(reposDB is None or isinstance(reposDB, sqlharness.RepositoryDatabase))
@@ -266,6 +266,7 @@ class RepositoryServer(base_server.BaseServer):
         self.useSSL = getattr(self, 'sslOnly', useSSL)
         self.forceSSL = forceSSL
         self.excludeCapsuleContents = excludeCapsuleContents
+        self.changesetStreaming = changesetStreaming
         self.deadlockRetry = deadlockRetry
         if withCache:
             self.cache = ContentStore(reposDir + '/cscache')
@@ -311,6 +312,8 @@ class RepositoryServer(base_server.BaseServer):
             configValues['forceSSL'] = True
         if self.excludeCapsuleContents:
             configValues['excludeCapsuleContents'] = True
+        if self.changesetStreaming:
+            configValues['changesetStreaming'] = True
         if self.deadlockRetry is not None:
             configValues['deadlockRetry'] = self.deadlockRetry
         if self.readOnlyRepository:
@@ -939,6 +942,11 @@ class RepositoryHelper(testhelp.TestCase):
 
         self.cfg.root = self.rootDir
         self.cfg.lookaside = self.cacheDir
+        # results cached across cooks would hide changes made by tests
+        self.cfg.magicCacheSize = 0
+        # source troves are cached by version, and test repositories are
+        # reset between tests
+        loadrecipe._recipeCache.clear()
         os.umask(0022)
 
         # set up the flavor based on the defaults in use
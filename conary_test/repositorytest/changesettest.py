@@ -28,6 +28,46 @@ from conary.lib import sha1helper, util
 from conary.repository import changeset, filecontainer, filecontents, netclient
 
 
+def _convertChangeSetV2V1Reference(inPath, outPath):
+    # the conversion as it was done before _ChangeSetV2V1Reader, which
+    # rebuilt the whole file container
+    inFc = filecontainer.FileContainer(
+                        util.ExtendedFile(inPath, "r", buffering = False))
+    assert(inFc.version == filecontainer.FILE_CONTAINER_VERSION_FILEID_IDX)
+    outFcObj = util.ExtendedFile(outPath, "w+", buffering = False)
+    outFc = filecontainer.FileContainer(outFcObj,
+            version = filecontainer.FILE_CONTAINER_VERSION_WITH_REMOVES)
+
+    info = inFc.getNextFile()
+    size = 0
+    while info:
+        key, tag, f = info
+        if len(key) == 36:
+            # snip off the fileId
+            key = key[0:16]
+            size -= 20
+
+        if 'ptr' in tag:
+            oldCompressed = f.read()
+            old = gzip.GzipFile(None, "r",
+                                fileobj = StringIO(oldCompressed)).read()
+            new = old[0:16]
+            newCompressedF = StringIO()
+            gzip.GzipFile(None, "w", fileobj = newCompressedF).write(new)
+            newCompressed = newCompressedF.getvalue()
+            fc = filecontents.FromString(newCompressed, compressed = True)
+            size -= len(oldCompressed) - len(newCompressed)
+        else:
+            fc = filecontents.FromFile(f)
+
+        outFc.addFile(key, fc, tag, precompressed = True)
+        info = inFc.getNextFile()
+
+    outFcObj.close()
+
+    return size
+
+
 class ChangesetTest(rephelp.RepositoryHelper):
     def testBadChangeset(self):
         csFile = self.workDir + '/foo.ccs'
@@ -153,6 +193,66 @@ class ChangesetTest(rephelp.RepositoryHelper):
         self.verifyFile(self.rootDir + '/1', '1')
         self.verifyFile(self.rootDir + '/2', '1')
 
+    def testChangeSetV2V1Reader(self):
+        f1 = rephelp.RegularFile(pathId = '1', contents = '1')
+        f2 = rephelp.RegularFile(pathId = '2', contents = '1')
+        f3 = rephelp.RegularFile(pathId = '3', contents = '3' * 100000)
+        t1 = self.addComponent('foo:runtime',
+                fileContents = [ ( '/1', f1 ), ( '/2', f2 ), ( '/3', f3 ) ] )
+        repos = self.openRepository()
+        job = [ (t1.getName(), (None, None),
+                 (t1.getVersion(), t1.getFlavor()), True) ]
+        v2Path = self.workDir + '/v2.ccs'
+        v1Path = self.workDir + '/v1.ccs'
+        refPath = self.workDir + '/ref.ccs'
+        repos.createChangeSetFile(job, v2Path)
+
+        # rewritten pointers are gzipped again, which records the time
+        origTime = gzip.time.time
+        gzip.time.time = lambda: 1000000000.0
+        try:
+            refDelta = _convertChangeSetV2V1Reference(v2Path, refPath)
+            delta = changeset._convertChangeSetV2V1(v2Path, v1Path)
+            streamed = []
+            for size in (1, 7, 4096):
+                reader = changeset._ChangeSetV2V1Reader(v2Path)
+                l = []
+                data = reader.read(size)
+                while data:
+                    l.append(data)
+                    data = reader.read(size)
+                reader.close()
+                streamed.append((reader.size, ''.join(l)))
+            # read() with no size returns the whole changeset at once
+            reader = changeset._ChangeSetV2V1Reader(v2Path)
+            streamed.append((reader.size, reader.read()))
+            self.assertEqual(reader.read(), '')
+            reader.close()
+        finally:
+            gzip.time.time = origTime
+
+        expected = open(refPath).read()
+        self.assertEqual(delta, refDelta)
+        self.assertEqual(open(v1Path).read(), expected)
+        # the streamed form matches the old conversion, however it is read
+        for readerSize, converted in streamed:
+            self.assertEqual(readerSize, len(expected))
+            self.assertEqual(converted, expected)
+
+        fc = filecontainer.FileContainer(
+                    util.ExtendedFile(v1Path, "r", buffering = False))
+        self.assertEqual(fc.version,
+                         filecontainer.FILE_CONTAINER_VERSION_WITH_REMOVES)
+        info = fc.getNextFile()
+        assert(info[0] == 'CONARYCHANGESET')
+        info = fc.getNextFile()
+        count = 0
+        while info is not None:
+            self.assertEqual(len(info[0]), 16)
+            count += 1
+            info = fc.getNextFile()
+        self.assertEqual(count, 3)
+
     def testGetNativeChangesetVersion(self):
         # When adding things here, make sure you update netclient's
         # FILE_CONTAINER_* constants too
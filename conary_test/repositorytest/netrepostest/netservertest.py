@@ -971,6 +971,49 @@ class NetServerTest(rephelp.RepositoryHelper):
                csVersion = filecontainer.FILE_CONTAINER_VERSION_NO_REMOVES,
                expectCachedAtProxy = True)
 
+    def testChangeSetStream(self):
+        self.stopRepository()
+        repos = self.openRepository(changesetStreaming = True)
+        try:
+            trv1 = self.addComponent('foo:runtime', '1',
+                                     fileContents = [ ('/a', 'a'),
+                                                      ('/b', 'b') ] )
+            trv2 = self.addComponent('foo:runtime', '2',
+                                     fileContents = [ ('/a', 'a'),
+                                                      ('/b', 'b 2') ] )
+            job = [ ('foo:runtime', (None, None),
+                     trv1.getNameVersionFlavor()[1:], True),
+                    ('foo:runtime', trv1.getNameVersionFlavor()[1:],
+                     trv2.getNameVersionFlavor()[1:], False) ]
+
+            fn = self.workDir + '/stream.ccs'
+            repos.createChangeSetFile(job, fn)
+
+            cs = changeset.ChangeSetFromFile(fn)
+            assert(len(list(cs.iterNewTroveList())) == 2)
+            trvCs = cs.getNewTroveVersion(*trv1.getNameVersionFlavor())
+            assert(trvCs.isAbsolute())
+            trvCs = cs.getNewTroveVersion(*trv2.getNameVersionFlavor())
+            assert(trvCs.getOldVersion() == trv1.getVersion())
+
+            if repos.c.proxyMap:
+                # proxies turn streaming down; the changeset came from
+                # getChangeSet()
+                assert(repos._noChangeSetStream)
+                return
+            assert(not repos._noChangeSetStream)
+
+            # the job is removed once it has been downloaded
+            rawRepos = repos.c['localhost']
+            url = rawRepos.getChangeSetStream(
+                    [ ('foo:runtime', (0, 0),
+                       (str(trv1.getVersion()), trv1.getFlavor().freeze()),
+                       True) ], False, True, True, False, False)
+            urllib2.urlopen(url).read()
+            self.assertRaises(urllib2.HTTPError, urllib2.urlopen, url)
+        finally:
+            self.stopRepository()
+
     def testRepositoryMismatch(self):
         # test the RepositoryMismatch exception by forcing a commit to
         # the wrong repository.
@@ -20,7 +20,9 @@ from testutils import mock, sock_utils
 import copy
 import itertools
 import os
+import StringIO
 import tempfile
+import time
 import urllib
 
 from conary_test import rephelp
@@ -30,7 +32,7 @@ from conary import conaryclient
 from conary import rpmhelper
 from conary import trove
 from conary.files import ThawFile
-from conary.lib import util
+from conary.lib import sha1helper, util
 from conary.repository import errors
 from conary.repository import netclient
 from conary.repository import xmlshims
@@ -264,6 +266,114 @@ class ProxyUnitTest(testcase.TestCaseWithWorkDir):
         # We're not releasing locks we didn't close
         self.assertEqual(len(contents), 2 * len(fingerprints))
 
+    def testGetFileContentsCoalesced(self):
+        cfg = netserver.ServerConfig()
+        cfg.proxyContentsDir = os.path.join(self.workDir, "proxyContents")
+        cfg.tmpDir = self.workDir
+        prs = netreposproxy.ProxyRepositoryServer(cfg, "/someUrl")
+        headers = {'X-Conary-Proxy-Host' : 'repos.example.com'}
+        prs.setBaseUrlOverride('/blah', headers, isSecure = True)
+        prs._serverName = 'repos.example.com'
+
+        fileIds = [ chr(1) * 20, chr(2) * 20 ]
+        fileList = [ (prs.fromFileId(x), 'version') for x in fileIds ]
+        paths = [ prs.contents.hashToPath(sha1helper.sha1ToString(x) + '-c')
+                  for x in fileIds ]
+
+        contentsFile = file(os.path.join(self.workDir, "contents"), "w+")
+        util.copyfileobj(
+            prs._compressStreamContents(StringIO.StringIO("fetched")),
+            contentsFile)
+        contentsSize = contentsFile.tell()
+        contentsFile.seek(0)
+
+        caller = mock.mockClass(netreposproxy.ProxyCaller)()
+        clientVersion = 51
+        # the first file is only checked for access, the second one is
+        # fetched
+        caller.getFileContents._mock.appendReturn(True,
+            clientVersion, [ fileList[0] ], True)
+        caller.getFileContents._mock.appendReturn(
+            ('http://repos.example.com/changeset?contents',
+             [ str(contentsSize) ]),
+            clientVersion, [ fileList[1] ], False)
+        urlOpener = mock.MockObject()
+        uo = mock.MockObject()
+        self.mock(netreposproxy.transport, 'ConaryURLOpener', urlOpener)
+        urlOpener._mock.setDefaultReturn(uo)
+        uo.open._mock.appendReturn(contentsFile,
+            'http://repos.example.com/changeset?contents',
+            forceProxy=caller._lastProxy,
+            headers=[('X-Conary-Servername', 'repos.example.com')])
+
+        # another request is fetching the first file
+        pip = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(pip[0])
+            prs.contents.makeDir(paths[0])
+            lock = util.LockedFile(paths[0])
+            lock.open()
+            os.write(pip[1], "1")
+            os.close(pip[1])
+            time.sleep(0.5)
+            lock.write("saved")
+            lock.commit()
+            os._exit(0)
+        try:
+            os.close(pip[1])
+            os.read(pip[0], 1)
+            os.close(pip[0])
+            url, sizes = prs.getFileContents(caller, (None, None, []),
+                                             clientVersion, fileList)
+        finally:
+            os.waitpid(pid, 0)
+
+        self.assertEqual(sizes, [ '5', str(contentsSize) ])
+        self.assertEqual(file(paths[0]).read(), 'saved')
+        self.assertEqual(util.gzip.GzipFile(paths[1]).read(), 'fetched')
+        self.assertFalse(os.path.exists(paths[1] + '.lck'))
+
+    def testCachingCapsuleDownloader(self):
+        rpmPath = os.path.join(rephelp.resources.get_archive(),
+                               'with-config-special-0.1-1.noarch.rpm')
+        rpmSha1 = sha1helper.sha1FileBin(rpmPath)
+        capsuleKey = ('with-config-special', None, '0.1', '1', 'noarch')
+        cfgSha1 = sha1helper.sha1String('config option\n')
+        urls = []
+
+        filterClass = netreposproxy.FileCachingChangesetFilter
+        class Downloader(filterClass.CachingCapsuleDownloader):
+            def download(slf, url, sha1sum):
+                urls.append(url)
+                return slf.fromFile(file(rpmPath))
+
+        contentsDir = os.path.join(self.workDir, "proxyContents")
+        util.mkdirChain(contentsDir)
+        contents = netreposproxy.datastore.DataStore(contentsDir)
+        fileList = [ ('', rpmSha1),
+                     ('/etc/with-config-special.cfg', cfgSha1),
+                     ('/etc/with-config-special.cfg', cfgSha1),
+                     ('/usr/share/ghost', sha1helper.sha1String('')) ]
+        for i in range(2):
+            dl = Downloader('http://capsules.example.com', contents)
+            ret = dl.downloadCapsuleFiles(capsuleKey, rpmSha1, fileList)
+            self.assertEqual([ x.get().read() for x in ret ],
+                [ file(rpmPath).read(), 'config option\n',
+                  'config option\n', '' ])
+            self.assertFalse(ret[1].f is ret[2].f)
+
+        # the capsule was downloaded once, and the files in it were never
+        # requested on their own
+        self.assertEqual(urls, [
+            'http://capsules.example.com/'
+            'with-config-special-0.1-1.noarch.rpm/'
+            'd1f2985d7f390b5c4d7e1cad062b3fedcdff53d1' ])
+        self.assertTrue(contents.hasFile(
+                            sha1helper.sha1ToString(rpmSha1) + '-x'))
+        self.assertTrue(contents.hasFile(
+                            sha1helper.sha1ToString(rpmSha1) + '-p'))
+
 class ProxyTest(rephelp.RepositoryHelper):
     def tearDown(self):
         rephelp.RepositoryHelper.tearDown(self)
@@ -765,11 +875,12 @@ class TestPackage(DerivedCapsuleRecipe):
 
         # Drop the extra file id
         fileList = fileList[:-1]
-        # Make sure we did hit the capsule indexer
+        # The capsule was cached when the changeset was reassembled, so
+        # both files are read from it without hitting the capsule indexer
         logFile = os.path.join(self.workDir, "capsuleContentServer.log")
         logCount = len([x for x in file(logFile)])
         ret = proxyRepos.getFileContents(fileList)
-        self.assertEqual(len([x for x in file(logFile)]) - logCount, 2)
+        self.assertEqual(len([x for x in file(logFile)]) - logCount, 0)
 
     @runproxy(withCapsuleContentServer = True)
     def testReassembleChangesetsMixedServers(self, proxyRepos):
@@ -808,7 +919,8 @@ class TestPackage(DerivedCapsuleRecipe):
             os.unlink(logFile)
         cs = proxyRepos.createChangeSet(joblist, withFiles = True,
             withFileContents = True)
-        self.assertEqual(len([x for x in file(logFile)]), 2)
+        # The config file is read from the downloaded capsule
+        self.assertEqual(len([x for x in file(logFile)]), 1)
         # Also, make sure we only requested stuff for foo
         expected = '/toplevel/%s' % os.path.basename(rpmFile0)
         for row in file(logFile):
@@ -21,7 +21,9 @@ from testrunner import testhelp
 from conary.streams import (
         AbsoluteSha1Stream,
         AbsoluteStreamCollection,
+        applyFileChanges,
         DependenciesStream,
+        diffFileMaps,
         DYNAMIC,
         InfoStream,
         IntStream,
@@ -823,3 +825,64 @@ class StreamsTest(testhelp.TestCase):
         b.blah.set('blah')
         frz = b.freeze()
         self.assertEqual(Blah2.find(1, frz)(), 'blah')
+
+    def testLazyStreamSet(self):
+        class Lazy(StreamSet):
+            streamDict = { 1 : ( SMALL, StringStream, "name" ),
+                           2 : ( SMALL, IntStream, "number" ),
+                           3 : ( SMALL, StringStream, "unused" ) }
+            lazyStreams = { 'name' : True, 'unused' : True }
+
+        stream = Lazy()
+        stream.name.set('thename')
+        stream.number.set(31459)
+        frz = stream.freeze()
+
+        # lazy streams aren't thawed until they're accessed
+        stream2 = Lazy(frz)
+        assert('name' not in stream2.__dict__)
+        assert('unused' not in stream2.__dict__)
+        self.assertEqual(stream2.number(), 31459)
+        self.assertEqual(stream2.name(), 'thename')
+        assert('name' in stream2.__dict__)
+        self.assertEqual(stream2.unused(), '')
+        self.assertEqual(stream2.freeze(), frz)
+        assert(Lazy(frz) == stream)
+        self.assertEqual(Lazy(frz).diff(stream), stream.diff(stream))
+        self.assertRaises(AttributeError, getattr, stream2, 'missing')
+
+        # thawing replaces lazy streams whether they've been used or not
+        other = Lazy()
+        other.name.set('other')
+        for used in (False, True):
+            stream2 = Lazy(frz)
+            if used:
+                self.assertEqual(stream2.name(), 'thename')
+            stream2.thaw(other.freeze())
+            self.assertEqual(stream2.name(), 'other')
+            self.assertEqual(stream2.number(), 31459)
+
+    def testFileMaps(self):
+        v1 = versions.ThawVersion('/localhost@rpl:linux/1:1.0-1-1')
+        v2 = versions.ThawVersion('/localhost@rpl:linux/2:1.0-1-2')
+        old = { '1' * 16 : ('/usr/bin', 'foo', '1' * 20, v1),
+                '2' * 16 : ('/usr/bin', 'bar', '2' * 20, v1),
+                '3' * 16 : ('/usr/bin', 'baz', '3' * 20, v1),
+                '4' * 16 : ('/usr/bin', 'gone', '4' * 20, v1) }
+        new = { '1' * 16 : ('/usr/bin', 'foo', '1' * 20, v1),
+                '2' * 16 : ('/usr/sbin', 'bar', '2' * 20, v1),
+                '3' * 16 : ('/usr/bin', 'baz', '5' * 20, v2),
+                '6' * 16 : ('/usr/bin', 'new', '6' * 20, v2) }
+        added, removed, changed = diffFileMaps(new, old)
+        self.assertEqual((added, removed, sorted(changed)),
+                         ([ '6' * 16 ], [ '4' * 16 ], [ '2' * 16, '3' * 16 ]))
+
+        newFiles = [ ('7' * 16, '/etc', 'conf', '7' * 20, v2) ]
+        changedFiles = [ ('2' * 16, '/usr/sbin', 'bar', None, None),
+                         ('3' * 16, None, None, '5' * 20, v2) ]
+        applyFileChanges(old, newFiles, changedFiles)
+        self.assertEqual(old['7' * 16], ('/etc', 'conf', '7' * 20, v2))
+        self.assertEqual(old['2' * 16], ('/usr/sbin', 'bar', '2' * 20, v1))
+        self.assertEqual(old['3' * 16], ('/usr/bin', 'baz', '5' * 20, v2))
+        self.assertRaises(KeyError, applyFileChanges, old, [],
+                          [ ('8' * 16, None, None, None, None) ])
@@ -18,6 +18,8 @@
 from testrunner import testhelp
 from testrunner import testcase
 import itertools
+import os
+import tempfile
 import time
 from conary import changelog, streams, trove, trovetup
 from conary.trove import Trove
@@ -31,6 +33,7 @@ from conary.deps.deps import DependencySet, Flavor
 from conary.deps.deps import Dependency
 from conary.deps.deps import FileDependencies
 from conary.deps.deps import parseFlavor
+from conary.lib import openpgpkey, util
 from conary.lib.openpgpkey import getKeyCache
 from conary.lib.sha1helper import md5FromString, md5String
 from conary.lib.sha1helper import sha1FromString, sha1ToString, sha1String
@@ -514,6 +517,65 @@ Some changes just are.
         except DigitalSignatureVerificationError, message:
             pass
 
+    def testDigitalSignatureCache(self):
+        keyCache = getKeyCache()
+        keyCache.setPublicPath(resources.get_archive()+'/pubring.gpg')
+        keyCache.setPrivatePath(resources.get_archive()+'/secring.gpg')
+        keyCache.getPrivateKey('90B1E477', '111111')
+        troves = []
+        for i in range(3):
+            t = Trove('foo%d' % i, NewVersion(), Flavor(), None)
+            t.addDigitalSignature('90B1E477')
+            troves.append(t)
+
+        verified = []
+        def _verifySignatures(checks):
+            verified.extend(checks)
+            return realVerifySignatures(checks)
+        realVerifySignatures = openpgpkey._verifySignatures
+        self.mock(openpgpkey, '_verifySignatures', _verifySignatures)
+
+        oldSignatureCache = keyCache.signatureCache
+        tmpDir = tempfile.mkdtemp()
+        try:
+            cachePath = os.path.join(tmpDir, 'sigcache')
+            keyCache.setSignatureCachePath(cachePath)
+
+            # all of the signatures (one per signature version) are
+            # verified together, and not again
+            trove.preverifyDigitalSignatures(
+                    [ (x.troveInfo, None) for x in troves ])
+            self.assertEqual(len(verified), 6)
+            for t in troves:
+                t.verifyDigitalSignatures()
+            self.assertEqual(len(verified), 6)
+            self.assertEqual(len(open(cachePath).readlines()), 6)
+
+            # the cache file is read back
+            keyCache.signatureCache = openpgpkey.VerifiedSignatureCache(
+                                                                cachePath)
+            troves[0].verifyDigitalSignatures()
+            self.assertEqual(len(verified), 6)
+
+            # revoking the key invalidates the signatures it made
+            key = verified[0][0]
+            key.revoked = True
+            try:
+                troves[0].verifyDigitalSignatures()
+            finally:
+                key.revoked = False
+            self.assertEqual(len(verified), 8)
+
+            # bad signatures are not cached
+            digest, sig = verified[0][1:]
+            badSig = (sig[0], sig[1] + 1, sig[2])
+            self.assertEqual(keyCache.verifyString(key, digest, badSig), -1)
+            self.assertEqual(keyCache.verifyString(key, digest, badSig), -1)
+            self.assertEqual(len(verified), 10)
+        finally:
+            keyCache.signatureCache = oldSignatureCache
+            util.rmtree(tmpDir)
+
     def testBadName(self):
         try:
             t = Trove('foo:bar:baz', NewVersion(), Flavor(), None)
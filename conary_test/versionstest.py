@@ -427,6 +427,35 @@ class VersionsTest(unittest.TestCase):
         assert(id(v1) == id(v3))
         assert(id(v3) == id(v4))
 
+    def testLabelIntern(self):
+        v1 = ThawVersion("/foo.com@spc:bar/1:1.2-3/bang.com@spc:branch/"
+                         "2:2.4-5")
+        v2 = VersionFromString("/foo.com@spc:bar//branch/1.2-3")
+        v3 = VersionFromString("/bang.com@spc:branch/2.4-6")
+        # versions share their labels, whether or not they were abbreviated
+        assert(v1.versions[0] is v2.versions[0])
+        assert(v1.trailingLabel() is v3.trailingLabel())
+        assert(v2.trailingLabel() is
+               VersionFromString("/foo.com@spc:branch/1.0-1").trailingLabel())
+        assert(v1.trailingLabel().getHost() == 'bang.com')
+        assert(v1.copy().trailingLabel() is v1.trailingLabel())
+
+        label = Label('foo.com@spc:bar')
+        assert(versions.internLabel(label) is v1.versions[0])
+        label = Label('new.com@spc:bar')
+        assert(versions.internLabel(label) is label)
+        assert(versions.internLabel(Label('new.com@spc:bar')) is label)
+
+        # static labels keep their class when they're interned
+        local = VersionFromString('/local@local:LOCAL/1.0-1-1')
+        assert(isinstance(local.trailingLabel(), LocalLabel))
+        assert(VersionFromString('/local@local:LOCAL/1.0-1-2')
+                    .trailingLabel() is local.trailingLabel())
+
+        # the intern table doesn't keep labels alive
+        del label
+        assert('new.com@spc:bar' not in versions.labelInternTable)
+
     def testGetSourceVersion(self):
         v = VersionFromString('/conary.rpath.com@rpl:linux/4.3-1-0/autconf213/1')
         assert(not v.isBranchedBinary())
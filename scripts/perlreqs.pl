@@ -1,15 +1,40 @@
 #!/usr/bin/perl
+use Cwd;
+use File::Basename;
 use Module::ScanDeps;
 
-$map = scan_deps(files=>[$ARGV[0]], recurse => 0);
-
-# Do as little as possible in this bootstrapping script; do all the
-# processing in Python.  We use // as a separator because it will
-# never be found within a normalized POSIX path.
-foreach $item (values %$map) {
-    # since we depend on the path being normalized, make sure they
-    # are!
-    $file = $item->{file};
-    $file = s/\/\/+/\//g;
-    print $item->{type} . "//" . $file . "//" . $item->{key} . "\n";
+sub print_deps {
+    my ($path) = @_;
+    $map = scan_deps(files=>[$path], recurse => 0);
+
+    # Do as little as possible in this bootstrapping script; do all the
+    # processing in Python.  We use // as a separator because it will
+    # never be found within a normalized POSIX path.
+    foreach $item (values %$map) {
+        # since we depend on the path being normalized, make sure they
+        # are!
+        $file = $item->{file};
+        $file = s/\/\/+/\//g;
+        print $item->{type} . "//" . $file . "//" . $item->{key} . "\n";
+    }
+}
+
+if (@ARGV) {
+    print_deps($ARGV[0]);
+    exit(0);
+}
+
+# Without arguments, the paths to scan are read from stdin, one per
+# line, and the output for each is followed by an empty line; "//error"
+# is printed before it if the path could not be scanned. Each path is
+# scanned from its own directory.
+$cwd = getcwd();
+while ($path = <STDIN>) {
+    chomp($path);
+    chdir(dirname($path));
+    if (!eval { print_deps($path); 1 }) {
+        print "//error\n";
+    }
+    chdir($cwd);
+    print "\n";
 }